@@ -1,13 +1,69 @@
 # app.py
 
+import time
+INICIO_SCRIPT = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
 from modulos.autenticacion import login_form
-from modulos.procesamiento_datos import fusionar_archivos_excel
-from modulos.analisis_cuantitativo import obtener_preguntas_cuantitativas, generar_analisis_cuantitativo, exportar_a_word as exportar_cuantitativo_a_word
-from modulos.analisis_cualitativo import obtener_preguntas_cualitativas, generar_analisis_cualitativo, exportar_analisis_cualitativo_a_word
-from modulos.modulo_comparador import mostrar_modulo_comparador
-import os
+from modulos.preguntas import obtener_preguntas_cuantitativas, obtener_preguntas_cualitativas
+from modulos.instrumentacion import instrumentacion
+
+# Los módulos pesados (pandas, matplotlib, seaborn, python-docx, scipy) no se
+# importan aquí: cada uno se importa la primera vez que se abre su módulo, para
+# que la pantalla de acceso aparezca cuanto antes.
+
+def obtener_id_sesion():
+    """
+    Identificador de la sesión de Streamlit actual.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    contexto = get_script_run_ctx()
+    return contexto.session_id if contexto is not None else "local"
+
+def establecer_df_principal(df):
+    """
+    Registra el DataFrame cargado en el almacén compartido, que lo tipa según
+    el esquema de la encuesta una sola vez aunque lo abran varias sesiones.
+    La sesión solo guarda el hash del dataset; los módulos de análisis
+    trabajan siempre sobre la vista tipada que devuelve el almacén.
+    Devuelve None (y muestra el error) si el dataset no se pudo guardar.
+    """
+    from modulos.almacen_datos import hash_almacenado
+    from modulos.almacen_compartido import almacen_compartido
+    sesion = obtener_id_sesion()
+    hash_dataset = hash_almacenado(df) if df is not None else None
+    if hash_dataset is None:
+        # Sin copia en disco (falló la escritura) no hay dataset que compartir
+        # ni que volver a abrir en las ejecuciones siguientes
+        st.error("No se pudo guardar la copia del dataset en la carpeta de datos. Comprueba el espacio en disco y los permisos.")
+        return None
+    hash_anterior = st.session_state.get("hash_df_principal")
+    if hash_anterior is not None and hash_anterior != hash_dataset:
+        almacen_compartido.liberar(hash_anterior, sesion)
+    df_vista, resumen = almacen_compartido.adquirir(hash_dataset, sesion, df)
+    st.session_state.hash_df_principal = hash_dataset
+    st.session_state.resumen_esquema = resumen
+    return df_vista
+
+def obtener_df_principal():
+    """
+    Devuelve la vista del dataset de la sesión (renovando su arrendamiento en
+    el almacén compartido), o None si la sesión aún no ha cargado ninguno.
+    """
+    hash_dataset = st.session_state.get("hash_df_principal")
+    if hash_dataset is None:
+        return None
+    from modulos.almacen_datos import hash_almacenado
+    from modulos.almacen_compartido import almacen_compartido
+    df, resumen = almacen_compartido.adquirir(hash_dataset, obtener_id_sesion())
+    if df is None:
+        # La copia en disco ya no existe: hay que volver a cargar el archivo
+        st.session_state.hash_df_principal = None
+    elif hash_almacenado(df) != hash_dataset:
+        # Se han añadido archivos a la fusión: la sesión pasa a la versión nueva
+        st.session_state.hash_df_principal = hash_almacenado(df)
+        st.session_state.resumen_esquema = resumen
+    return df
 
 def main():
     """
@@ -18,29 +74,51 @@ def main():
         layout="wide"
     )
 
+    # Las mediciones de rendimiento de esta ejecución se asocian a la sesión
+    instrumentacion.fijar_contexto(sesion=obtener_id_sesion())
+
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
     
-    if "df_principal" not in st.session_state:
-        st.session_state.df_principal = None
+    if "hash_df_principal" not in st.session_state:
+        st.session_state.hash_df_principal = None
     
     if "modulo_actual" not in st.session_state:
         st.session_state.modulo_actual = "Inicio"
 
     if not st.session_state.logged_in:
         login_form()
+        # Tiempo hasta mostrar la pantalla de acceso; el primero es el arranque en frío
+        tiempo_acceso = time.perf_counter() - INICIO_SCRIPT
+        st.session_state.setdefault("tiempo_arranque", tiempo_acceso)
+        st.sidebar.caption(f"Pantalla de acceso lista en {tiempo_acceso:.2f} s")
     else:
         st.sidebar.title("Menú Principal")
         st.sidebar.write("Bienvenido, el programa está protegido con contraseña.")
         st.sidebar.button("Inicio", on_click=lambda: st.session_state.update(modulo_actual="Inicio"))
+
+        df_principal = obtener_df_principal()
         
-        if st.session_state.df_principal is None:
+        if df_principal is None:
+            from modulos.procesamiento_datos import fusionar_archivos_excel, cargar_archivo_excel, anadir_a_fusion
+            from modulos.almacen_datos import listar_fusiones, cargar_fusion
+            from modulos.lectura_excel import LimiteMemoriaExcedido
+
             # Lógica de carga de datos
             st.title("Análisis Encuestas Residentes")
             st.subheader("Carga de Datos")
             opcion = st.radio(
                 "Selecciona una opción:",
-                ("Fusionar archivos Excel", "Seleccionar un único archivo Excel")
+                (
+                    "Fusionar archivos Excel",
+                    "Seleccionar un único archivo Excel",
+                    "Abrir una fusión anterior",
+                    "Añadir archivos a una fusión anterior"
+                )
+            )
+            lectura_por_bloques = st.checkbox(
+                "Lectura por bloques con memoria acotada (archivos muy grandes)",
+                help="Lee los libros fila a fila sin cargarlos completos en memoria. Es más lento, pero evita quedarse sin memoria."
             )
             
             if opcion == "Fusionar archivos Excel":
@@ -50,14 +128,15 @@ def main():
                     accept_multiple_files=True
                 )
                 if archivos_cargados and st.button("Fusionar y Procesar"):
-                    df_fusionado, log = fusionar_archivos_excel(archivos_cargados)
+                    df_fusionado, log = fusionar_archivos_excel(archivos_cargados, streaming=lectura_por_bloques)
                     if df_fusionado is not None:
-                        st.session_state.df_principal = df_fusionado
+                        df_principal = establecer_df_principal(df_fusionado)
+                    if df_principal is not None:
                         st.success("Archivos fusionados y cargados en memoria correctamente.")
                         st.write("Log de fusión:")
                         st.json(log)
                         st.subheader("Archivo Cargado")
-                        st.dataframe(st.session_state.df_principal.head())
+                        st.dataframe(df_principal.head())
 
             elif opcion == "Seleccionar un único archivo Excel":
                 archivo_cargado = st.file_uploader(
@@ -65,30 +144,121 @@ def main():
                     type=["xlsx"]
                 )
                 if archivo_cargado:
-                    st.session_state.df_principal = pd.read_excel(archivo_cargado)
-                    st.success("Archivo cargado en memoria correctamente.")
-                    st.subheader("Archivo Cargado")
-                    st.dataframe(st.session_state.df_principal.head())
+                    try:
+                        df_principal = establecer_df_principal(cargar_archivo_excel(archivo_cargado, streaming=lectura_por_bloques))
+                    except LimiteMemoriaExcedido as e:
+                        st.error(f"Se ha superado el límite de memoria configurado: {e}")
+                    if df_principal is not None:
+                        st.success("Archivo cargado en memoria correctamente.")
+                        st.subheader("Archivo Cargado")
+                        st.dataframe(df_principal.head())
+
+            elif opcion == "Abrir una fusión anterior":
+                fusiones = listar_fusiones()
+                if fusiones:
+                    nombre_fusion = st.selectbox(
+                        "Selecciona una fusión guardada:",
+                        options=[nombre for nombre, _ in fusiones],
+                        format_func=lambda nombre: f"{nombre} ({dict(fusiones)[nombre]['fecha']})"
+                    )
+                    if st.button("Abrir fusión"):
+                        df_fusion, log = cargar_fusion(nombre_fusion)
+                        if df_fusion is not None:
+                            df_principal = establecer_df_principal(df_fusion)
+                        else:
+                            st.error(f"No se pudo abrir la fusión '{nombre_fusion}'.")
+                        if df_principal is not None:
+                            st.success("Fusión cargada en memoria correctamente.")
+                            st.write("Log de fusión:")
+                            st.json(log)
+                            st.subheader("Archivo Cargado")
+                            st.dataframe(df_principal.head())
+                else:
+                    st.info("Todavía no hay fusiones guardadas.")
+
+            elif opcion == "Añadir archivos a una fusión anterior":
+                fusiones = listar_fusiones()
+                if fusiones:
+                    nombre_fusion = st.selectbox(
+                        "Selecciona la fusión a ampliar:",
+                        options=[nombre for nombre, _ in fusiones],
+                        format_func=lambda nombre: f"{nombre} ({dict(fusiones)[nombre]['fecha']})"
+                    )
+                    archivos_nuevos = st.file_uploader(
+                        "Carga los archivos Excel nuevos (solo se leen estos)",
+                        type=["xlsx"],
+                        accept_multiple_files=True
+                    )
+                    if archivos_nuevos and st.button("Añadir a la fusión"):
+                        df_ampliado, log = anadir_a_fusion(nombre_fusion, archivos_nuevos, streaming=lectura_por_bloques)
+                        if df_ampliado is not None:
+                            df_principal = establecer_df_principal(df_ampliado)
+                        if df_principal is not None:
+                            st.success("Archivos añadidos y fusión cargada en memoria correctamente.")
+                            st.write("Log de fusión:")
+                            st.json(log)
+                            st.subheader("Archivo Cargado")
+                            st.dataframe(df_principal.head())
+                else:
+                    st.info("Todavía no hay fusiones guardadas.")
 
         else: # Si ya hay un archivo cargado
             st.sidebar.markdown("---")
             st.sidebar.subheader("Archivo en Memoria")
-            st.sidebar.write(f"Filas: {st.session_state.df_principal.shape[0]}")
-            st.sidebar.write(f"Columnas: {st.session_state.df_principal.shape[1]}")
+            st.sidebar.write(f"Filas: {df_principal.shape[0]}")
+            st.sidebar.write(f"Columnas: {df_principal.shape[1]}")
+            resumen_esquema = st.session_state.get("resumen_esquema")
+            if resumen_esquema:
+                st.sidebar.write(f"Memoria: {resumen_esquema['memoria_despues'] / 1024**2:.1f} MB")
+                st.sidebar.caption(
+                    f"Ahorro por tipado: {resumen_esquema['memoria_ahorrada'] / 1024**2:.1f} MB "
+                    f"(antes {resumen_esquema['memoria_antes'] / 1024**2:.1f} MB)"
+                )
+            from modulos.almacen_compartido import almacen_compartido
+            huella_almacen = almacen_compartido.huella()
+            st.sidebar.caption(
+                f"Almacén compartido: {huella_almacen['datasets']} datasets, "
+                f"{huella_almacen['memoria_mb']:.1f} MB, {huella_almacen['arrendamientos']} sesiones"
+            )
+            from modulos.cache_resultados import cache_resultados
+            estadisticas_cache = cache_resultados.estadisticas()
+            st.sidebar.caption(
+                f"Caché de resultados: {estadisticas_cache['aciertos']} aciertos, "
+                f"{estadisticas_cache['fallos']} fallos ({estadisticas_cache['tasa_aciertos']:.0%}), "
+                f"{estadisticas_cache['entradas']} entradas, "
+                f"{estadisticas_cache['tamano_mb']:.1f} de {estadisticas_cache['limite_mb']:.0f} MB"
+            )
             st.sidebar.markdown("---")
             st.sidebar.button("Análisis Cuantitativo", on_click=lambda: st.session_state.update(modulo_actual="Cuantitativo"))
             st.sidebar.button("Análisis Cualitativo", on_click=lambda: st.session_state.update(modulo_actual="Cualitativo"))
             st.sidebar.button("Módulo Comparador", on_click=lambda: st.session_state.update(modulo_actual="Comparador"))
 
+            # Filtro global: los módulos trabajan sobre una vista con las filas que lo cumplen
+            from modulos.barra_filtros import mostrar_barra_filtros
+            from modulos.filtros import aplicar_filtro, mascara_filtro, describir_filtro
+            st.sidebar.markdown("---")
+            filtro = mostrar_barra_filtros(df_principal)
+            df_analisis = aplicar_filtro(df_principal, filtro)
+            if filtro:
+                st.info(f"Filtro global: {describir_filtro(filtro)} ({len(df_analisis)} de {len(df_principal)} filas).")
 
-            if st.session_state.modulo_actual == "Inicio":
+            # Exportaciones en segundo plano: siguen en curso aunque se cambie de módulo
+            from modulos.panel_exportaciones import mostrar_exportaciones, encolar_exportacion, descripcion_exportacion
+            st.sidebar.markdown("---")
+            mostrar_exportaciones(obtener_id_sesion(), df_analisis, filtro)
+
+            if filtro and df_analisis.empty:
+                st.warning("Ninguna fila cumple el filtro global. Cambia o quita alguna condición.")
+
+            elif st.session_state.modulo_actual == "Inicio":
                 st.title("Análisis Encuestas Residentes")
                 st.write("Has iniciado sesión correctamente. Archivo cargado en memoria.")
                 st.write("Utiliza el menú de la izquierda para seleccionar un módulo de análisis.")
             
             elif st.session_state.modulo_actual == "Cuantitativo":
                 st.header("Módulo de Análisis Cuantitativo")
-                preguntas_cuantitativas = obtener_preguntas_cuantitativas(st.session_state.df_principal)
+                from modulos.analisis_cuantitativo import generar_analisis_cuantitativo, informe_cuantitativo
+                preguntas_cuantitativas = obtener_preguntas_cuantitativas(df_analisis)
 
                 if preguntas_cuantitativas:
                     seleccionar_todas = st.checkbox("Seleccionar todas las preguntas")
@@ -106,72 +276,103 @@ def main():
                     
                     if st.button("Procesar Análisis Cuantitativo"):
                         if preguntas_seleccionadas:
-                            resultados = generar_analisis_cuantitativo(st.session_state.df_principal, preguntas_seleccionadas)
-                            if resultados:
-                                doc_buffer = exportar_cuantitativo_a_word(resultados)
-                                st.download_button(
-                                    label="Exportar a Word",
-                                    data=doc_buffer,
-                                    file_name="analisis_cuantitativo.docx",
-                                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                                )
+                            generar_analisis_cuantitativo(df_analisis, preguntas_seleccionadas)
                         else:
                             st.warning("Por favor, selecciona al menos una pregunta para analizar.")
+
+                    # El documento se genera en segundo plano y se descarga desde la barra lateral
+                    if st.button("Exportar a Word", key="exportar_cuantitativo"):
+                        if preguntas_seleccionadas:
+                            encolar_exportacion(
+                                obtener_id_sesion(), descripcion_exportacion("Análisis cuantitativo", filtro),
+                                "analisis_cuantitativo.docx", informe_cuantitativo, df_analisis, preguntas_seleccionadas
+                            )
+                        else:
+                            st.warning("Por favor, selecciona al menos una pregunta para exportar.")
                 else:
                     st.warning("No se encontraron preguntas cuantitativas en el archivo.")
             
             elif st.session_state.modulo_actual == "Cualitativo":
                 st.header("Módulo de Análisis Cualitativo")
-                preguntas_cualitativas = obtener_preguntas_cualitativas(st.session_state.df_principal)
+                from modulos.analisis_cualitativo import (
+                    generar_analisis_cualitativo,
+                    informe_cualitativo,
+                    mostrar_prompts_ia,
+                    mostrar_busqueda_comentarios
+                )
+                preguntas_cualitativas = obtener_preguntas_cualitativas(df_analisis)
                 if preguntas_cualitativas:
                     preguntas_seleccionadas = st.multiselect(
                         "Selecciona las preguntas cualitativas que deseas analizar:",
                         options=preguntas_cualitativas
                     )
+                    from modulos.esquema_datos import NUMERO_COLUMNAS_REFERENCIA
+                    referencia_frases = st.selectbox(
+                        "Desglosar las frases clave de los comentarios por:",
+                        ["Sin desglose"] + df_analisis.columns[:NUMERO_COLUMNAS_REFERENCIA].tolist(),
+                        key="referencia_frases"
+                    )
                     if st.button("Procesar Análisis Cualitativo"):
                         if preguntas_seleccionadas:
-                            resultados = generar_analisis_cualitativo(st.session_state.df_principal, preguntas_seleccionadas)
+                            resultados = generar_analisis_cualitativo(
+                                df_analisis, preguntas_seleccionadas,
+                                referencia=None if referencia_frases == "Sin desglose" else referencia_frases
+                            )
                             if resultados:
-                                st.subheader("Exportar análisis")
-                                doc_buffer = exportar_analisis_cualitativo_a_word(resultados)
-                                st.download_button(
-                                    label="Exportar a Word",
-                                    data=doc_buffer,
-                                    file_name="analisis_cualitativo.docx",
-                                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                                )
-
-                                st.markdown("---")
-                                st.subheader("Prompt para Análisis de IA")
-                                st.write("Copia el siguiente prompt y pégalo en una de las herramientas de IA para un análisis más profundo.")
-                                
-                                prompt_completo = ""
-                                for res in resultados:
-                                    if res['tipo_analisis'] == "comentario":
-                                        prompt_completo += res['prompt'] + "\n\n"
-                                
-                                if prompt_completo:
-                                    st.text_area("Prompt para IA", value=prompt_completo, height=300)
-                                    
-                                    col_gpt, col_claude, col_gemini, col_copilot = st.columns(4)
-                                    with col_gpt:
-                                        st.link_button("ChatGPT", url="https://chat.openai.com/")
-                                    with col_claude:
-                                        st.link_button("Claude", url="https://claude.ai/")
-                                    with col_gemini:
-                                        st.link_button("Gemini", url="https://gemini.google.com/")
-                                    with col_copilot:
-                                        st.link_button("Copilot", url="https://copilot.microsoft.com/")
-                                else:
+                                # Los prompts se muestran también en las ejecuciones siguientes,
+                                # al cambiar de fragmento o de presupuesto
+                                st.session_state.preguntas_prompt_ia = [
+                                    res['pregunta'] for res in resultados if res['tipo_analisis'] == "comentario"
+                                ]
+                                if not st.session_state.preguntas_prompt_ia:
                                     st.info("No hay preguntas de comentario seleccionadas para generar un prompt de IA.")
 
                         else:
                             st.warning("Por favor, selecciona al menos una pregunta para analizar.")
+
+                    # El documento se genera en segundo plano y se descarga desde la barra lateral
+                    if st.button("Exportar a Word", key="exportar_cualitativo"):
+                        if preguntas_seleccionadas:
+                            encolar_exportacion(
+                                obtener_id_sesion(), descripcion_exportacion("Análisis cualitativo", filtro),
+                                "analisis_cualitativo.docx", informe_cualitativo, df_analisis, preguntas_seleccionadas,
+                                referencia=None if referencia_frases == "Sin desglose" else referencia_frases
+                            )
+                        else:
+                            st.warning("Por favor, selecciona al menos una pregunta para exportar.")
+
+                    preguntas_prompt = [
+                        pregunta for pregunta in st.session_state.get("preguntas_prompt_ia", [])
+                        if pregunta in df_analisis.columns
+                    ]
+                    if preguntas_prompt:
+                        st.markdown("---")
+                        mostrar_prompts_ia(df_analisis, preguntas_prompt)
+
+                        col_gpt, col_claude, col_gemini, col_copilot = st.columns(4)
+                        with col_gpt:
+                            st.link_button("ChatGPT", url="https://chat.openai.com/")
+                        with col_claude:
+                            st.link_button("Claude", url="https://claude.ai/")
+                        with col_gemini:
+                            st.link_button("Gemini", url="https://gemini.google.com/")
+                        with col_copilot:
+                            st.link_button("Copilot", url="https://copilot.microsoft.com/")
+
+                    # El buscador usa su propio índice y no depende de las preguntas procesadas
+                    st.markdown("---")
+                    mostrar_busqueda_comentarios(df_principal, mascara_global=mascara_filtro(df_principal, filtro))
                 else:
                     st.warning("No se encontraron preguntas cualitativas en el archivo.")
             
             elif st.session_state.modulo_actual == "Comparador":
-                mostrar_modulo_comparador(st.session_state.df_principal)
+                from modulos.modulo_comparador import mostrar_modulo_comparador
+                mostrar_modulo_comparador(df_analisis)
+
+        # Al final de la ejecución, para que incluya las mediciones de esta misma ejecución
+        from modulos.panel_rendimiento import mostrar_panel_rendimiento
+        st.sidebar.markdown("---")
+        mostrar_panel_rendimiento(obtener_id_sesion())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
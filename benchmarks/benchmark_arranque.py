@@ -0,0 +1,59 @@
+# /benchmarks/benchmark_arranque.py
+#
+# Mide el arranque en frío de la aplicación en un intérprete nuevo: la
+# importación de app.py y la primera ejecución del script hasta mostrar la
+# pantalla de acceso. También comprueba que no se carga ninguna librería pesada.
+# Uso, desde la raíz del repositorio:
+#     python -m benchmarks.benchmark_arranque [repeticiones]
+
+import sys
+import json
+import subprocess
+
+LIBRERIAS_PESADAS = ("pandas", "matplotlib", "seaborn", "docx", "nltk", "scipy")
+
+_SCRIPT_MEDICION = """
+import sys, time, json
+inicio = time.perf_counter()
+import streamlit
+t_streamlit = time.perf_counter() - inicio
+import app
+t_app = time.perf_counter() - inicio - t_streamlit
+cargadas = [m for m in {pesadas!r} if m in sys.modules]
+from streamlit.testing.v1 import AppTest
+inicio_script = time.perf_counter()
+prueba = AppTest.from_file("app.py").run()
+t_acceso = time.perf_counter() - inicio_script
+print(json.dumps({{
+    "importar_streamlit": t_streamlit,
+    "importar_app": t_app,
+    "primera_ejecucion": t_acceso,
+    "librerias_pesadas_al_importar": cargadas,
+    "pantalla_de_acceso": prueba.sidebar.title[0].value if prueba.sidebar.title else None
+}}))
+"""
+
+def medir_arranque():
+    """
+    Ejecuta la medición en un proceso nuevo para que no haya módulos en caché.
+    """
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_MEDICION.format(pesadas=LIBRERIAS_PESADAS)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    mediciones = [medir_arranque() for _ in range(repeticiones)]
+    mejor = min(mediciones, key=lambda m: m["importar_app"] + m["primera_ejecucion"])
+
+    print(f"Importar streamlit:        {mejor['importar_streamlit']:.3f} s")
+    print(f"Importar app.py:           {mejor['importar_app']:.3f} s")
+    print(f"Primera ejecución (login): {mejor['primera_ejecucion']:.3f} s")
+    print(f"Pantalla mostrada:         {mejor['pantalla_de_acceso']}")
+    if mejor["librerias_pesadas_al_importar"]:
+        print(f"AVISO: librerías pesadas cargadas al importar app.py: {mejor['librerias_pesadas_al_importar']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# /benchmarks/benchmark_cuantitativo.py
+#
+# Compara el bucle original del análisis cuantitativo (to_numeric + describe +
+# histograma por pregunta) con calcular_estadisticas_lote.
+# Uso, desde la raíz del repositorio:
+#     python -m benchmarks.benchmark_cuantitativo [filas]
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from modulos.analisis_cuantitativo import calcular_estadisticas_lote
+
+def generar_datos(filas, preguntas=47, semilla=0):
+    """
+    Genera respuestas de tipo Likert (1-10) con un 10% de respuestas vacías.
+    """
+    rng = np.random.default_rng(semilla)
+    datos = {}
+    for i in range(preguntas):
+        valores = rng.integers(1, 11, filas).astype(float)
+        valores[rng.random(filas) < 0.1] = np.nan
+        datos[f"Pregunta {i + 1}"] = valores
+    return pd.DataFrame(datos)
+
+def analisis_en_bucle(df, preguntas, bins=10):
+    """
+    Reproduce el cálculo del bucle original pregunta a pregunta.
+    """
+    resultados = {}
+    for pregunta in preguntas:
+        columna = pd.to_numeric(df[pregunta], errors='coerce').dropna()
+        resultados[pregunta] = (columna.describe(), np.histogram(columna.to_numpy(), bins=bins))
+    return resultados
+
+def medir(funcion, repeticiones=3):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = generar_datos(filas)
+    preguntas = df.columns.tolist()
+
+    t_bucle, bucle = medir(lambda: analisis_en_bucle(df, preguntas))
+    t_lote, lote = medir(lambda: calcular_estadisticas_lote(df, preguntas))
+
+    # Comprobar que ambos caminos dan los mismos resultados
+    for pregunta in preguntas:
+        descriptivo, (conteos, bordes) = bucle[pregunta]
+        assert np.allclose(descriptivo.to_numpy(), lote["descriptivos"].loc[pregunta].to_numpy())
+        assert (conteos == lote["histogramas"][pregunta][0]).all()
+        assert np.allclose(bordes, lote["histogramas"][pregunta][1])
+
+    print(f"Filas: {filas}, preguntas: {len(preguntas)}")
+    print(f"Bucle por pregunta: {t_bucle:.3f} s")
+    print(f"Cálculo en lote:    {t_lote:.3f} s")
+    print(f"Aceleración:        x{t_bucle / t_lote:.1f}")
+
+if __name__ == "__main__":
+    main()
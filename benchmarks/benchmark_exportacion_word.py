@@ -0,0 +1,95 @@
+# /benchmarks/benchmark_exportacion_word.py
+#
+# Exporta un informe cualitativo de 48 preguntas y compara la escritura de
+# tablas celda a celda (tabla.add_row().cells) con agregar_tabla.
+# Uso, desde la raíz del repositorio:
+#     python -m benchmarks.benchmark_exportacion_word [respuestas_por_pregunta]
+
+import sys
+import time
+from io import BytesIO
+import pandas as pd
+from docx import Document
+from docx.shared import Inches
+from modulos.analisis_cualitativo import exportar_analisis_cualitativo_a_word
+from modulos.graficos import especificacion, renderizar_figura
+
+PREGUNTAS = 48
+
+def generar_resultados(respuestas_por_pregunta):
+    """
+    Resultados categóricos sintéticos con tablas de muchas filas, como las de
+    las preguntas de selección múltiple.
+    """
+    imagen = renderizar_figura(especificacion("pastel", "Prueba", {"valores": [1, 2, 3], "etiquetas": ["A", "B", "C"]}))
+    resultados = []
+    for i in range(PREGUNTAS):
+        absolutas = list(range(respuestas_por_pregunta, 0, -1))
+        total = sum(absolutas)
+        frecuencias = pd.DataFrame({
+            "Respuesta": [f"Opción {j}; Opción {j + 1}" for j in range(respuestas_por_pregunta)],
+            "Frecuencia Absoluta": absolutas,
+            "Frecuencia Relativa (%)": [round(a / total * 100, 2) for a in absolutas]
+        })
+        resultados.append({
+            "pregunta": f"Pregunta {i + 1}",
+            "tipo_analisis": "categorico",
+            "frecuencias": frecuencias,
+            "imagen_barra": imagen,
+            "imagen_pastel": imagen
+        })
+    return resultados
+
+def exportar_celda_a_celda(resultados_analisis):
+    """
+    Exportación con el método anterior: una fila y una celda cada vez.
+    """
+    document = Document()
+    document.add_heading('Resultados del Análisis Cualitativo', 0)
+    for resultado in resultados_analisis:
+        document.add_heading(f"Análisis para: {resultado['pregunta']}", level=1)
+        document.add_paragraph("Análisis de Frecuencias:")
+        tabla = document.add_table(rows=1, cols=3)
+        hdr_cells = tabla.rows[0].cells
+        hdr_cells[0].text = 'Respuesta'
+        hdr_cells[1].text = 'Frecuencia Absoluta'
+        hdr_cells[2].text = 'Frecuencia Relativa (%)'
+        for index, row in resultado['frecuencias'].iterrows():
+            row_cells = tabla.add_row().cells
+            row_cells[0].text = str(row['Respuesta'])
+            row_cells[1].text = str(row['Frecuencia Absoluta'])
+            row_cells[2].text = str(row['Frecuencia Relativa (%)'])
+        document.add_picture(BytesIO(resultado['imagen_barra']), width=Inches(6))
+        document.add_picture(BytesIO(resultado['imagen_pastel']), width=Inches(6))
+        document.add_page_break()
+    buffer = BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, resultado
+
+def main():
+    respuestas = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    resultados = generar_resultados(respuestas)
+
+    t_celdas, doc_celdas = medir(lambda: exportar_celda_a_celda(resultados))
+    t_bloque, doc_bloque = medir(lambda: exportar_analisis_cualitativo_a_word(resultados))
+
+    # Comprobar que ambos documentos tienen el mismo contenido en las tablas
+    tablas_celdas = Document(doc_celdas).tables
+    tablas_bloque = Document(doc_bloque).tables
+    assert len(tablas_celdas) == len(tablas_bloque) == PREGUNTAS
+    for a, b in zip(tablas_celdas[:3], tablas_bloque[:3]):
+        assert [[c.text for c in fila.cells] for fila in a.rows] == [[c.text for c in fila.cells] for fila in b.rows]
+
+    print(f"Preguntas: {PREGUNTAS}, filas por tabla: {respuestas}")
+    print(f"Celda a celda:   {t_celdas:.2f} s")
+    print(f"Tabla en bloque: {t_bloque:.2f} s")
+    print(f"Aceleración:     x{t_celdas / t_bloque:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# /benchmarks/datos_sinteticos.py
+#
+# Generador de encuestas sintéticas con las columnas reales de la encuesta de
+# residentes: cinco columnas de referencia, valoraciones de 1 a 10, recuentos
+# (sesiones, guardias...), preguntas de sí/no, selección múltiple y comentarios
+# de texto libre. Las respuestas no son uniformes: cada hospital y cada
+# residente tienen su propio nivel de satisfacción, hay respuestas vacías y los
+# comentarios se repiten con frecuencias desiguales, como en los datos reales.
+# Uso, desde la raíz del repositorio:
+#     python -m benchmarks.datos_sinteticos filas [carpeta] [libros]
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from modulos.preguntas import PREGUNTAS_CUANTITATIVAS, PREGUNTAS_CUALITATIVAS
+# La misma clasificación de preguntas que usa la aplicación
+from modulos.esquema_datos import es_pregunta_de_comentario, es_pregunta_de_seleccion_multiple
+
+HOSPITALES = [
+    "Hospital Universitario de Canarias",
+    "Hospital Universitario Nuestra Señora de Candelaria",
+    "Hospital Universitario de Gran Canaria Dr. Negrín",
+    "Complejo Hospitalario Universitario Insular-Materno Infantil",
+    "Hospital Dr. José Molina Orosa",
+    "Hospital General de Fuerteventura",
+    "Hospital General de La Palma",
+    "Gerencia de Atención Primaria de Tenerife",
+    "Gerencia de Atención Primaria de Gran Canaria"
+]
+
+ESPECIALIDADES = [
+    "Medicina Familiar y Comunitaria", "Medicina Interna", "Pediatría", "Anestesiología y Reanimación",
+    "Cirugía General y del Aparato Digestivo", "Obstetricia y Ginecología", "Cardiología", "Psiquiatría",
+    "Medicina Intensiva", "Traumatología y Cirugía Ortopédica", "Radiodiagnóstico", "Neurología",
+    "Aparato Digestivo", "Neumología", "Oftalmología", "Dermatología", "Urología", "Nefrología",
+    "Oncología Médica", "Hematología y Hemoterapia", "Endocrinología y Nutrición", "Otorrinolaringología",
+    "Medicina Preventiva y Salud Pública", "Análisis Clínicos", "Microbiología y Parasitología",
+    "Farmacia Hospitalaria", "Enfermería Familiar y Comunitaria", "Enfermería Obstétrico-Ginecológica",
+    "Psicología Clínica", "Reumatología"
+]
+
+AÑOS_RESIDENCIA = ["R1", "R2", "R3", "R4", "R5"]
+SEXOS = ["Mujer", "Hombre", "Prefiero no contestar"]
+EDADES = ["Menos de 25", "25-29", "30-34", "35-39", "40 o más"]
+
+COLUMNAS_REFERENCIA = ["Hospital", "Especialidad", "Año de residencia", "Sexo", "Edad"]
+
+RESPUESTAS_SI_NO = ["Sí", "No", "No sabe/No contesta"]
+
+# Opciones de las preguntas de selección múltiple, según el texto de la pregunta
+OPCIONES_CRITERIOS = [
+    "Informes de evaluación de las rotaciones", "Entrevistas tutor-residente", "Libro del Residente",
+    "Evaluación por competencias", "Asistencia a sesiones y cursos", "Actividad investigadora",
+    "Opinión de los adjuntos", "No lo sé"
+]
+OPCIONES_VIAS = [
+    "Correo electrónico", "Reunión con la Comisión de Docencia", "Intranet del centro",
+    "A través de mi tutor/a", "Tablón de anuncios", "No se comunican"
+]
+
+# Piezas con las que se componen los comentarios de texto libre
+SUJETOS_COMENTARIO = [
+    "El tutor", "La tutora", "La supervisión en las guardias", "La carga asistencial", "El servicio",
+    "La acogida", "El calendario de rotaciones", "La Comisión de Docencia", "La formación teórica",
+    "El trato de los adjuntos", "La organización de las sesiones clínicas", "El acceso a cursos",
+    "La investigación", "El número de guardias", "La comunicación con la unidad docente"
+]
+VALORACIONES_COMENTARIO = [
+    "es excelente", "es muy buena", "es adecuada", "podría mejorar", "no es suficiente",
+    "es claramente mejorable", "no está bien organizada", "ha mejorado mucho este año",
+    "depende mucho de cada adjunto", "no se cumple en la mayoría de los casos"
+]
+AÑADIDOS_COMENTARIO = [
+    "", "", "", " y nos sentimos muy apoyados", " porque faltan recursos", " por la presión asistencial",
+    ", sobre todo en los primeros meses", ", aunque hay poco tiempo para docencia",
+    ". Propongo más sesiones prácticas", ". Sería útil tener más simulación",
+    ". No hay tiempo para investigar", ". Gracias a todo el equipo"
+]
+COMENTARIOS_BREVES = ["Nada", "Ninguno", "Sin comentarios", "Todo bien", "No", "Muy contento"]
+
+def _es_recuento(pregunta):
+    texto = pregunta.lower()
+    return texto.startswith("por término medio") or texto.startswith("¿cuántas") or texto.startswith("¿en cuántos")
+
+def preguntas_encuesta():
+    """
+    Columnas de preguntas de la encuesta, sin repetir las que figuran en las
+    dos listas, en el orden en que aparecen en los archivos.
+    """
+    return list(dict.fromkeys(PREGUNTAS_CUANTITATIVAS + PREGUNTAS_CUALITATIVAS))
+
+def _probabilidades_desiguales(n, rng, concentracion=1.1):
+    # Pesos tipo Zipf: unas pocas categorías concentran la mayoría de respuestas
+    pesos = 1.0 / np.arange(1, n + 1) ** concentracion
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+def _columnas_referencia(filas, rng):
+    return {
+        "Hospital": rng.choice(HOSPITALES, filas, p=_probabilidades_desiguales(len(HOSPITALES), rng, 0.8)),
+        "Especialidad": rng.choice(ESPECIALIDADES, filas, p=_probabilidades_desiguales(len(ESPECIALIDADES), rng)),
+        "Año de residencia": rng.choice(AÑOS_RESIDENCIA, filas, p=[0.24, 0.23, 0.22, 0.2, 0.11]),
+        "Sexo": rng.choice(SEXOS, filas, p=[0.62, 0.36, 0.02]),
+        "Edad": rng.choice(EDADES, filas, p=[0.05, 0.52, 0.28, 0.1, 0.05])
+    }
+
+def _valoraciones(satisfaccion, rng, vacias):
+    # Valoración de 1 a 10 centrada en la satisfacción de cada residente
+    desplazamiento = rng.normal(0, 0.8)
+    valores = np.clip(np.rint(satisfaccion + desplazamiento + rng.normal(0, 1.3, len(satisfaccion))), 1, 10)
+    valores[rng.random(len(valores)) < vacias] = np.nan
+    return valores
+
+def _recuentos(filas, rng, vacias):
+    valores = rng.poisson(rng.uniform(0.5, 6), filas).astype(float)
+    valores[rng.random(filas) < vacias] = np.nan
+    return valores
+
+def _si_no(satisfaccion, rng, vacias):
+    prob_si = 1 / (1 + np.exp(-(satisfaccion - 6.5 + rng.normal(0, 1))))
+    azar = rng.random(len(satisfaccion))
+    valores = np.where(azar < prob_si * 0.95, "Sí", np.where(azar < 0.95, "No", "No sabe/No contesta")).astype(object)
+    valores[rng.random(len(valores)) < vacias] = None
+    return valores
+
+def _seleccion_multiple(filas, opciones, rng, vacias, combinaciones=200):
+    # Se generan combinaciones distintas y se reparten con frecuencias desiguales;
+    # el formato es el de los formularios exportados: opciones separadas por ';'
+    pool = []
+    for _ in range(combinaciones):
+        elegidas = rng.choice(opciones, rng.integers(1, 4), replace=False)
+        pool.append(";".join(sorted(elegidas)) + ";")
+    pool = np.array(pool, dtype=object)
+    valores = pool[rng.choice(len(pool), filas, p=_probabilidades_desiguales(len(pool), rng))]
+    valores[rng.random(filas) < vacias] = None
+    return valores
+
+def _comentario(rng):
+    frases = []
+    for _ in range(rng.integers(1, 4)):
+        frases.append(
+            f"{rng.choice(SUJETOS_COMENTARIO)} {rng.choice(VALORACIONES_COMENTARIO)}{rng.choice(AÑADIDOS_COMENTARIO)}."
+        )
+    return " ".join(frases)
+
+def _comentarios(filas, rng, vacias, distintos=3000):
+    pool = np.array(
+        COMENTARIOS_BREVES + [_comentario(rng) for _ in range(min(distintos, max(filas, 50)))],
+        dtype=object
+    )
+    valores = pool[rng.choice(len(pool), filas, p=_probabilidades_desiguales(len(pool), rng, 0.7))]
+    valores[rng.random(filas) < vacias] = None
+    return valores
+
+def generar_encuesta(filas, semilla=0):
+    """
+    Genera un DataFrame de 'filas' respuestas con las columnas de referencia
+    y todas las preguntas de la encuesta.
+    """
+    rng = np.random.default_rng(semilla)
+    datos = _columnas_referencia(filas, rng)
+
+    # Satisfacción latente de cada residente: media del hospital más variación individual
+    efecto_hospital = dict(zip(HOSPITALES, rng.normal(0, 0.7, len(HOSPITALES))))
+    satisfaccion = 6.8 + pd.Series(datos["Hospital"]).map(efecto_hospital).to_numpy() + rng.normal(0, 1.2, filas)
+
+    for pregunta in preguntas_encuesta():
+        vacias = rng.uniform(0.03, 0.15)
+        if es_pregunta_de_comentario(pregunta):
+            datos[pregunta] = _comentarios(filas, rng, vacias=rng.uniform(0.55, 0.85))
+        elif es_pregunta_de_seleccion_multiple(pregunta):
+            opciones = OPCIONES_VIAS if "vía" in pregunta else OPCIONES_CRITERIOS
+            datos[pregunta] = _seleccion_multiple(filas, opciones, rng, vacias)
+        elif pregunta in PREGUNTAS_CUANTITATIVAS and _es_recuento(pregunta):
+            datos[pregunta] = _recuentos(filas, rng, vacias)
+        elif pregunta in PREGUNTAS_CUANTITATIVAS and pregunta not in PREGUNTAS_CUALITATIVAS:
+            valores = _valoraciones(satisfaccion, rng, vacias)
+            if pregunta.startswith("Si ha superado el primer año"):
+                valores[datos["Año de residencia"] == "R1"] = np.nan
+            datos[pregunta] = valores
+        else:
+            datos[pregunta] = _si_no(satisfaccion, rng, vacias)
+
+    return pd.DataFrame(datos)
+
+def escribir_libros(df, carpeta, libros=4, prefijo="encuesta"):
+    """
+    Reparte las respuestas en 'libros' archivos .xlsx (por hospitales, como
+    las exportaciones de cada centro) y devuelve sus rutas.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    hospitales = df["Hospital"].unique().tolist()
+    grupos = np.array_split(np.arange(len(hospitales)), min(libros, len(hospitales)))
+    rutas = []
+    for i, indices in enumerate(grupos, start=1):
+        seleccion = df[df["Hospital"].isin([hospitales[j] for j in indices])]
+        ruta = os.path.join(carpeta, f"{prefijo}_{i}.xlsx")
+        seleccion.to_excel(ruta, index=False)
+        rutas.append(ruta)
+    return rutas
+
+def obtener_libros(filas, carpeta, libros=4, semilla=0):
+    """
+    Devuelve los libros sintéticos de 'filas' respuestas, generándolos solo
+    si no existen ya en 'carpeta' (escribir 100.000 filas en .xlsx es lento).
+    """
+    prefijo = f"encuesta_{filas}_{semilla}"
+    rutas = [os.path.join(carpeta, f"{prefijo}_{i}.xlsx") for i in range(1, libros + 1)]
+    if all(os.path.exists(ruta) for ruta in rutas):
+        return rutas
+    return escribir_libros(generar_encuesta(filas, semilla), carpeta, libros, prefijo)
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    carpeta = sys.argv[2] if len(sys.argv) > 2 else "datos_sinteticos"
+    libros = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    rutas = escribir_libros(generar_encuesta(filas), carpeta, libros, prefijo=f"encuesta_{filas}")
+    for ruta in rutas:
+        print(ruta)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# /benchmarks/suite.py
+#
+# Suite de rendimiento de la aplicación completa sobre encuestas sintéticas
+# (benchmarks/datos_sinteticos.py) de varios tamaños. Mide cada etapa con
+# las cachés vacías, es decir, el coste de la primera vez que se abre un
+# archivo: fusión de los Excel, esquema de tipos, análisis cuantitativo y
+# cualitativo, agrupación de comentarios duplicados, frases clave,
+# sentimiento, índice y búsqueda de comentarios, filtro global por unidades
+# (en frío y al volver a unidades ya analizadas), tablas del comparador
+# (groupby original y cubo), matriz de significación y las dos
+# exportaciones a Word.
+#
+# Los resultados se guardan en JSON (benchmarks/resultados/) junto con el
+# commit y el entorno, y pueden compararse con los de una versión anterior.
+# Uso, desde la raíz del repositorio:
+#     python -m benchmarks.suite [--tamanos 1000 10000 100000] [--repeticiones N]
+#                                [--salida archivo.json] [--comparar anterior.json]
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import warnings
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.datos_sinteticos import obtener_libros
+from modulos import procesamiento_texto, tablas_cruzadas, seleccion_multiple, duplicados_texto, indice_comentarios, filtros
+from modulos.frases_clave import extraer_frases
+from modulos.sentimiento import puntuar_comentarios
+from modulos.cache_resultados import cache_resultados
+from modulos.esquema_datos import aplicar_esquema, es_pregunta_de_comentario
+from modulos.preguntas import obtener_preguntas_cuantitativas, obtener_preguntas_cualitativas
+from modulos.fusion_datos import fusionar_archivos
+from modulos.analisis_cuantitativo import calcular_analisis_cuantitativo, exportar_a_word
+from modulos.analisis_cualitativo import calcular_analisis_cualitativo, exportar_analisis_cualitativo_a_word
+from modulos.tablas_cruzadas import CuboTablasCruzadas
+from modulos.significacion import calcular_matriz_significacion
+
+DIRECTORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRECTORIO_RESULTADOS = os.path.join(DIRECTORIO_RAIZ, "benchmarks", "resultados")
+TAMANOS_POR_DEFECTO = [1000, 10_000, 100_000]
+# Una etapa se marca como regresión si tarda más de este factor respecto a la referencia
+UMBRAL_REGRESION = 1.2
+# Búsquedas que se miden sobre el índice de comentarios
+CONSULTAS_BUSQUEDA = ["guardias", "tutor", '"carga asistencial"', 'tutor "poco tiempo"', "de"]
+# Unidades que se vuelven a analizar con el filtro global (la primera vez la domina dibujar los gráficos)
+UNIDADES_REVISITA = 3
+
+def _vaciar_caches():
+    # Sin resultados, tokens ni cubos de ejecuciones anteriores: cada medida es en frío
+    cache_resultados.vaciar()
+    with procesamiento_texto._bloqueo_cache:
+        procesamiento_texto._cache_tokens.clear()
+    with tablas_cruzadas._bloqueo_cache:
+        tablas_cruzadas._cache_cubos.clear()
+    with seleccion_multiple._bloqueo_cache:
+        seleccion_multiple._cache_indicadores.clear()
+    with duplicados_texto._bloqueo_cache:
+        duplicados_texto._cache_duplicados.clear()
+    with indice_comentarios._bloqueo_cache:
+        indice_comentarios._cache_indices.clear()
+    with filtros._bloqueo_cache:
+        filtros._cache_codigos.clear()
+        filtros._cache_mascaras.clear()
+        filtros._cache_vistas.clear()
+
+def medir(funcion, repeticiones=1, preparar=None):
+    """
+    Ejecuta 'funcion' varias veces (llamando antes a 'preparar' y vaciando las
+    cachés) y devuelve el menor tiempo y el último resultado.
+    """
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        _vaciar_caches()
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+def comparador_groupby(df, referencias, preguntas):
+    """
+    Tablas del comparador calculadas como en la versión original: un groupby
+    por cada par de columna de referencia y pregunta.
+    """
+    return {
+        (referencia, pregunta): df.groupby([referencia, pregunta], observed=True).size().unstack(fill_value=0)
+        for referencia in referencias for pregunta in preguntas
+    }
+
+def comparador_cubo(df, referencias, preguntas):
+    """
+    Las mismas tablas con el cubo de tablas cruzadas, partiendo de cero.
+    """
+    cubo = CuboTablasCruzadas(df)
+    cubo.precalcular(referencias, preguntas)
+    return cubo
+
+def filtrar_unidades(df, referencia, maximo=None):
+    """
+    Vista del filtro global para cada valor de una columna de referencia
+    (para los 'maximo' primeros, si se indica).
+    """
+    return [
+        filtros.aplicar_filtro(df, filtros.crear_filtro({referencia: [valor]}))
+        for valor in filtros.valores_columna(df, referencia)[:maximo]
+    ]
+
+def analizar_unidades(df, referencia, preguntas):
+    """
+    Análisis cuantitativo de las primeras UNIDADES_REVISITA unidades de una
+    columna de referencia, como al recorrerlas una a una en la aplicación.
+    """
+    return [
+        calcular_analisis_cuantitativo(vista, preguntas)
+        for vista in filtrar_unidades(df, referencia, UNIDADES_REVISITA)
+    ]
+
+def medir_tamano(filas, carpeta_libros, repeticiones):
+    """
+    Mide todas las etapas sobre una encuesta de 'filas' respuestas y devuelve
+    un diccionario etapa -> segundos.
+    """
+    rutas = obtener_libros(filas, carpeta_libros)
+    tiempos = {}
+
+    # Cada fusión parte de una carpeta de datos vacía para no reutilizar la copia guardada
+    tiempos["ingesta"], (df, _) = medir(
+        lambda: fusionar_archivos(rutas),
+        repeticiones,
+        preparar=lambda: shutil.rmtree("data", ignore_errors=True)
+    )
+    tiempos["esquema"], (df, _) = medir(lambda: aplicar_esquema(df), repeticiones)
+
+    preguntas_cuantitativas = obtener_preguntas_cuantitativas(df)
+    preguntas_cualitativas = obtener_preguntas_cualitativas(df)
+    tiempos["analisis_cuantitativo"], resultados_cuantitativos = medir(
+        lambda: calcular_analisis_cuantitativo(df, preguntas_cuantitativas), repeticiones
+    )
+    tiempos["analisis_cualitativo"], resultados_cualitativos = medir(
+        lambda: calcular_analisis_cualitativo(df, preguntas_cualitativas), repeticiones
+    )
+    # Filtro global por cada hospital y vuelta a unidades ya analizadas
+    referencia_unidades = df.columns[0]
+    tiempos["filtro_global"], _ = medir(lambda: filtrar_unidades(df, referencia_unidades), repeticiones)
+    tiempos["filtro_global_revisita"], _ = medir(
+        lambda: analizar_unidades(df, referencia_unidades, preguntas_cuantitativas),
+        repeticiones,
+        preparar=lambda: analizar_unidades(df, referencia_unidades, preguntas_cuantitativas)
+    )
+    # Agrupación de duplicados sola, con los comentarios ya tokenizados
+    preguntas_comentario = [p for p in preguntas_cualitativas if es_pregunta_de_comentario(p)]
+    tiempos["duplicados_comentarios"], _ = medir(
+        lambda: [duplicados_texto.obtener_duplicados(df[p]) for p in preguntas_comentario],
+        repeticiones,
+        preparar=lambda: [procesamiento_texto.obtener_tokens_columna(df[p]) for p in preguntas_comentario]
+    )
+    tiempos["frases_clave"], _ = medir(
+        lambda: [extraer_frases(procesamiento_texto.obtener_tokens_columna(df[p])) for p in preguntas_comentario],
+        repeticiones,
+        preparar=lambda: [procesamiento_texto.obtener_tokens_columna(df[p]) for p in preguntas_comentario]
+    )
+    tiempos["sentimiento"], _ = medir(
+        lambda: [puntuar_comentarios(procesamiento_texto.obtener_tokens_columna(df[p])) for p in preguntas_comentario],
+        repeticiones,
+        preparar=lambda: [procesamiento_texto.obtener_tokens_columna(df[p]) for p in preguntas_comentario]
+    )
+    # Índice de comentarios (sin guardarlo en disco) y un juego de búsquedas sobre él
+    tiempos["indice_comentarios"], indice = medir(
+        lambda: indice_comentarios.construir_indice(df, preguntas_comentario), repeticiones
+    )
+    tiempos["busqueda_comentarios"], _ = medir(
+        lambda: [indice.buscar(consulta) for consulta in CONSULTAS_BUSQUEDA], repeticiones
+    )
+
+    referencias = df.columns[:5].tolist()
+    preguntas_comparador = df.columns[5:].tolist()
+    tiempos["comparador_groupby"], _ = medir(
+        lambda: comparador_groupby(df, referencias, preguntas_comparador), repeticiones
+    )
+    tiempos["comparador_cubo"], _ = medir(
+        lambda: comparador_cubo(df, referencias, preguntas_comparador), repeticiones
+    )
+    preguntas_categoricas = [p for p in preguntas_cualitativas if not es_pregunta_de_comentario(p)]
+    tiempos["matriz_significacion"], _ = medir(
+        lambda: calcular_matriz_significacion(df, referencias, preguntas_categoricas, preguntas_cuantitativas),
+        repeticiones
+    )
+
+    tiempos["exportacion_cuantitativa"], _ = medir(lambda: exportar_a_word(resultados_cuantitativos), repeticiones)
+    tiempos["exportacion_cualitativa"], _ = medir(
+        lambda: exportar_analisis_cualitativo_a_word(resultados_cualitativos), repeticiones
+    )
+    return {"filas": len(df), "columnas": df.shape[1], "tiempos": tiempos}
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=DIRECTORIO_RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def comparar_resultados(actual, anterior, umbral=UMBRAL_REGRESION):
+    """
+    Compara dos ejecuciones de la suite y devuelve una fila por tamaño y etapa
+    presentes en ambas: (filas, etapa, segundos antes, segundos ahora, cociente, regresión).
+    """
+    filas_comparacion = []
+    for tamano, medida in actual["tamanos"].items():
+        medida_anterior = anterior.get("tamanos", {}).get(tamano)
+        if medida_anterior is None:
+            continue
+        for etapa, segundos in medida["tiempos"].items():
+            antes = medida_anterior["tiempos"].get(etapa)
+            if not antes:
+                continue
+            cociente = segundos / antes
+            filas_comparacion.append((int(tamano), etapa, antes, segundos, cociente, cociente > umbral))
+    return filas_comparacion
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Suite de rendimiento sobre encuestas sintéticas.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_POR_DEFECTO,
+                        help="Número de respuestas de cada encuesta sintética.")
+    parser.add_argument("--repeticiones", type=int, default=1,
+                        help="Repeticiones por etapa; se guarda el menor tiempo.")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, en benchmarks/resultados/).")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar.")
+    parser.add_argument("--libros", default=os.path.join(tempfile.gettempdir(), "encuestas_sinteticas"),
+                        help="Carpeta donde se guardan y reutilizan los libros sintéticos.")
+    args = parser.parse_args(argumentos)
+
+    # Fuera de la aplicación los avisos de Streamlit sin contexto de ejecución no aportan nada
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    # Ni los avisos de obsolescencia de seaborn, también en los procesos trabajadores
+    warnings.filterwarnings("ignore", category=FutureWarning)
+    os.environ.setdefault("PYTHONWARNINGS", "ignore::FutureWarning")
+    carpeta_libros = os.path.abspath(args.libros)
+    salida = args.salida or os.path.join(
+        DIRECTORIO_RESULTADOS, f"suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    salida = os.path.abspath(salida)
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "procesadores": os.cpu_count(),
+        "repeticiones": args.repeticiones,
+        "tamanos": {}
+    }
+
+    # La fusión escribe en data/: se trabaja en una carpeta temporal para no tocar la del repositorio
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio_trabajo:
+        os.chdir(directorio_trabajo)
+        try:
+            for filas in args.tamanos:
+                print(f"Encuesta de {filas} respuestas...")
+                medida = medir_tamano(filas, carpeta_libros, args.repeticiones)
+                resultado["tamanos"][str(filas)] = medida
+                for etapa, segundos in medida["tiempos"].items():
+                    print(f"  {etapa:<26} {segundos:8.3f} s")
+        finally:
+            os.chdir(directorio_original)
+
+    os.makedirs(os.path.dirname(salida), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        print(f"\nComparación con {args.comparar} (commit {anterior.get('commit')}):")
+        regresiones = 0
+        for filas, etapa, antes, ahora, cociente, regresion in comparar_resultados(resultado, anterior):
+            marca = "  REGRESIÓN" if regresion else ""
+            print(f"  {filas:>7} {etapa:<26} {antes:8.3f} s -> {ahora:8.3f} s  x{cociente:.2f}{marca}")
+            regresiones += regresion
+        return 1 if regresiones else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
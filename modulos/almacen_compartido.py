@@ -0,0 +1,162 @@
+# /modulos/almacen_compartido.py
+
+import os
+import time
+import threading
+from modulos.almacen_datos import cargar_dataset, hash_almacenado, heredar_identidad, marcar_solo_lectura
+from modulos.esquema_datos import aplicar_esquema
+
+# Almacén de datasets compartido por todas las sesiones del proceso.
+# Cada dataset (identificado por el hash de su contenido) se lee de su copia
+# Arrow mapeada en memoria y se tipa una sola vez; las sesiones reciben
+# copias superficiales del mismo DataFrame tipado en lugar de su propia
+# copia. El DataFrame compartido es el resultado de aplicar_esquema y está
+# en memoria del proceso: solo las columnas que el tipado deja como estaban
+# siguen apoyadas en los búferes mapeados. Cada sesión que usa un dataset
+# tiene un arrendamiento que se renueva en cada ejecución del script: los
+# datasets sin arrendamientos activos se expulsan y, si una sesión vuelve,
+# se recargan del disco.
+#
+# Los arrays del DataFrame compartido se marcan de solo lectura (ver
+# marcar_solo_lectura): una sesión puede añadir o sustituir columnas en su
+# copia, pero una escritura en el sitio lanza un error en lugar de cambiar
+# los datos de las demás. No depende de activar copy-on-write en pandas.
+#
+# Este módulo no importa streamlit.
+
+# Segundos sin renovar un arrendamiento tras los que se considera que la
+# sesión ya no usa el dataset. Puede fijarse con INACTIVIDAD_ALMACEN_S.
+INACTIVIDAD_ALMACEN_S = float(os.environ.get("INACTIVIDAD_ALMACEN_S", "1800"))
+
+class AlmacenCompartido:
+    """
+    Datasets tipados compartidos entre sesiones, con recuento de referencias
+    por arrendamientos y expulsión de los que quedan inactivos.
+    """
+
+    def __init__(self, inactividad_maxima):
+        self.inactividad_maxima = inactividad_maxima
+        self._datasets = {}  # hash -> {"df", "resumen", "memoria", "arrendamientos": {sesion: instante}}
+        self._cargas = {}    # hash -> bloqueo para que dos sesiones no carguen el mismo dataset a la vez
+        self._sustituciones = {}  # hash antiguo -> hash de la versión que lo sustituye
+        self._bloqueo = threading.Lock()
+        self.cargas = 0
+        self.reutilizaciones = 0
+        self.expulsiones = 0
+
+    def _expulsar_inactivos(self, ahora):
+        for hash_dataset, entrada in list(self._datasets.items()):
+            arrendamientos = entrada["arrendamientos"]
+            for sesion, instante in list(arrendamientos.items()):
+                if ahora - instante > self.inactividad_maxima:
+                    del arrendamientos[sesion]
+            if not arrendamientos:
+                del self._datasets[hash_dataset]
+                self.expulsiones += 1
+
+    def _resolver(self, hash_dataset):
+        while hash_dataset in self._sustituciones:
+            hash_dataset = self._sustituciones[hash_dataset]
+        return hash_dataset
+
+    def _vista(self, entrada):
+        return heredar_identidad(entrada["df"].copy(deep=False), entrada["df"]), entrada["resumen"]
+
+    def adquirir(self, hash_dataset, sesion, df=None):
+        """
+        Devuelve (vista, resumen del esquema) del dataset para una sesión y
+        renueva su arrendamiento. Si el dataset se ha sustituido por una versión
+        nueva se devuelve la nueva. Si no está en memoria se tipa 'df' (si se
+        pasa) o se carga del disco. Devuelve (None, None) si el dataset ya no existe.
+        """
+        ahora = time.monotonic()
+        with self._bloqueo:
+            hash_dataset = self._resolver(hash_dataset)
+            entrada = self._datasets.get(hash_dataset)
+            if entrada is not None:
+                if sesion not in entrada["arrendamientos"]:
+                    self.reutilizaciones += 1
+                entrada["arrendamientos"][sesion] = ahora
+                return self._vista(entrada)
+            bloqueo_carga = self._cargas.setdefault(hash_dataset, threading.Lock())
+
+        try:
+            with bloqueo_carga:
+                # Otra sesión puede haberlo cargado mientras se esperaba
+                with self._bloqueo:
+                    entrada = self._datasets.get(hash_dataset)
+                    if entrada is not None:
+                        entrada["arrendamientos"][sesion] = time.monotonic()
+                        self.reutilizaciones += 1
+                        return self._vista(entrada)
+
+                if df is None or hash_almacenado(df) != hash_dataset:
+                    df = cargar_dataset(hash_dataset)
+                    if df is None:
+                        return None, None
+                df_tipado, resumen = aplicar_esquema(df)
+                marcar_solo_lectura(df_tipado)
+                del df
+                entrada = {
+                    "df": df_tipado,
+                    "resumen": resumen,
+                    "memoria": resumen["memoria_despues"],
+                    "arrendamientos": {sesion: time.monotonic()}
+                }
+                with self._bloqueo:
+                    self._datasets[hash_dataset] = entrada
+                    self.cargas += 1
+                    self._expulsar_inactivos(time.monotonic())
+                return self._vista(entrada)
+        finally:
+            # La carga termina (bien, sin dataset o con un error): su cerrojo ya no hace falta
+            with self._bloqueo:
+                if self._cargas.get(hash_dataset) is bloqueo_carga:
+                    del self._cargas[hash_dataset]
+
+    def liberar(self, hash_dataset, sesion):
+        """
+        Termina el arrendamiento de una sesión; si era el último, el dataset
+        sale de memoria.
+        """
+        with self._bloqueo:
+            entrada = self._datasets.get(hash_dataset)
+            if entrada is None:
+                return
+            entrada["arrendamientos"].pop(sesion, None)
+            if not entrada["arrendamientos"]:
+                del self._datasets[hash_dataset]
+                self.expulsiones += 1
+
+    def sustituir(self, hash_antiguo, hash_nuevo):
+        """
+        Registra que un dataset ha sido sustituido por una versión nueva: se
+        descarta de memoria y las sesiones que lo usaban reciben la nueva
+        versión la próxima vez que lo pidan.
+        """
+        with self._bloqueo:
+            self._sustituciones[hash_antiguo] = hash_nuevo
+            if self._datasets.pop(hash_antiguo, None) is not None:
+                self.expulsiones += 1
+
+    def expulsar_inactivos(self):
+        with self._bloqueo:
+            self._expulsar_inactivos(time.monotonic())
+
+    def huella(self):
+        """
+        Ocupación del almacén: datasets en memoria, memoria total y sesiones
+        que los usan, para mostrarla en la interfaz.
+        """
+        with self._bloqueo:
+            return {
+                "datasets": len(self._datasets),
+                "memoria_mb": sum(entrada["memoria"] for entrada in self._datasets.values()) / 1024**2,
+                "arrendamientos": sum(len(entrada["arrendamientos"]) for entrada in self._datasets.values()),
+                "cargas": self.cargas,
+                "reutilizaciones": self.reutilizaciones,
+                "expulsiones": self.expulsiones
+            }
+
+# Almacén único del proceso, compartido por todas las sesiones
+almacen_compartido = AlmacenCompartido(inactividad_maxima=INACTIVIDAD_ALMACEN_S)
@@ -0,0 +1,287 @@
+# /modulos/almacen_datos.py
+
+import os
+import json
+import hashlib
+import weakref
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+
+# Copias columnares (Arrow IPC/Feather) de los datasets ya procesados,
+# direccionadas por el hash del contenido de los archivos subidos.
+DIRECTORIO_DATOS = "data"
+DIRECTORIO_CACHE = os.path.join(DIRECTORIO_DATOS, "cache")
+RUTA_INDICE = os.path.join(DIRECTORIO_DATOS, "indice_fusiones.json")
+
+_bloqueo_indice = threading.Lock()
+
+# Identidad de los DataFrames cuyo contenido es exactamente el de un dataset
+# guardado (o el de una vista filtrada de uno): id del objeto -> (referencia
+# débil, identidad). El hash también se guarda en attrs, pero pandas copia
+# attrs a cualquier DataFrame derivado (copy, assign, fillna...), así que
+# attrs no basta para saber que el contenido no ha cambiado: solo se confía
+# en los objetos registrados aquí. La entrada desaparece con el objeto.
+_identidades = {}
+
+def calcular_hash_contenidos(contenidos, modo):
+    """
+    Calcula un hash estable a partir de los bytes de los archivos subidos.
+    El modo ('fusion' o 'archivo') distingue procesamientos distintos de los
+    mismos bytes; el orden de los archivos forma parte del hash.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(modo.encode("utf-8"))
+    for contenido in contenidos:
+        h.update(len(contenido).to_bytes(8, "little"))
+        h.update(contenido)
+    return h.hexdigest()
+
+def ruta_dataset(hash_dataset):
+    """
+    Devuelve la ruta de la copia columnar de un dataset.
+    """
+    return os.path.join(DIRECTORIO_CACHE, f"{hash_dataset}.arrow")
+
+def ruta_indice_comentarios(hash_dataset):
+    """
+    Devuelve la ruta del índice de comentarios de un dataset, junto a su copia columnar.
+    """
+    return os.path.join(DIRECTORIO_CACHE, f"{hash_dataset}.indice.npz")
+
+_TIPOS_COMPATIBLES_ARROW = {
+    "string", "empty", "boolean", "bytes", "integer", "floating",
+    "mixed-integer-float", "decimal", "datetime", "datetime64", "date", "time"
+}
+
+def preparar_para_arrow(df):
+    """
+    Adapta el DataFrame a lo que admite Arrow: nombres de columna de texto,
+    índice por defecto y columnas 'object' con tipos mezclados convertidas a texto.
+    """
+    df = df.reset_index(drop=True)
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object:
+            tipo = pd.api.types.infer_dtype(df[col], skipna=True)
+            if tipo not in _TIPOS_COMPATIBLES_ARROW:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+def guardar_dataset(hash_dataset, df):
+    """
+    Guarda la copia columnar del dataset. La escritura es atómica para que
+    otra sesión nunca lea un archivo a medio escribir.
+    """
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    ruta = ruta_dataset(hash_dataset)
+    ruta_temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Sin compresión: la lectura es más rápida y el archivo puede mapearse en memoria
+    preparar_para_arrow(df).to_feather(ruta_temporal, compression="uncompressed")
+    os.replace(ruta_temporal, ruta)
+    return ruta
+
+def cargar_dataset(hash_dataset):
+    """
+    Carga la copia columnar de un dataset, o devuelve None si no existe.
+    El archivo se mapea en memoria: Arrow lee sus búferes directamente del
+    archivo (compartidos por el sistema operativo entre procesos) y las
+    columnas numéricas sin nulos pasan a pandas sin copiarse.
+    """
+    ruta = ruta_dataset(hash_dataset)
+    if not os.path.exists(ruta):
+        return None
+    df = feather.read_table(ruta, memory_map=True).to_pandas()
+    df.attrs["hash_dataset"] = hash_dataset
+    df.attrs["filas_dataset"] = len(df)
+    return fijar_identidad(df, hash_dataset=hash_dataset)
+
+def fijar_identidad(df, **identidad):
+    """
+    Registra que el contenido de este objeto DataFrame (no el de sus copias)
+    corresponde a la identidad indicada: hash_dataset o hash_vista.
+    """
+    identificador = id(df)
+
+    def olvidar(referencia):
+        # Se llama al destruirse el objeto; puede ejecutarse durante la
+        # recolección de basura, así que no toma ningún bloqueo
+        entrada = _identidades.get(identificador)
+        if entrada is not None and entrada[0] is referencia:
+            _identidades.pop(identificador, None)
+
+    _identidades[identificador] = (weakref.ref(df, olvidar), dict(identidad))
+    return df
+
+def heredar_identidad(derivado, df):
+    """
+    Da a 'derivado' la identidad de 'df', si la tiene. Solo debe usarse
+    cuando 'derivado' tiene exactamente el mismo contenido (copia superficial,
+    tipado según el esquema).
+    """
+    entrada = _identidades.get(id(df))
+    if entrada is not None and entrada[0]() is df:
+        fijar_identidad(derivado, **entrada[1])
+    return derivado
+
+def _identidad(df, clave):
+    entrada = _identidades.get(id(df))
+    if entrada is None or entrada[0]() is not df:
+        return None
+    return entrada[1].get(clave)
+
+def marcar_solo_lectura(df):
+    """
+    Marca como de solo lectura los arrays de un DataFrame que se comparte
+    (entre sesiones o ejecuciones): una escritura en el sitio sobre él o
+    sobre una de sus copias superficiales lanza ValueError en lugar de
+    modificar los datos de todas. Añadir o sustituir columnas enteras en una
+    copia sigue estando permitido y no afecta al original.
+    """
+    # pandas no ofrece una forma pública de fijarlo: se recorren los bloques
+    for bloque in df._mgr.blocks:
+        valores = bloque.values
+        for array in (valores, *(getattr(valores, atributo, None) for atributo in ("_ndarray", "_codes", "_data", "_mask"))):
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+    return df
+
+def hash_almacenado(df):
+    """
+    Devuelve el hash con que se guardó el dataset, o None si el DataFrame no
+    es el objeto devuelto por cargar_dataset (o uno con su identidad heredada).
+    Los DataFrames derivados (subconjuntos, copias modificadas...) no lo
+    tienen aunque conserven attrs y el mismo número de filas.
+    """
+    hash_dataset = _identidad(df, "hash_dataset")
+    if hash_dataset is None or df.attrs.get("filas_dataset") != len(df):
+        return None
+    return hash_dataset
+
+def hash_vista(df):
+    """
+    Devuelve el identificador de una vista filtrada de un dataset guardado
+    (ver modulos/filtros.py), o None si el DataFrame no es esa vista. Como
+    en hash_almacenado, solo vale para el objeto registrado.
+    """
+    hash_filtrado = _identidad(df, "hash_vista")
+    if hash_filtrado is None or df.attrs.get("filas_vista") != len(df):
+        return None
+    return hash_filtrado
+
+def _leer_indice():
+    """
+    Lee el índice de fusiones. Si no existe, lo inicializa a partir de los
+    archivos fusionados que ya hubiera en la carpeta de datos (solo una vez).
+    """
+    if os.path.exists(RUTA_INDICE):
+        with open(RUTA_INDICE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    contadores = {}
+    if os.path.isdir(DIRECTORIO_DATOS):
+        for nombre in os.listdir(DIRECTORIO_DATOS):
+            partes = os.path.splitext(nombre)[0].split("_")
+            if len(partes) == 3 and partes[0] == "fusionado" and partes[2].isdigit():
+                contadores[partes[1]] = max(contadores.get(partes[1], 0), int(partes[2]))
+    return {"contadores": contadores, "fusiones": {}}
+
+def _escribir_indice(indice):
+    os.makedirs(DIRECTORIO_DATOS, exist_ok=True)
+    ruta_temporal = f"{RUTA_INDICE}.{os.getpid()}.tmp"
+    with open(ruta_temporal, "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False, indent=2)
+    os.replace(ruta_temporal, RUTA_INDICE)
+
+def reservar_nombre_fusion():
+    """
+    Reserva un nombre único 'fusionado_DDMMYY_N' usando el contador del día
+    guardado en el índice, sin recorrer la carpeta de datos.
+    """
+    hoy = datetime.now().strftime("%d%m%y")
+    with _bloqueo_indice:
+        indice = _leer_indice()
+        contador = indice["contadores"].get(hoy, 0) + 1
+        indice["contadores"][hoy] = contador
+        _escribir_indice(indice)
+    return f"fusionado_{hoy}_{contador}"
+
+def registrar_fusion(nombre, hash_dataset, log):
+    """
+    Registra una fusión en el índice para poder reabrirla más tarde.
+    """
+    with _bloqueo_indice:
+        indice = _leer_indice()
+        indice["fusiones"][nombre] = {
+            "hash": hash_dataset,
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "log": log
+        }
+        _escribir_indice(indice)
+
+def buscar_fusion_por_hash(hash_dataset):
+    """
+    Devuelve (nombre, datos) de la fusión registrada con ese hash, o (None, None).
+    """
+    with _bloqueo_indice:
+        indice = _leer_indice()
+    for nombre, datos in indice["fusiones"].items():
+        if datos["hash"] == hash_dataset:
+            return nombre, datos
+    return None, None
+
+def actualizar_fusion(nombre, hash_dataset, log):
+    """
+    Apunta una fusión registrada a una nueva versión de su dataset y
+    actualiza su log, conservando la fecha de creación.
+    """
+    with _bloqueo_indice:
+        indice = _leer_indice()
+        datos = indice["fusiones"][nombre]
+        datos["hash"] = hash_dataset
+        datos["actualizada"] = datetime.now().isoformat(timespec="seconds")
+        datos["log"] = log
+        _escribir_indice(indice)
+
+def eliminar_dataset(hash_dataset):
+    """
+    Borra la copia columnar de un dataset (y su índice de comentarios) si
+    ninguna fusión registrada la usa.
+    """
+    with _bloqueo_indice:
+        indice = _leer_indice()
+        if any(datos["hash"] == hash_dataset for datos in indice["fusiones"].values()):
+            return False
+        for ruta in (ruta_dataset(hash_dataset), ruta_indice_comentarios(hash_dataset)):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+    return True
+
+def listar_fusiones():
+    """
+    Devuelve las fusiones registradas cuya copia columnar sigue disponible,
+    de la más reciente a la más antigua.
+    """
+    with _bloqueo_indice:
+        indice = _leer_indice()
+    fusiones = [
+        (nombre, datos) for nombre, datos in indice["fusiones"].items()
+        if os.path.exists(ruta_dataset(datos["hash"]))
+    ]
+    return sorted(fusiones, key=lambda item: item[1]["fecha"], reverse=True)
+
+def cargar_fusion(nombre):
+    """
+    Carga una fusión registrada. Devuelve (DataFrame, log) o (None, None).
+    """
+    with _bloqueo_indice:
+        indice = _leer_indice()
+    datos = indice["fusiones"].get(nombre)
+    if datos is None:
+        return None, None
+    df = cargar_dataset(datos["hash"])
+    if df is None:
+        return None, None
+    return df, datos["log"]
@@ -1,204 +1,526 @@
 # /modulos/analisis_cualitativo.py
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from io import BytesIO
 from docx import Document
 from docx.shared import Inches
-from collections import Counter
-import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-
-# Descargar recursos de NLTK
-# Esta es la forma más robusta de asegurar que los recursos están disponibles
-# en entornos de despliegue como Streamlit Cloud.
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-
-def obtener_preguntas_cualitativas(df):
-    """
-    Identifica y devuelve las columnas con preguntas de tipo cualitativo.
-    """
-    columnas = df.columns.tolist()
-    # Las preguntas cualitativas son todas las que no están en las primeras 5 columnas
-    # ni son las preguntas de tipo cuantitativo
-    preguntas_cualitativas_lista = [
-        "Comentarios sobre la acogida e integración en el Servicio",
-        "¿Realiza tutorías estructuradas cada tres meses con su tutor/a?",
-        "¿Conoce los criterios que se aplican para evaluarle de forma continuada? - Informe de evaluación de las rotaciones",
-        "¿Qué criterios cree usted que se aplican para evaluarle de forma continuada? - Informe de evaluación de la rotaciones. Selección múltiple",
-        "¿Conoce los criterios que se aplican para realizar las evaluaciones anuales? - Informe de evaluación anual del tutor",
-        "¿Qué criterios cree usted que se aplican para evaluarle de forma anual? - Informe de evaluación anual del tutor. Selección múltiple",
-        "Comentarios sobre la tutorización",
-        "¿Dispone de un Libro de Residente?",
-        "¿Cómo valora la formación en ética y profesionalismo? - (Comentarios)",
-        "¿Cómo valora la planificación y desarrollo de la formación? - (Comentarios)",
-        "Comentarios sobre las sesiones clínicas, actividades de investigación y actividades formativas complementarias",
-        "Comentarios sobre competencias adquiridas",
-        "Comentarios sobre el cumplimiento del calendario y las rotaciones",
-        "Comentarios sobre las rotaciones internas",
-        "Comentarios sobre las guardias",
-        "¿La Unidad Docente le ha informado del Plan de Ayudas del SCS para las Rotaciones Externas?",
-        "Comentarios sobre las rotaciones externas",
-        "¿Conoce la existencia de la Comisión de Docencia de su Unidad Docente?",
-        "¿Conoce al vocal que representa a los residentes en la Comisión de Docencia?",
-        "¿Ha planteado alguna vez una queja, propuesta o sugerencia a la Comisión de Docencia?",
-        "Comentarios sobre la Comisión de Docencia",
-        "¿Le comunican los resultados de la encuesta anual de satisfacción de residentes de su hospital/CCAA?",
-        "¿A través de que vía se le comunican dichos resultados? Selección múltiple",
-        "Comentarios sobre la comunicación de resultados",
-        "Si tuviera que volver a elegir centro para realizar su residencia, ¿volvería a seleccionar este centro?",
-        "Comentarios sobre la valoración general",
-        "Comentarios de propuestas de mejora"
-    ]
-    
-    preguntas_en_df = [col for col in columnas if col in preguntas_cualitativas_lista]
-    
-    return preguntas_en_df
-
-def generar_analisis_cualitativo(df, preguntas_seleccionadas):
+from modulos.graficos import especificacion, renderizar_figuras
+from modulos.exportacion_word import agregar_tabla
+from modulos.preguntas import obtener_preguntas_cualitativas
+from modulos.procesamiento_texto import obtener_tokens_columna
+from modulos.duplicados_texto import obtener_duplicados, UMBRAL_SIMILITUD
+from modulos.frases_clave import extraer_frases, NUMERO_FRASES
+from modulos.sentimiento import puntuar_comentarios, distribucion_sentimiento, sentimiento_por_grupo
+from modulos.seleccion_multiple import obtener_indicadores
+from modulos.esquema_datos import es_pregunta_de_seleccion_multiple, NUMERO_COLUMNAS_REFERENCIA
+from modulos.indice_comentarios import obtener_indice, MAXIMO_RESULTADOS
+from modulos.prompts_ia import planificar_prompts, PRESUPUESTO_TOKENS_POR_DEFECTO, MAXIMO_FRAGMENTOS_POR_DEFECTO
+from modulos.cache_resultados import cache_resultados, clave_resultado, huella_pregunta
+from modulos.instrumentacion import instrumentacion
+
+# Palabras clave que se muestran por pregunta de comentarios
+NUMERO_PALABRAS_CLAVE = 10
+# Grupos de comentarios repetidos que se listan por pregunta
+NUMERO_GRUPOS_DUPLICADOS = 10
+# Frases clave por grupo cuando se desglosan por una columna de referencia
+NUMERO_FRASES_POR_GRUPO = 5
+
+def _frases_clave(df, pregunta, tokens_columna, duplicados, referencia):
     """
-    Realiza un análisis cualitativo y genera resultados para cada pregunta seleccionada.
+    Frases clave de una pregunta de comentarios (cada grupo de duplicados
+    cuenta una vez) y, si se indica 'referencia', las de cada valor de esa
+    columna (cada grupo de duplicados cuenta una vez en cada valor).
+    """
+    frases = extraer_frases(tokens_columna, seleccion=duplicados.representantes, numero_frases=NUMERO_FRASES)
+    frases = frases.drop(columns="grupo").rename(columns={"PMI": "PMI normalizada"})
+    if referencia is None:
+        return frases, None
+
+    codigos, valores = pd.factorize(df[referencia].iloc[tokens_columna.filas], sort=True)
+    # Primera respuesta de cada grupo de duplicados dentro de cada valor de la referencia
+    _, seleccion = np.unique(duplicados.grupos * (len(valores) + 1) + codigos + 1, return_index=True)
+    seleccion = seleccion[codigos[seleccion] >= 0]
+    por_grupo = extraer_frases(
+        tokens_columna, seleccion=np.sort(seleccion), codigos_grupo=codigos, n_grupos=len(valores),
+        numero_frases=NUMERO_FRASES_POR_GRUPO
+    )
+    por_grupo.insert(0, referencia, np.asarray(valores, dtype=object)[por_grupo.pop("grupo").to_numpy(dtype=np.int64)])
+    return frases, por_grupo.rename(columns={"PMI": "PMI normalizada"})
+
+def _sentimiento(df, tokens_columna):
+    """
+    Distribución del sentimiento de los comentarios de una pregunta y su
+    desglose por cada columna de referencia. Aquí cuenta cada comentario
+    (también los repetidos): es la opinión de cada residente.
+    """
+    puntuaciones = puntuar_comentarios(tokens_columna)
+    por_referencia = {}
+    for columna in df.columns[:NUMERO_COLUMNAS_REFERENCIA]:
+        codigos, valores = pd.factorize(df[columna].iloc[tokens_columna.filas], sort=True)
+        tabla = sentimiento_por_grupo(puntuaciones, codigos, valores)
+        por_referencia[columna] = tabla.rename_axis(columna).reset_index()
+    return distribucion_sentimiento(puntuaciones), round(float(puntuaciones.mean()), 3) if len(puntuaciones) else 0.0, por_referencia
+
+def calcular_analisis_cualitativo(df, preguntas_seleccionadas, paralelo=True, referencia=None):
+    """
+    Calcula el análisis cualitativo de las preguntas seleccionadas sin mostrar
+    nada: primero las tablas de todas las preguntas y después todos los
+    gráficos de una vez a PNG. Los resultados ya calculados para el mismo
+    contenido de columna se toman de la caché compartida entre sesiones.
+    'referencia' es la columna por la que se desglosan las frases clave de
+    los comentarios (None para no desglosarlas).
+    No usa streamlit, así que se puede ejecutar fuera de la aplicación.
     """
     resultados_analisis = []
+    nuevos = []
+    especificaciones = []
 
+    # 1. Cálculo de frecuencias y preparación de los gráficos
     for pregunta in preguntas_seleccionadas:
-        st.subheader(f"Análisis para la pregunta: {pregunta}")
-        
-        # Identificar si es una pregunta de comentario o categórica
-        if "comentarios" in pregunta.lower():
+        clave = clave_resultado(
+            "cualitativo", df, pregunta,
+            palabras_clave=NUMERO_PALABRAS_CLAVE, umbral_duplicados=UMBRAL_SIMILITUD,
+            referencia=referencia,
+            # El sentimiento se desglosa siempre por todas las columnas de referencia
+            huellas_referencia=tuple(huella_pregunta(df, columna) for columna in df.columns[:NUMERO_COLUMNAS_REFERENCIA])
+        )
+        resultado_cache = cache_resultados.obtener(clave)
+        if resultado_cache is not None:
+            resultados_analisis.append(resultado_cache)
+            continue
+
+        with instrumentacion.medir("analisis_cualitativo_pregunta", pregunta=pregunta, filas=len(df)):
+            # Identificar si es una pregunta de comentario o categórica
+            if "comentarios" in pregunta.lower():
+                # Tokenizar cada respuesta (o reutilizar los tokens ya calculados para esta columna)
+                tokens_columna = obtener_tokens_columna(df[pregunta])
+                # Los comentarios duplicados o casi duplicados cuentan una sola vez
+                duplicados = obtener_duplicados(df[pregunta])
+
+                # Codificación temática y conteo de frecuencias, sin palabras vacías
+                palabras_mas_comunes = tokens_columna.frecuencias(
+                    seleccion=duplicados.representantes
+                ).head(NUMERO_PALABRAS_CLAVE)
+                df_frecuencia = pd.DataFrame({
+                    'Palabra Clave': palabras_mas_comunes.index,
+                    'Frecuencia': palabras_mas_comunes.to_numpy()
+                })
+
+                especificaciones.append(especificacion(
+                    "barras",
+                    f'Top 10 palabras clave para "{pregunta}"',
+                    {"tabla": df_frecuencia, "x": 'Frecuencia', "y": 'Palabra Clave'},
+                    tamano=(10, 6)
+                ))
+                frases, frases_por_grupo = _frases_clave(df, pregunta, tokens_columna, duplicados, referencia)
+                sentimiento, puntuacion_media, sentimiento_por_referencia = _sentimiento(df, tokens_columna)
+                especificaciones.append(especificacion(
+                    "barras",
+                    f'Sentimiento de los comentarios de "{pregunta}"',
+                    {"tabla": sentimiento, "x": 'Sentimiento', "y": 'Comentarios'},
+                    tamano=(8, 5)
+                ))
+
+                # Los prompts de IA se construyen aparte, por fragmentos (ver mostrar_prompts_ia)
+                resultado = {
+                    "pregunta": pregunta,
+                    "tipo_analisis": "comentario",
+                    "df_frecuencia": df_frecuencia,
+                    "comentarios": duplicados.respuestas,
+                    "comentarios_distintos": duplicados.respuestas_distintas,
+                    "grupos_duplicados": duplicados.tabla_grupos(df[pregunta], NUMERO_GRUPOS_DUPLICADOS),
+                    "frases": frases,
+                    "frases_por_grupo": frases_por_grupo,
+                    "sentimiento": sentimiento,
+                    "puntuacion_sentimiento": puntuacion_media,
+                    "sentimiento_por_referencia": sentimiento_por_referencia
+                }
+
+            elif es_pregunta_de_seleccion_multiple(pregunta):
+                # Cada opción se cuenta por separado, no cada combinación de opciones
+                indicadores = obtener_indicadores(df[pregunta])
+                conteos = indicadores.frecuencias()
+                respuestas = indicadores.respuestas()
+                frecuencias = pd.DataFrame({
+                    'Opción': conteos.index,
+                    'Frecuencia Absoluta': conteos.to_numpy(),
+                    'Porcentaje de respuestas (%)': (conteos.to_numpy() / max(respuestas, 1) * 100).round(2)
+                })
+                # Solo las opciones elegidas, en el mismo orden que la tabla de frecuencias
+                coocurrencia = indicadores.coocurrencia().loc[conteos.index, conteos.index]
+
+                especificaciones.append(especificacion(
+                    "barras",
+                    f'Opciones elegidas en "{pregunta}"',
+                    {"tabla": frecuencias, "x": 'Frecuencia Absoluta', "y": 'Opción'},
+                    tamano=(10, 6)
+                ))
+
+                resultado = {
+                    "pregunta": pregunta,
+                    "tipo_analisis": "seleccion_multiple",
+                    "frecuencias": frecuencias,
+                    "coocurrencia": coocurrencia,
+                    "respuestas": respuestas
+                }
+
+            else:
+                # Contar frecuencias (las categorías sin respuestas no se muestran)
+                frecuencias = df[pregunta].value_counts()
+                frecuencias = frecuencias[frecuencias > 0].reset_index()
+                frecuencias.columns = ['Respuesta', 'Frecuencia Absoluta']
+                frecuencias['Respuesta'] = frecuencias['Respuesta'].astype(object)
+                frecuencias['Frecuencia Relativa (%)'] = (frecuencias['Frecuencia Absoluta'] / frecuencias['Frecuencia Absoluta'].sum() * 100).round(2)
+
+                especificaciones.append(especificacion(
+                    "barras",
+                    f'Frecuencia de respuestas para "{pregunta}"',
+                    {"tabla": frecuencias, "x": 'Respuesta', "y": 'Frecuencia Absoluta'},
+                    tamano=(10, 6)
+                ))
+                especificaciones.append(especificacion(
+                    "pastel",
+                    f'Distribución de respuestas para "{pregunta}"',
+                    {"valores": frecuencias['Frecuencia Absoluta'].tolist(), "etiquetas": frecuencias['Respuesta'].tolist()},
+                    tamano=(8, 8)
+                ))
+
+                resultado = {
+                    "pregunta": pregunta,
+                    "tipo_analisis": "categorico",
+                    "frecuencias": frecuencias
+                }
+
+        resultados_analisis.append(resultado)
+        nuevos.append((clave, resultado))
+
+    # 2. Dibujar todos los gráficos nuevos una sola vez (en paralelo si son muchos)
+    imagenes = iter(renderizar_figuras(especificaciones, paralelo=paralelo))
+    for clave, resultado in nuevos:
+        if resultado['tipo_analisis'] == "comentario":
+            resultado['imagen'] = next(imagenes)
+            resultado['imagen_sentimiento'] = next(imagenes)
+        elif resultado['tipo_analisis'] == "seleccion_multiple":
+            resultado['imagen_barra'] = next(imagenes)
+        else:
+            resultado['imagen_barra'] = next(imagenes)
+            resultado['imagen_pastel'] = next(imagenes)
+        cache_resultados.guardar(clave, resultado)
+
+    return resultados_analisis
+
+def mostrar_analisis_cualitativo(resultados_analisis):
+    """
+    Muestra en Streamlit los resultados de calcular_analisis_cualitativo.
+    """
+    for resultado in resultados_analisis:
+        st.subheader(f"Análisis para la pregunta: {resultado['pregunta']}")
+
+        if resultado['tipo_analisis'] == "comentario":
             st.markdown("### Análisis de Contenido (Pregunta de Texto Libre)")
-            
-            # Unir todo el texto de los comentarios en una sola cadena
-            texto_completo = " ".join(df[pregunta].dropna().astype(str).tolist())
-            
-            # Limpiar y tokenizar el texto
-            palabras = word_tokenize(texto_completo.lower(), language='spanish')
-            stop_words = set(stopwords.words('spanish'))
-            palabras_limpias = [palabra for palabra in palabras if palabra.isalnum() and palabra not in stop_words]
-            
-            # Codificación temática y conteo de frecuencias
-            frecuencia_palabras = Counter(palabras_limpias)
-            palabras_mas_comunes = frecuencia_palabras.most_common(10)
-            
+            st.write(
+                f"Comentarios: {resultado['comentarios']}; distintos tras agrupar los duplicados "
+                f"y casi duplicados: {resultado['comentarios_distintos']}. Cada grupo cuenta una sola vez."
+            )
             st.write("Frecuencia de palabras clave:")
-            df_frecuencia = pd.DataFrame(palabras_mas_comunes, columns=['Palabra Clave', 'Frecuencia'])
-            st.dataframe(df_frecuencia)
-
-            # Visualización
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sns.barplot(x='Frecuencia', y='Palabra Clave', data=df_frecuencia, ax=ax, palette='viridis')
-            ax.set_title(f'Top 10 palabras clave para "{pregunta}"')
-            st.pyplot(fig)
-            plt.close(fig)
-
-            # Generar el prompt para la IA
-            prompt = f"Analiza los siguientes comentarios de una encuesta de satisfacción:\n\n{texto_completo}\n\nIdentifica las 5 categorías temáticas más relevantes, el sentimiento general de cada categoría (positivo, negativo, neutro) y extrae las 3 frases más representativas para cada una. Después, resume brevemente los hallazgos principales de este análisis."
-            
-            resultados_analisis.append({
-                "pregunta": pregunta,
-                "tipo_analisis": "comentario",
-                "df_frecuencia": df_frecuencia,
-                "figura": fig,
-                "prompt": prompt
-            })
-
+            st.dataframe(resultado['df_frecuencia'])
+            st.image(resultado['imagen'])
+            st.write("Frases clave (palabras que aparecen juntas más de lo esperable):")
+            st.dataframe(resultado['frases'], hide_index=True)
+            if resultado['frases_por_grupo'] is not None:
+                referencia = resultado['frases_por_grupo'].columns[0]
+                with st.expander(f"Frases clave por {referencia}"):
+                    st.dataframe(resultado['frases_por_grupo'], hide_index=True)
+            st.write(
+                "Sentimiento de los comentarios (léxico de polaridad con negaciones; "
+                f"puntuación media entre -1 y 1: {resultado['puntuacion_sentimiento']}):"
+            )
+            st.dataframe(resultado['sentimiento'], hide_index=True)
+            st.image(resultado['imagen_sentimiento'])
+            for columna, tabla in resultado['sentimiento_por_referencia'].items():
+                with st.expander(f"Sentimiento por {columna}"):
+                    st.dataframe(tabla, hide_index=True)
+            if not resultado['grupos_duplicados'].empty:
+                with st.expander("Comentarios repetidos"):
+                    st.dataframe(resultado['grupos_duplicados'], hide_index=True)
+        elif resultado['tipo_analisis'] == "seleccion_multiple":
+            st.markdown("### Análisis de Opciones (Pregunta de Selección Múltiple)")
+            st.write(
+                f"Respuestas con al menos una opción: {resultado['respuestas']}. "
+                "Cada residente puede elegir varias opciones, por lo que los porcentajes suman más de 100%."
+            )
+            st.dataframe(resultado['frecuencias'])
+            st.image(resultado['imagen_barra'])
+            st.write("Opciones elegidas a la vez (número de respuestas que incluyen ambas):")
+            st.dataframe(resultado['coocurrencia'])
         else:
             st.markdown("### Análisis de Frecuencias (Pregunta Categórica)")
-            
-            # Contar frecuencias
-            frecuencias = df[pregunta].value_counts().reset_index()
-            frecuencias.columns = ['Respuesta', 'Frecuencia Absoluta']
-            frecuencias['Frecuencia Relativa (%)'] = (frecuencias['Frecuencia Absoluta'] / frecuencias['Frecuencia Absoluta'].sum() * 100).round(2)
-            
-            st.dataframe(frecuencias)
-            
-            # Gráficos
-            fig1, ax1 = plt.subplots(figsize=(10, 6))
-            sns.barplot(x='Respuesta', y='Frecuencia Absoluta', data=frecuencias, ax=ax1, palette='viridis')
-            ax1.set_title(f'Frecuencia de respuestas para "{pregunta}"')
-            st.pyplot(fig1)
-            plt.close(fig1)
-            
-            fig2, ax2 = plt.subplots(figsize=(8, 8))
-            ax2.pie(frecuencias['Frecuencia Absoluta'], labels=frecuencias['Respuesta'], autopct='%1.1f%%', startangle=90, colors=sns.color_palette('pastel'))
-            ax2.axis('equal')
-            ax2.set_title(f'Distribución de respuestas para "{pregunta}"')
-            st.pyplot(fig2)
-            plt.close(fig2)
-
-            resultados_analisis.append({
-                "pregunta": pregunta,
-                "tipo_analisis": "categorico",
-                "frecuencias": frecuencias,
-                "figura_barra": fig1,
-                "figura_pastel": fig2,
-                "prompt": None
-            })
-            
+            st.dataframe(resultado['frecuencias'])
+            st.image(resultado['imagen_barra'])
+            st.image(resultado['imagen_pastel'])
+
+def generar_analisis_cualitativo(df, preguntas_seleccionadas, referencia=None):
+    """
+    Realiza un análisis cualitativo y genera resultados para cada pregunta seleccionada.
+    """
+    with st.spinner("Generando gráficos..."):
+        resultados_analisis = calcular_analisis_cualitativo(df, preguntas_seleccionadas, referencia=referencia)
+    mostrar_analisis_cualitativo(resultados_analisis)
     return resultados_analisis
 
-def exportar_analisis_cualitativo_a_word(resultados_analisis):
+def obtener_plan_prompts(df, pregunta, referencia, presupuesto_tokens, maximo_fragmentos):
     """
-    Genera un archivo de Word con los resultados del análisis cualitativo.
+    Devuelve el reparto en fragmentos de los comentarios de una pregunta,
+    reutilizando el ya calculado para el mismo contenido y los mismos parámetros.
     """
-    document = Document()
-    document.add_heading('Resultados del Análisis Cualitativo', 0)
-    
-    for resultado in resultados_analisis:
+    clave = clave_resultado(
+        "prompts_ia", df, pregunta,
+        referencia=referencia,
+        huella_referencia=huella_pregunta(df, referencia) if referencia is not None else None,
+        presupuesto_tokens=presupuesto_tokens,
+        maximo_fragmentos=maximo_fragmentos,
+        umbral_duplicados=UMBRAL_SIMILITUD
+    )
+    plan = cache_resultados.obtener(clave)
+    if plan is None:
+        plan = planificar_prompts(df, pregunta, referencia, presupuesto_tokens, maximo_fragmentos)
+        cache_resultados.guardar(clave, plan)
+    return plan
+
+def mostrar_prompts_ia(df, preguntas_comentario):
+    """
+    Muestra los prompts de IA de las preguntas de comentarios divididos en
+    fragmentos que caben en el presupuesto de tokens elegido. Solo se
+    construye el texto del fragmento que se está viendo; el resto se descarga.
+    """
+    st.subheader("Prompt para Análisis de IA")
+    st.write(
+        "Copia cada fragmento y pégalo en una de las herramientas de IA para un análisis más profundo. "
+        "Si una pregunta tiene varios fragmentos, analízalos por separado y une después los resultados "
+        "con el último prompt."
+    )
+
+    columnas_referencia = df.columns[:NUMERO_COLUMNAS_REFERENCIA].tolist()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        opcion_estrato = st.selectbox(
+            "Muestra estratificada por:",
+            ["Sin estratificar"] + columnas_referencia,
+            index=1 if columnas_referencia else 0,
+            key="referencia_prompts_ia"
+        )
+    with col2:
+        presupuesto_tokens = st.number_input(
+            "Tokens por prompt (estimados):",
+            min_value=1000, max_value=200_000, value=PRESUPUESTO_TOKENS_POR_DEFECTO, step=1000,
+            key="presupuesto_prompts_ia"
+        )
+    with col3:
+        maximo_fragmentos = st.number_input(
+            "Máximo de fragmentos por pregunta:",
+            min_value=1, max_value=100, value=MAXIMO_FRAGMENTOS_POR_DEFECTO,
+            key="fragmentos_prompts_ia"
+        )
+    referencia = None if opcion_estrato == "Sin estratificar" else opcion_estrato
+
+    for i, pregunta in enumerate(preguntas_comentario):
+        st.markdown(f"**{pregunta}**")
+        try:
+            plan = obtener_plan_prompts(df, pregunta, referencia, int(presupuesto_tokens), int(maximo_fragmentos))
+        except ValueError as e:
+            st.warning(str(e))
+            continue
+        if len(plan) == 0:
+            st.info("Esta pregunta no tiene comentarios.")
+            continue
+
+        st.caption(
+            f"{plan.comentarios_incluidos} de {plan.comentarios_totales} comentarios en {len(plan)} "
+            f"fragmento(s), unos {plan.tokens} tokens en total."
+            + (" Se ha tomado una muestra: aumenta el presupuesto o el número de fragmentos para incluir más." if plan.muestreado else "")
+        )
+        fragmento = 1
+        if len(plan) > 1:
+            fragmento = st.number_input(
+                "Fragmento:", min_value=1, max_value=len(plan), value=1, key=f"fragmento_prompt_{i}"
+            )
+        st.text_area("Prompt para IA", value=plan.prompt(fragmento - 1), height=300, key=f"texto_prompt_{i}_{fragmento}")
+        st.download_button(
+            label="Descargar todos los fragmentos (.txt)",
+            data=plan.texto_completo(),
+            file_name=f"prompts_ia_pregunta_{i + 1}.txt",
+            mime="text/plain",
+            key=f"descargar_prompt_{i}"
+        )
+        if len(plan) > 1:
+            with st.expander("Prompt para unir los resultados de los fragmentos"):
+                st.code(plan.prompt_consolidacion(), language=None)
+
+def mostrar_busqueda_comentarios(df, mascara_global=None):
+    """
+    Buscador de palabras y frases en todas las preguntas de comentarios, con
+    el contexto de cada aparición y filtro por las columnas de referencia.
+    Se busca siempre en el índice del dataset completo; 'mascara_global'
+    (las filas del filtro global) limita los resultados sin otro índice.
+    """
+    st.subheader("Buscar en los comentarios")
+    st.write(
+        "Escribe una o varias palabras (se buscan las respuestas que las contienen todas) "
+        "o una frase entre comillas, por ejemplo: \"carga asistencial\" tutor. "
+        "No se distinguen mayúsculas ni tildes."
+    )
+    with st.spinner("Preparando el índice de comentarios..."):
+        indice = obtener_indice(df)
+    if not indice.columnas:
+        st.info("No hay preguntas de comentarios en el archivo.")
+        return
+
+    consulta = st.text_input("Buscar:", key="consulta_comentarios")
+    preguntas = st.multiselect(
+        "Preguntas en las que buscar (vacío para todas):",
+        options=indice.columnas,
+        key="preguntas_busqueda_comentarios"
+    )
+    columnas_referencia = df.columns[:NUMERO_COLUMNAS_REFERENCIA].tolist()
+    col1, col2 = st.columns(2)
+    with col1:
+        referencia = st.selectbox(
+            "Filtrar por:", ["Sin filtro"] + columnas_referencia, key="referencia_busqueda_comentarios"
+        )
+    mascara_filas = mascara_global
+    if referencia != "Sin filtro":
+        with col2:
+            valores = st.multiselect(
+                f"Valores de {referencia}:",
+                options=df[referencia].dropna().unique().tolist(),
+                key="valores_busqueda_comentarios"
+            )
+        if valores:
+            mascara_referencia = df[referencia].isin(valores).to_numpy()
+            mascara_filas = mascara_referencia if mascara_filas is None else mascara_filas & mascara_referencia
+
+    if not consulta.strip():
+        return
+    apariciones = indice.buscar(consulta, columnas=preguntas or None, mascara_filas=mascara_filas)
+    if apariciones.empty:
+        st.info("No se ha encontrado ningún comentario.")
+        return
+
+    respuestas = apariciones.drop_duplicates(["columna", "fila"])
+    st.caption(
+        f"{len(apariciones)} apariciones en {len(respuestas)} respuestas"
+        + (f"; se muestran las {MAXIMO_RESULTADOS} primeras." if len(apariciones) > MAXIMO_RESULTADOS else ".")
+    )
+    contexto = indice.contexto(df, apariciones)
+    if referencia != "Sin filtro":
+        contexto.insert(1, referencia, df[referencia].iloc[contexto["Fila"]].to_numpy())
+        with st.expander(f"Respuestas encontradas por {referencia}"):
+            st.dataframe(
+                df[referencia].iloc[respuestas["fila"]].value_counts().rename("Respuestas"),
+            )
+    st.dataframe(contexto, hide_index=True)
+
+def escribir_analisis_cualitativo(document, resultados_analisis, progreso=None):
+    """
+    Añade a un documento de Word los resultados del análisis cualitativo,
+    pregunta a pregunta. 'progreso', si se indica, se llama con (preguntas
+    escritas, total, pregunta) después de cada una.
+    """
+    for i, resultado in enumerate(resultados_analisis):
         document.add_heading(f"Análisis para: {resultado['pregunta']}", level=1)
         
         if resultado['tipo_analisis'] == 'comentario':
             document.add_paragraph("Análisis de Contenido:")
-            document.add_paragraph("Frecuencia de palabras clave:")
-            tabla = document.add_table(rows=1, cols=2)
-            hdr_cells = tabla.rows[0].cells
-            hdr_cells[0].text = 'Palabra Clave'
-            hdr_cells[1].text = 'Frecuencia'
-            
-            for index, row in resultado['df_frecuencia'].iterrows():
-                row_cells = tabla.add_row().cells
-                row_cells[0].text = str(row['Palabra Clave'])
-                row_cells[1].text = str(row['Frecuencia'])
+            document.add_paragraph(
+                f"Comentarios: {resultado['comentarios']}; distintos tras agrupar los duplicados "
+                f"y casi duplicados: {resultado['comentarios_distintos']}."
+            )
+            document.add_paragraph("Frecuencia de palabras clave (cada grupo de comentarios repetidos cuenta una vez):")
+            agregar_tabla(document, resultado['df_frecuencia'][['Palabra Clave', 'Frecuencia']], ['Palabra Clave', 'Frecuencia'])
                 
-            img_buffer = BytesIO()
-            resultado['figura'].savefig(img_buffer, format='png')
-            img_buffer.seek(0)
-            document.add_picture(img_buffer, width=Inches(6))
+            document.add_picture(BytesIO(resultado['imagen']), width=Inches(6))
+
+            if not resultado['frases'].empty:
+                document.add_paragraph("Frases clave (palabras que aparecen juntas más de lo esperable):")
+                columnas = ['Frase', 'Frecuencia', 'PMI normalizada']
+                agregar_tabla(document, resultado['frases'][columnas], columnas)
+            if resultado['frases_por_grupo'] is not None and not resultado['frases_por_grupo'].empty:
+                columnas = list(resultado['frases_por_grupo'].columns)
+                document.add_paragraph(f"Frases clave por {columnas[0]}:")
+                agregar_tabla(document, resultado['frases_por_grupo'], columnas)
+
+            document.add_paragraph(
+                "Sentimiento de los comentarios (léxico de polaridad con negaciones; "
+                f"puntuación media entre -1 y 1: {resultado['puntuacion_sentimiento']}):"
+            )
+            columnas = ['Sentimiento', 'Comentarios', 'Porcentaje (%)']
+            agregar_tabla(document, resultado['sentimiento'][columnas], columnas)
+            document.add_picture(BytesIO(resultado['imagen_sentimiento']), width=Inches(6))
+            for columna, tabla in resultado['sentimiento_por_referencia'].items():
+                if not tabla.empty:
+                    document.add_paragraph(f"Sentimiento por {columna}:")
+                    agregar_tabla(document, tabla, list(tabla.columns))
+
+            if not resultado['grupos_duplicados'].empty:
+                document.add_paragraph("Comentarios repetidos:")
+                columnas = ['Comentario', 'Repeticiones', 'Variantes']
+                agregar_tabla(document, resultado['grupos_duplicados'][columnas], columnas)
+
+            document.add_page_break()
+
+        elif resultado['tipo_analisis'] == 'seleccion_multiple':
+            document.add_paragraph("Análisis de Opciones (selección múltiple):")
+            document.add_paragraph(
+                f"Respuestas con al menos una opción: {resultado['respuestas']}. "
+                "Los porcentajes se calculan sobre esas respuestas y pueden sumar más de 100%."
+            )
+            columnas = ['Opción', 'Frecuencia Absoluta', 'Porcentaje de respuestas (%)']
+            agregar_tabla(document, resultado['frecuencias'][columnas], columnas)
+
+            document.add_picture(BytesIO(resultado['imagen_barra']), width=Inches(6))
+
+            document.add_paragraph("Opciones elegidas a la vez:")
+            coocurrencia = resultado['coocurrencia']
+            agregar_tabla(document, coocurrencia.reset_index(), [''] + list(coocurrencia.columns))
 
             document.add_page_break()
 
         else: # Tipo categórico
             document.add_paragraph("Análisis de Frecuencias:")
-            tabla = document.add_table(rows=1, cols=3)
-            hdr_cells = tabla.rows[0].cells
-            hdr_cells[0].text = 'Respuesta'
-            hdr_cells[1].text = 'Frecuencia Absoluta'
-            hdr_cells[2].text = 'Frecuencia Relativa (%)'
-            
-            for index, row in resultado['frecuencias'].iterrows():
-                row_cells = tabla.add_row().cells
-                row_cells[0].text = str(row['Respuesta'])
-                row_cells[1].text = str(row['Frecuencia Absoluta'])
-                row_cells[2].text = str(row['Frecuencia Relativa (%)'])
+            columnas = ['Respuesta', 'Frecuencia Absoluta', 'Frecuencia Relativa (%)']
+            agregar_tabla(document, resultado['frecuencias'][columnas], columnas)
                 
-            img_buffer_bar = BytesIO()
-            resultado['figura_barra'].savefig(img_buffer_bar, format='png')
-            img_buffer_bar.seek(0)
-            document.add_picture(img_buffer_bar, width=Inches(6))
-
-            img_buffer_pie = BytesIO()
-            resultado['figura_pastel'].savefig(img_buffer_pie, format='png')
-            img_buffer_pie.seek(0)
-            document.add_picture(img_buffer_pie, width=Inches(6))
+            document.add_picture(BytesIO(resultado['imagen_barra']), width=Inches(6))
+            document.add_picture(BytesIO(resultado['imagen_pastel']), width=Inches(6))
             
             document.add_page_break()
-            
-    buffer = BytesIO()
-    document.save(buffer)
+
+        if progreso is not None:
+            progreso(i + 1, len(resultados_analisis), resultado['pregunta'])
+
+def exportar_analisis_cualitativo_a_word(resultados_analisis, progreso=None):
+    """
+    Genera un archivo de Word con los resultados del análisis cualitativo.
+    """
+    with instrumentacion.medir("exportacion_word", informe="cualitativo", preguntas=len(resultados_analisis)):
+        document = Document()
+        document.add_heading('Resultados del Análisis Cualitativo', 0)
+        escribir_analisis_cualitativo(document, resultados_analisis, progreso=progreso)
+                
+        buffer = BytesIO()
+        document.save(buffer)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+def informe_cualitativo(df, preguntas_seleccionadas, referencia=None, progreso=None):
+    """
+    Documento de Word del análisis cualitativo de las preguntas indicadas,
+    con el desglose por 'referencia'. Como no usa streamlit, se ejecuta en
+    los trabajos de exportación (ver trabajos_exportacion).
+    """
+    if progreso is not None:
+        progreso(0, len(preguntas_seleccionadas), "Calculando el análisis")
+    resultados = calcular_analisis_cualitativo(df, preguntas_seleccionadas, referencia=referencia)
+    return exportar_analisis_cualitativo_a_word(resultados, progreso=progreso)
\ No newline at end of file
@@ -2,147 +2,283 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+from pandas.api.types import is_numeric_dtype
 from io import BytesIO
 from docx import Document
 from docx.shared import Inches
+from modulos.graficos import especificacion, renderizar_figuras
+from modulos.exportacion_word import agregar_tabla
+from modulos.preguntas import obtener_preguntas_cuantitativas
+from modulos.cache_resultados import cache_resultados, clave_resultado
+from modulos.instrumentacion import instrumentacion
 
-def obtener_preguntas_cuantitativas(df):
-    """
-    Identifica y devuelve las columnas con preguntas de tipo cuantitativo
-    basándose en la lista proporcionada por el usuario.
-    """
-    preguntas_cuantitativas_lista = [
-        "Durante el primer año de residencia, valore el proceso de acogida en su Servicio",
-        "Valore el proceso de integración en su Servicio desde que inició su formación hasta la actualidad",
-        "Valore la dedicación en tiempo de su tutor/a en su labor tutorial",
-        "Valore el asesoramiento en docencia que recibes de su tutor/a",
-        "Valore la accesibilidad de su tutor/a (¿Está disponible cuándo le necesitas?)",
-        "Valore la satisfacción global con su tutor/a",
-        "Valore la información de la Guía Itinerario Formativo Tipo (GIFT) que su Unidad Docente ha elaborado",
-        "Valore la adaptación del PIF a los contenidos y desarrollo de su especialidad",
-        "¿Cómo valora las facilidades que le ha ofrecido el personal sanitario para el aprendizaje de métodos, técnicas y procedimientos diagnósticos y terapéuticos?",
-        "Valore la satisfacción global sobre la planificación y desarrollo de la formación",
-        "Por término medio, ¿a cuántas sesiones clínicas, bibliográficas, seminarios y otras actividades docentes asiste al mes en su Servicio/Centro o Unidad Docente?",
-        "Por término medio, ¿cuántas sesiones clínicas, bibliográficas, seminarios u otras actividades docentes imparte al mes en su Servicio/Centro o Unidad Docente?",
-        "Valore la ayuda que ha recibido para la preparación de las sesiones impartidas",
-        "Valore la facilidad que le ofrecen para asistir a las sesiones",
-        "Valore las facilidades ofrecidas para asistir a congresos, cursos, reuniones científicas y actividades formativas no incluidas en el programa de la especialidad pero recomendadas por el tutor/a",
-        "Valore el asesoramiento recibido para realizar trabajos de investigación cuando se ha solicitado",
-        "¿Cuántas comunicaciones ha presentado en jornadas o congresos nacionales o internacionales?",
-        "¿En cuántos estudios publicados en revistas nacionales o internacionales ha participado?",
-        "¿Cómo valora las actividades formativas transversales ofertadas por su Centro/Unidad Docente?",
-        "¿Cómo valora las actividades complementarias de su especialidad?",
-        "Valore la satisfacción global de las sesiones clínicas, actividades de investigación y actividades formativas complementarias",
-        "Valore su nivel de formación en valores profesionales, actitudes y comportamientos éticos (conocimientos, habilidades y actitudes)",
-        "Valore su nivel de formación en competencias relacionadas con aspectos médicos legales",
-        "Valore su nivel de formación en competencias de comunicación con el paciente y la familia",
-        "Valore su nivel de formación en competencias necesarias para la comunicación con otros profesionales",
-        "Valore su nivel de formación en estadística/investigación",
-        "Valore su nivel de formación en competencias para el trabajo en equipo",
-        "Valore su nivel de formación en el manejo de información (sistemas de registros del hospital/centro de salud indicadores)",
-        "Valore su nivel de formación en competencias de gestión clínica (calidad, utilización racional de los recursos, ...)",
-        "Valore su nivel de formación en competencias par el autoaprendizaje",
-        "Valore su nivel de formación en habilidades básicas de transmisión de conocimientos y como docente",
-        "Valore la satisfacción global sobre competencias adquiridas hasta la actualidad",
-        "¿Cómo valora el cumplimiento de su calendario de rotaciones?",
-        "¿Cómo valora la supervisión individual de su formación de la áreas asistenciales por las que rota?",
-        "Valore la responsabilidad progresiva asumida a lo largo de su formación",
-        "Valore las facilidades que le ha ofrecido el equipo, para la adquisición de habilidades clínicas",
-        "Valore la confianza que depositan en usted, para que asumas un grado de responsabilidad creciente",
-        "Valore la preocupación de su Servicio/Centro de Salud por su formación",
-        "Valore la satisfacción global sobre las rotaciones internas",
-        "Por término medio, ¿cuántas guardias realiza al mes?",
-        "Si ha superado el primer año de residencia, ¿cómo valora la supervisión individual durante las guardias desde entonces?",
-        "Valore la satisfacción global sobre las guardias",
-        "Valore las facilidades ofrecidas para realizar las rotaciones externas propuestas por el tutor/a",
-        "Valore la satisfacción global de las rotaciones externas",
-        "Valore la satisfacción global de la Comisión de Docencia",
-        "Valore la satisfacción global sobre la comunicación de resultados",
-        "Valore la satisfacción global respecto a su residencia"
-    ]
-    
-    preguntas_en_df = [col for col in df.columns if col in preguntas_cuantitativas_lista]
-    
-    return preguntas_en_df
+# Número de intervalos de los histogramas
+BINS_HISTOGRAMA = 10
 
-def generar_analisis_cuantitativo(df, preguntas_seleccionadas):
+# Nombres en castellano de los estadísticos de describe() para el informe
+NOMBRES_ESTADISTICOS = {
+    "count": "Número de respuestas",
+    "mean": "Media",
+    "std": "Desviación estándar",
+    "min": "Mínimo",
+    "25%": "Percentil 25",
+    "50%": "Mediana",
+    "75%": "Percentil 75",
+    "max": "Máximo"
+}
+
+def _bloque_numerico(df, preguntas):
     """
-    Realiza un análisis descriptivo y genera un gráfico para cada pregunta seleccionada.
+    Devuelve las preguntas como una matriz float64 contigua de preguntas x filas,
+    con NaN en las respuestas vacías o no numéricas.
+    """
+    columnas = []
+    with instrumentacion.medir("conversion_numerica", preguntas=len(preguntas), filas=len(df)):
+        for pregunta in preguntas:
+            columna = df[pregunta]
+            if not is_numeric_dtype(columna):
+                columna = pd.to_numeric(columna, errors='coerce')
+            columnas.append(columna.to_numpy(dtype="float64", na_value=np.nan))
+    if not columnas:
+        return np.empty((0, len(df)))
+    return np.vstack(columnas)
+
+def calcular_estadisticas_lote(df, preguntas, bins=10):
     """
-    resultados_analisis = []
+    Calcula en una sola pasada sobre el bloque numérico los descriptivos
+    (como Series.describe), los histogramas y los valores faltantes de todas
+    las preguntas. El resultado lo reutilizan la vista y la exportación a Word.
+    """
+    preguntas = list(preguntas)
+    bloque = _bloque_numerico(df, preguntas)
+    n_preguntas, n_filas = bloque.shape
+
+    validos = ~np.isnan(bloque)
+    conteo = validos.sum(axis=1)
+    faltantes = n_filas - conteo
+    con_datos = conteo > 0
+
+    # Una única ordenación por pregunta da mínimo, máximo y percentiles (los NaN quedan al final)
+    ordenado = np.sort(bloque, axis=1)
+    filas_idx = np.arange(n_preguntas)
+    ultimo = np.maximum(conteo - 1, 0)
+
+    def percentil(q):
+        if n_filas == 0:
+            return np.full(n_preguntas, np.nan)
+        posicion = ultimo * q
+        inferior = np.floor(posicion).astype(int)
+        superior = np.minimum(inferior + 1, ultimo)
+        valor_inf = ordenado[filas_idx, inferior]
+        valor_sup = ordenado[filas_idx, superior]
+        return np.where(con_datos, valor_inf + (valor_sup - valor_inf) * (posicion - inferior), np.nan)
+
+    # Las respuestas vacías se rellenan con ceros para sumar sin máscaras
+    relleno = np.where(validos, bloque, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.where(con_datos, relleno.sum(axis=1) / conteo, np.nan)
+        relleno -= np.nan_to_num(media)[:, None]
+        relleno[~validos] = 0.0
+        varianza = np.einsum("ij,ij->i", relleno, relleno) / (conteo - 1)
+    del relleno
+    desviacion = np.where(conteo > 1, np.sqrt(varianza), np.nan)
+
+    minimo = percentil(0.0)
+    maximo = percentil(1.0)
+    descriptivos = pd.DataFrame({
+        "count": conteo.astype(float),
+        "mean": media,
+        "std": desviacion,
+        "min": minimo,
+        "25%": percentil(0.25),
+        "50%": percentil(0.5),
+        "75%": percentil(0.75),
+        "max": maximo
+    }, index=preguntas)
+
+    # Histogramas de todas las preguntas con un único bincount: cada pregunta
+    # ocupa 'bins' casillas consecutivas y las respuestas vacías van a una
+    # casilla extra que se descarta. Igual que np.histogram, si todos los
+    # valores coinciden el rango se amplía medio punto por cada lado.
+    constante = con_datos & (minimo == maximo)
+    inicio = np.where(con_datos, np.where(constante, minimo - 0.5, minimo), 0.0)
+    anchura = np.where(con_datos, np.where(constante, 1.0, maximo - minimo), 1.0)
+    casilla = bloque - inicio[:, None]
+    casilla *= (bins / anchura)[:, None]
+    np.floor(casilla, out=casilla)
+    np.clip(casilla, 0, bins - 1, out=casilla)
+    casilla += (np.arange(n_preguntas) * bins)[:, None]
+    casilla[~validos] = n_preguntas * bins
+    casilla = casilla.astype(np.int64)
+    conteos = np.bincount(casilla.ravel(), minlength=n_preguntas * bins + 1)[:-1].reshape(n_preguntas, bins)
+    bordes = inicio[:, None] + anchura[:, None] * np.arange(bins + 1) / bins
 
+    return {
+        "preguntas": preguntas,
+        "descriptivos": descriptivos,
+        "faltantes": pd.Series(faltantes, index=preguntas),
+        "histogramas": {
+            pregunta: (conteos[k], bordes[k]) for k, pregunta in enumerate(preguntas)
+        }
+    }
+
+# Explicación común a todas las preguntas del análisis cuantitativo
+EXPLICACION_CUANTITATIVA = (
+    "El análisis descriptivo muestra un resumen estadístico de la pregunta. "
+    "La media, mediana y desviación estándar indican la tendencia central y la dispersión de los datos. "
+    "El histograma visualiza la distribución de las respuestas, mostrando la frecuencia de cada valor."
+)
+
+def calcular_analisis_cuantitativo(df, preguntas_seleccionadas, paralelo=True):
+    """
+    Calcula el análisis de las preguntas seleccionadas sin mostrar nada:
+    las estadísticas de todas las preguntas se calculan de una vez con
+    calcular_estadisticas_lote y los histogramas se dibujan una sola vez a PNG.
+    Los resultados ya calculados para el mismo contenido de columna se toman
+    de la caché compartida entre sesiones y solo se calculan los que faltan.
+    Las preguntas sin datos numéricos válidos no aparecen en el resultado.
+    No usa streamlit, así que se puede ejecutar fuera de la aplicación.
+    """
+    claves = {
+        pregunta: clave_resultado("cuantitativo", df, pregunta, bins=BINS_HISTOGRAMA)
+        for pregunta in preguntas_seleccionadas
+    }
+    resultados = {}
+    pendientes = []
     for pregunta in preguntas_seleccionadas:
-        st.subheader(f"Análisis para la pregunta: {pregunta}")
-        
-        # 1. Limpiar y convertir datos
-        try:
-            # Convertir la columna a tipo numérico, forzando errores a NaN
-            columna_numerica = pd.to_numeric(df[pregunta], errors='coerce').dropna()
-            
-            # Verificar si la columna no está vacía después de la limpieza
-            if columna_numerica.empty:
-                st.warning(f"La pregunta '{pregunta}' no contiene datos numéricos válidos para el análisis.")
-                continue
-
-            # 2. Análisis estadístico
-            analisis_descriptivo = columna_numerica.describe()
-            st.write("Valores analizados:")
-            st.write(analisis_descriptivo)
-
-            # 3. Visualización Gráfica
-            fig, ax = plt.subplots()
-            columna_numerica.hist(ax=ax, bins=10)
-            ax.set_title(f"Distribución de {pregunta}")
-            ax.set_xlabel("Valor")
-            ax.set_ylabel("Frecuencia")
-            st.pyplot(fig)
-            plt.close(fig)
-
-            # 4. Explicación del análisis
-            explicacion = (
-                "El análisis descriptivo muestra un resumen estadístico de la pregunta. "
-                "La media, mediana y desviación estándar indican la tendencia central y la dispersión de los datos. "
-                "El histograma visualiza la distribución de las respuestas, mostrando la frecuencia de cada valor."
-            )
-            st.write("Información del análisis y explicación:")
-            st.write(explicacion)
-            
-            resultados_analisis.append({
+        resultado = cache_resultados.obtener(claves[pregunta])
+        if resultado is None:
+            pendientes.append(pregunta)
+        else:
+            resultados[pregunta] = resultado
+
+    if pendientes:
+        with instrumentacion.medir("estadisticas_cuantitativas", preguntas=len(pendientes), filas=len(df)):
+            estadisticas = calcular_estadisticas_lote(df, pendientes, bins=BINS_HISTOGRAMA)
+
+        # Dibujar todos los histogramas de una vez (en paralelo si son muchos)
+        preguntas_con_datos = [
+            pregunta for pregunta in pendientes
+            if estadisticas["descriptivos"].loc[pregunta, "count"] > 0
+        ]
+        imagenes = renderizar_figuras(
+            (
+                especificacion(
+                    "histograma",
+                    f"Distribución de {pregunta}",
+                    {
+                        "conteos": estadisticas["histogramas"][pregunta][0],
+                        "bordes": estadisticas["histogramas"][pregunta][1]
+                    }
+                )
+                for pregunta in preguntas_con_datos
+            ),
+            paralelo=paralelo
+        )
+
+        for pregunta, imagen in zip(preguntas_con_datos, imagenes):
+            resultados[pregunta] = {
                 "pregunta": pregunta,
-                "analisis_descriptivo": analisis_descriptivo,
-                "explicacion": explicacion,
-                "figura": fig
-            })
+                "analisis_descriptivo": estadisticas["descriptivos"].loc[pregunta].rename(pregunta),
+                "valores_faltantes": int(estadisticas["faltantes"].loc[pregunta]),
+                "histograma": estadisticas["histogramas"][pregunta],
+                "explicacion": EXPLICACION_CUANTITATIVA,
+                "imagen": imagen
+            }
+            cache_resultados.guardar(claves[pregunta], resultados[pregunta])
 
-        except Exception as e:
-            st.error(f"Error inesperado al procesar la pregunta '{pregunta}': {e}")
-            
+    return [resultados[pregunta] for pregunta in preguntas_seleccionadas if pregunta in resultados]
+
+def mostrar_analisis_cuantitativo(resultados_analisis, preguntas_seleccionadas):
+    """
+    Muestra en Streamlit los resultados de calcular_analisis_cuantitativo.
+    """
+    por_pregunta = {resultado["pregunta"]: resultado for resultado in resultados_analisis}
+
+    for pregunta in preguntas_seleccionadas:
+        st.subheader(f"Análisis para la pregunta: {pregunta}")
+
+        # Verificar si la columna tiene datos numéricos válidos
+        if pregunta not in por_pregunta:
+            st.warning(f"La pregunta '{pregunta}' no contiene datos numéricos válidos para el análisis.")
+            continue
+        resultado = por_pregunta[pregunta]
+
+        # 1. Análisis estadístico
+        st.write("Valores analizados:")
+        st.write(resultado["analisis_descriptivo"])
+        st.write(f"Respuestas vacías o no numéricas: {resultado['valores_faltantes']}")
+
+        # 2. Visualización Gráfica
+        st.image(resultado["imagen"])
+
+        # 3. Explicación del análisis
+        st.write("Información del análisis y explicación:")
+        st.write(resultado["explicacion"])
+
+def generar_analisis_cuantitativo(df, preguntas_seleccionadas):
+    """
+    Realiza un análisis descriptivo y genera un gráfico para cada pregunta seleccionada.
+    """
+    try:
+        with st.spinner("Generando gráficos..."):
+            resultados_analisis = calcular_analisis_cuantitativo(df, preguntas_seleccionadas)
+    except Exception as e:
+        st.error(f"Error inesperado al calcular las estadísticas: {e}")
+        return []
+
+    mostrar_analisis_cuantitativo(resultados_analisis, preguntas_seleccionadas)
     return resultados_analisis
 
-def exportar_a_word(resultados):
+def escribir_analisis_cuantitativo(document, resultados, progreso=None):
     """
-    Genera un archivo de Word con los resultados del análisis.
+    Añade a un documento de Word los resultados del análisis cuantitativo,
+    pregunta a pregunta. 'progreso', si se indica, se llama con (preguntas
+    escritas, total, pregunta) después de cada una.
     """
-    document = Document()
-    document.add_heading('Resultados del Análisis Cuantitativo', 0)
-    
-    for resultado in resultados:
+    for i, resultado in enumerate(resultados):
         document.add_heading(f"Análisis para: {resultado['pregunta']}", level=1)
         document.add_paragraph("Análisis Descriptivo:")
-        document.add_paragraph(resultado['analisis_descriptivo'].to_string())
+        agregar_tabla(
+            document,
+            [
+                # El número de respuestas es un recuento: sin decimales
+                (NOMBRES_ESTADISTICOS.get(estadistico, estadistico), int(valor) if estadistico == "count" else valor)
+                for estadistico, valor in resultado['analisis_descriptivo'].items()
+            ],
+            ["Estadístico", "Valor"]
+        )
         
         document.add_paragraph("Explicación:")
         document.add_paragraph(resultado['explicacion'])
         
-        # Guardar el gráfico en un buffer para insertarlo en el documento
-        img_buffer = BytesIO()
-        resultado['figura'].savefig(img_buffer, format='png')
-        img_buffer.seek(0)
-        document.add_picture(img_buffer, width=Inches(6))
-        
-    buffer = BytesIO()
-    document.save(buffer)
+        # El gráfico ya está dibujado como PNG: se inserta sin volver a renderizarlo
+        document.add_picture(BytesIO(resultado['imagen']), width=Inches(6))
+        if progreso is not None:
+            progreso(i + 1, len(resultados), resultado['pregunta'])
+
+def exportar_a_word(resultados, progreso=None):
+    """
+    Genera un archivo de Word con los resultados del análisis.
+    """
+    with instrumentacion.medir("exportacion_word", informe="cuantitativo", preguntas=len(resultados)):
+        document = Document()
+        document.add_heading('Resultados del Análisis Cuantitativo', 0)
+        escribir_analisis_cuantitativo(document, resultados, progreso=progreso)
+            
+        buffer = BytesIO()
+        document.save(buffer)
     buffer.seek(0)
     
-    return buffer
\ No newline at end of file
+    return buffer
+
+def informe_cuantitativo(df, preguntas_seleccionadas, progreso=None):
+    """
+    Calcula el análisis (de la caché si ya se hizo) y genera su documento de
+    Word, sin usar streamlit: es la función de las exportaciones en segundo plano.
+    """
+    if progreso is not None:
+        progreso(0, len(preguntas_seleccionadas), "Calculando el análisis")
+    resultados = calcular_analisis_cuantitativo(df, preguntas_seleccionadas)
+    return exportar_a_word(resultados, progreso=progreso)
\ No newline at end of file
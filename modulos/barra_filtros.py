@@ -0,0 +1,60 @@
+# /modulos/barra_filtros.py
+
+import streamlit as st
+from modulos.filtros import crear_filtro, valores_columna, mascara_filtro
+from modulos.esquema_datos import NUMERO_COLUMNAS_REFERENCIA, es_pregunta_de_comentario
+from modulos.preguntas import obtener_preguntas_cuantitativas, obtener_preguntas_cualitativas
+
+# Claves de los widgets del filtro global en session_state
+CLAVE_FILTRO_REFERENCIA = "filtro_global_referencia_{}"
+CLAVE_FILTRO_PREGUNTA = "filtro_global_pregunta"
+CLAVE_FILTRO_RESPUESTA = "filtro_global_respuesta"
+SIN_PREGUNTA = "Ninguna"
+
+def _limpiar_seleccion(clave, opciones):
+    """
+    Quita de la selección guardada los valores que ya no están entre las
+    opciones (otro archivo, otra pregunta), antes de crear el widget.
+    """
+    if clave in st.session_state:
+        disponibles = set(opciones)
+        st.session_state[clave] = [valor for valor in st.session_state[clave] if valor in disponibles]
+
+def _quitar_filtros():
+    for i in range(NUMERO_COLUMNAS_REFERENCIA):
+        st.session_state[CLAVE_FILTRO_REFERENCIA.format(i)] = []
+    st.session_state[CLAVE_FILTRO_PREGUNTA] = SIN_PREGUNTA
+    st.session_state[CLAVE_FILTRO_RESPUESTA] = []
+
+def mostrar_barra_filtros(df):
+    """
+    Filtro global de la barra lateral: valores de las columnas de referencia y,
+    opcionalmente, de la respuesta a una pregunta. Devuelve el filtro elegido
+    (vacío si no se filtra nada); todos los módulos trabajan sobre sus filas.
+    """
+    st.sidebar.subheader("Filtro global")
+    selecciones = {}
+    for i, columna in enumerate(df.columns[:NUMERO_COLUMNAS_REFERENCIA]):
+        clave = CLAVE_FILTRO_REFERENCIA.format(i)
+        opciones = valores_columna(df, columna)
+        _limpiar_seleccion(clave, opciones)
+        selecciones[columna] = st.sidebar.multiselect(f"{columna}:", options=opciones, key=clave)
+
+    # Cualquier pregunta salvo las de comentarios, cuyas respuestas son todas distintas
+    preguntas = [
+        pregunta for pregunta in obtener_preguntas_cuantitativas(df) + obtener_preguntas_cualitativas(df)
+        if not es_pregunta_de_comentario(pregunta)
+    ]
+    if st.session_state.get(CLAVE_FILTRO_PREGUNTA) not in [SIN_PREGUNTA] + preguntas:
+        st.session_state[CLAVE_FILTRO_PREGUNTA] = SIN_PREGUNTA
+    pregunta = st.sidebar.selectbox("Filtrar también por la respuesta a:", [SIN_PREGUNTA] + preguntas, key=CLAVE_FILTRO_PREGUNTA)
+    if pregunta != SIN_PREGUNTA:
+        opciones = valores_columna(df, pregunta)
+        _limpiar_seleccion(CLAVE_FILTRO_RESPUESTA, opciones)
+        selecciones[pregunta] = st.sidebar.multiselect("Respuestas:", options=opciones, key=CLAVE_FILTRO_RESPUESTA)
+
+    filtro = crear_filtro(selecciones)
+    if filtro:
+        st.sidebar.caption(f"Filas que cumplen el filtro: {int(mascara_filtro(df, filtro).sum())} de {len(df)}")
+        st.sidebar.button("Quitar filtros", on_click=_quitar_filtros)
+    return filtro
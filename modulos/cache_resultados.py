@@ -0,0 +1,212 @@
+# /modulos/cache_resultados.py
+
+import os
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from modulos.almacen_datos import hash_almacenado, hash_vista
+
+# Caché de resultados de los análisis compartida por todas las sesiones del
+# proceso de Streamlit. Cada resultado se guarda por pregunta, con una clave
+# formada por el tipo de análisis, el hash del contenido de la columna y los
+# parámetros del análisis; así, varios coordinadores que abren el mismo
+# archivo (o una unidad concreta del mismo) reutilizan los cálculos.
+#
+# Las entradas se expulsan por tamaño total (las menos usadas primero) y por
+# antigüedad. Ambos límites pueden fijarse en el despliegue con las variables
+# de entorno LIMITE_CACHE_RESULTADOS_MB y ANTIGUEDAD_CACHE_RESULTADOS_S.
+#
+# Este módulo no importa streamlit.
+
+LIMITE_CACHE_RESULTADOS_MB = float(os.environ.get("LIMITE_CACHE_RESULTADOS_MB", "256"))
+ANTIGUEDAD_CACHE_RESULTADOS_S = float(os.environ.get("ANTIGUEDAD_CACHE_RESULTADOS_S", "3600"))
+
+# Hashes de columnas de datasets del almacén, para no recalcularlos en cada ejecución
+MAXIMO_HUELLAS_EN_MEMORIA = 4096
+
+_huellas_columnas = OrderedDict()
+_bloqueo_huellas = threading.Lock()
+
+def huella_columna(serie):
+    """
+    Hash del contenido de una columna, para identificar el mismo dato
+    aunque venga de otra sesión o de otro DataFrame.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(serie.name).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(serie, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def huella_pregunta(df, pregunta):
+    """
+    Hash de la columna de una pregunta. Si el DataFrame es un dataset completo
+    del almacén o una vista filtrada de uno, el hash se calcula una vez y se
+    recuerda por (dataset o vista, columna).
+    """
+    hash_dataset = hash_almacenado(df) or hash_vista(df)
+    if hash_dataset is None:
+        return huella_columna(df[pregunta])
+    clave = (hash_dataset, str(df[pregunta].dtype), pregunta)
+    with _bloqueo_huellas:
+        if clave in _huellas_columnas:
+            _huellas_columnas.move_to_end(clave)
+            return _huellas_columnas[clave]
+    huella = huella_columna(df[pregunta])
+    with _bloqueo_huellas:
+        _huellas_columnas[clave] = huella
+        while len(_huellas_columnas) > MAXIMO_HUELLAS_EN_MEMORIA:
+            _huellas_columnas.popitem(last=False)
+    return huella
+
+def invalidar_dataset(hash_dataset):
+    """
+    Marca como obsoletos los resultados calculados sobre las columnas completas
+    de un dataset que ha cambiado. Los resultados de subconjuntos cuyo
+    contenido no ha cambiado (por ejemplo, una unidad sin respuestas nuevas)
+    siguen siendo válidos porque su clave es el contenido de la columna.
+    Devuelve el número de resultados descartados.
+    """
+    with _bloqueo_huellas:
+        claves = [clave for clave in _huellas_columnas if clave[0] == hash_dataset]
+        huellas = {_huellas_columnas.pop(clave) for clave in claves}
+    if not huellas:
+        return 0
+    return cache_resultados.descartar(lambda clave: clave[1] in huellas)
+
+def clave_resultado(tipo_analisis, df, pregunta, **parametros):
+    """
+    Clave de caché del resultado de un análisis para una pregunta.
+    """
+    return (tipo_analisis, huella_pregunta(df, pregunta), tuple(sorted(parametros.items())))
+
+def estimar_tamano(valor):
+    """
+    Estimación en bytes de la memoria que ocupa un resultado.
+    """
+    if isinstance(valor, (bytes, bytearray, str)):
+        return len(valor)
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sum(estimar_tamano(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sum(estimar_tamano(v) for v in valor)
+    if hasattr(valor, "__dict__"):
+        # Objetos de resultados (por ejemplo, un plan de prompts): sus atributos
+        return estimar_tamano(vars(valor))
+    return sys.getsizeof(valor)
+
+class CacheResultados:
+    """
+    Caché LRU con límite de memoria y antigüedad máxima de las entradas,
+    segura entre hilos (cada sesión de Streamlit se ejecuta en su propio hilo).
+    """
+
+    def __init__(self, limite_bytes, antiguedad_maxima):
+        self.limite_bytes = limite_bytes
+        self.antiguedad_maxima = antiguedad_maxima
+        self._entradas = OrderedDict()  # clave -> (valor, tamaño, instante de creación)
+        self._bloqueo = threading.Lock()
+        self.tamano_total = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    def _quitar(self, clave):
+        _, tamano, _ = self._entradas.pop(clave)
+        self.tamano_total -= tamano
+        self.expulsiones += 1
+
+    def _expulsar_caducadas(self, ahora):
+        # Las entradas más antiguas por creación no tienen por qué estar al
+        # principio (el orden es de uso), así que se revisan todas
+        caducadas = [
+            clave for clave, (_, _, creado) in self._entradas.items()
+            if ahora - creado > self.antiguedad_maxima
+        ]
+        for clave in caducadas:
+            self._quitar(clave)
+
+    def obtener(self, clave):
+        """
+        Devuelve el resultado guardado con esa clave, o None si no está o ha caducado.
+        """
+        ahora = time.monotonic()
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is None or ahora - entrada[2] > self.antiguedad_maxima:
+                if entrada is not None:
+                    self._quitar(clave)
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave, valor):
+        """
+        Guarda un resultado y expulsa las entradas caducadas y, si se supera
+        el límite de memoria, las menos usadas recientemente.
+        """
+        tamano = estimar_tamano(valor)
+        if tamano > self.limite_bytes:
+            return
+        ahora = time.monotonic()
+        with self._bloqueo:
+            if clave in self._entradas:
+                _, tamano_previo, _ = self._entradas.pop(clave)
+                self.tamano_total -= tamano_previo
+            self._entradas[clave] = (valor, tamano, ahora)
+            self.tamano_total += tamano
+            self._expulsar_caducadas(ahora)
+            while self.tamano_total > self.limite_bytes and self._entradas:
+                self._quitar(next(iter(self._entradas)))
+
+    def descartar(self, predicado):
+        """
+        Elimina las entradas cuya clave cumple 'predicado' y devuelve cuántas eran.
+        """
+        with self._bloqueo:
+            claves = [clave for clave in self._entradas if predicado(clave)]
+            for clave in claves:
+                _, tamano, _ = self._entradas.pop(clave)
+                self.tamano_total -= tamano
+            self.invalidaciones += len(claves)
+        return len(claves)
+
+    def vaciar(self):
+        with self._bloqueo:
+            self._entradas.clear()
+            self.tamano_total = 0
+
+    def estadisticas(self):
+        """
+        Contadores de uso de la caché para mostrarlos en la interfaz.
+        """
+        with self._bloqueo:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "tamano_mb": self.tamano_total / 1024**2,
+                "limite_mb": self.limite_bytes / 1024**2,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "invalidaciones": self.invalidaciones,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0
+            }
+
+# Caché única del proceso, compartida por todas las sesiones
+cache_resultados = CacheResultados(
+    limite_bytes=LIMITE_CACHE_RESULTADOS_MB * 1024**2,
+    antiguedad_maxima=ANTIGUEDAD_CACHE_RESULTADOS_S
+)
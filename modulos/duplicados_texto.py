@@ -0,0 +1,260 @@
+# /modulos/duplicados_texto.py
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from modulos.cache_resultados import huella_columna
+from modulos.procesamiento_texto import obtener_tokens_columna
+from modulos.instrumentacion import instrumentacion
+
+# Detección de comentarios duplicados y casi duplicados en las columnas de
+# texto libre (el mismo comentario pegado en varias unidades, envíos repetidos
+# de la encuesta...). Sobre los tokens ya normalizados de cada respuesta:
+#   1. Las respuestas con los mismos tokens son duplicados exactos.
+#   2. De cada respuesta distinta se calcula una firma MinHash de sus
+#      'shingles' (secuencias de TAMANO_SHINGLE palabras).
+#   3. Con LSH (bandas de la firma) solo se comparan las respuestas que
+#      coinciden en alguna banda; las parejas con similitud estimada de
+#      Jaccard >= UMBRAL_SIMILITUD se agrupan alrededor de la variante más
+#      repetida (sin encadenar parecidos de parecidos).
+# Todo el proceso es lineal en el número de respuestas. Los grupos se guardan
+# por contenido de la columna, como los tokens.
+#
+# Este módulo no importa streamlit.
+
+NUMERO_PERMUTACIONES = 64
+BANDAS_LSH = 16
+TAMANO_SHINGLE = 2
+UMBRAL_SIMILITUD = 0.7
+# Parejas candidatas que se verifican de una vez (limita la memoria)
+TAMANO_LOTE_VERIFICACION = 200_000
+# Columnas cuyos grupos se mantienen en memoria
+MAXIMO_COLUMNAS_EN_CACHE = 64
+
+_cache_duplicados = OrderedDict()
+_bloqueo_cache = threading.Lock()
+
+# Cada permutación es x -> a*x + b (módulo 2^64, 'a' impar) sobre los hash ya
+# mezclados de los shingles; de la firma se guardan los 32 bits altos
+_rng = np.random.default_rng(20240601)
+_MULTIPLICADORES = _rng.integers(0, np.iinfo(np.int64).max, NUMERO_PERMUTACIONES, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_SUMANDOS = _rng.integers(0, np.iinfo(np.int64).max, NUMERO_PERMUTACIONES, dtype=np.int64).astype(np.uint64)
+
+def _mezclar(x):
+    """
+    Función de mezcla de 64 bits (splitmix64) sobre un array uint64.
+    """
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def _shingles(ids, desplazamientos):
+    """
+    Hash de cada secuencia de TAMANO_SHINGLE palabras consecutivas de cada
+    respuesta; las respuestas más cortas dan un único shingle con todas sus
+    palabras. Devuelve (respuesta de cada shingle, hash de cada shingle).
+    """
+    longitudes = np.diff(desplazamientos)
+    respuesta = np.repeat(np.arange(len(longitudes)), longitudes)
+    fin = desplazamientos[1:][respuesta]
+    posiciones = np.arange(len(ids))
+    valores = _mezclar(ids.astype(np.uint64) + np.uint64(1))
+    for t in range(1, TAMANO_SHINGLE):
+        dentro = posiciones + t < fin
+        siguiente = ids[np.minimum(posiciones + t, len(ids) - 1)].astype(np.uint64)
+        valores = np.where(dentro, _mezclar(valores ^ (siguiente + np.uint64(1))), valores)
+    inicio = desplazamientos[:-1][respuesta]
+    validos = (posiciones + TAMANO_SHINGLE <= fin) | ((longitudes[respuesta] < TAMANO_SHINGLE) & (posiciones == inicio))
+    return respuesta[validos], valores[validos]
+
+def firmas_minhash(ids, desplazamientos):
+    """
+    Matriz respuestas x NUMERO_PERMUTACIONES con la firma MinHash de cada
+    respuesta. Las respuestas sin palabras tienen una firma vacía (todo máximos).
+    """
+    n = len(desplazamientos) - 1
+    # Se rellena por permutaciones (filas contiguas) y se traspone al final
+    firmas = np.full((NUMERO_PERMUTACIONES, n), np.iinfo(np.uint32).max, dtype=np.uint32)
+    respuesta, valores = _shingles(ids, desplazamientos)
+    if len(valores) == 0:
+        return np.ascontiguousarray(firmas.T)
+    # Los shingles están ordenados por respuesta: el mínimo de cada tramo es un reduceat
+    con_shingles, inicios = np.unique(respuesta, return_index=True)
+    permutados = np.empty_like(valores)
+    for p in range(NUMERO_PERMUTACIONES):
+        np.multiply(valores, _MULTIPLICADORES[p], out=permutados)
+        permutados += _SUMANDOS[p]
+        permutados >>= np.uint64(32)
+        firmas[p, con_shingles] = np.minimum.reduceat(permutados, inicios)
+    return np.ascontiguousarray(firmas.T)
+
+def _parejas_candidatas(firmas):
+    """
+    Parejas de respuestas que coinciden en al menos una banda de la firma:
+    cada respuesta se empareja con la primera de su cubeta en cada banda.
+    """
+    if len(firmas) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    filas_por_banda = NUMERO_PERMUTACIONES // BANDAS_LSH
+    origen, destino = [], []
+    for banda in range(BANDAS_LSH):
+        columnas = firmas[:, banda * filas_por_banda:(banda + 1) * filas_por_banda]
+        clave = _mezclar(columnas[:, 0])
+        for c in range(1, filas_por_banda):
+            clave = _mezclar(clave ^ columnas[:, c])
+        orden = np.argsort(clave, kind="stable")
+        claves_ordenadas = clave[orden]
+        inicio_cubeta = np.concatenate(([True], claves_ordenadas[1:] != claves_ordenadas[:-1]))
+        primera = orden[np.maximum.accumulate(np.where(inicio_cubeta, np.arange(len(orden)), 0))]
+        en_cubeta = ~inicio_cubeta
+        origen.append(orden[en_cubeta])
+        destino.append(primera[en_cubeta])
+    origen = np.concatenate(origen)
+    destino = np.concatenate(destino)
+    parejas = np.unique(origen.astype(np.int64) * len(firmas) + destino)
+    return parejas // len(firmas), parejas % len(firmas)
+
+def _agrupar_en_estrella(adyacencia, repeticiones, primera):
+    """
+    Agrupa las respuestas distintas alrededor de centros: recorriendo de la
+    más repetida a la menos, cada respuesta sin grupo pasa a ser centro y se
+    lleva a sus vecinas sin grupo. Así todo el grupo se parece directamente a
+    su centro y no se encadenan comentarios cada vez más distintos.
+    Devuelve el centro de cada respuesta distinta.
+    """
+    centro = np.arange(adyacencia.shape[0])
+    con_vecinas = np.diff(adyacencia.indptr) > 0
+    orden = np.lexsort((primera, -repeticiones))
+    asignada = np.zeros(adyacencia.shape[0], dtype=bool)
+    for nodo in orden[con_vecinas[orden]]:
+        if asignada[nodo]:
+            continue
+        asignada[nodo] = True
+        vecinas = adyacencia.indices[adyacencia.indptr[nodo]:adyacencia.indptr[nodo + 1]]
+        vecinas = vecinas[~asignada[vecinas]]
+        centro[vecinas] = nodo
+        asignada[vecinas] = True
+    return centro
+
+class DuplicadosColumna:
+    """
+    Grupos de comentarios duplicados de una columna. 'grupos' asigna a cada
+    respuesta no vacía (en el orden de TokensColumna.filas) su grupo;
+    'representantes' es, para cada grupo, la posición de su centro (la
+    variante más repetida del grupo).
+    """
+
+    def __init__(self, columna, filas, grupos, representantes, variantes):
+        self.columna = columna
+        self.filas = filas
+        self.grupos = grupos
+        self.representantes = representantes
+        self.variantes = variantes
+        self.tamanos = np.bincount(grupos, minlength=len(representantes))
+
+    @property
+    def respuestas(self):
+        return len(self.grupos)
+
+    @property
+    def respuestas_distintas(self):
+        return len(self.representantes)
+
+    def tabla_grupos(self, serie, maximo=None):
+        """
+        Grupos con más de una respuesta, de mayor a menor: el comentario
+        representativo, cuántas veces aparece el grupo y cuántas variantes
+        distintas (textos no idénticos) contiene.
+        """
+        repetidos = np.flatnonzero(self.tamanos > 1)
+        repetidos = repetidos[np.argsort(-self.tamanos[repetidos], kind="stable")]
+        if maximo is not None:
+            repetidos = repetidos[:maximo]
+        textos = serie.iloc[self.filas[self.representantes[repetidos]]].astype(str).to_numpy()
+        return pd.DataFrame({
+            "Comentario": textos,
+            "Repeticiones": self.tamanos[repetidos],
+            "Variantes": self.variantes[repetidos]
+        })
+
+    def texto_representativo(self, serie):
+        """
+        Serie con el índice de las respuestas no vacías y, en cada una, el
+        texto del representante de su grupo.
+        """
+        posiciones = self.filas[self.representantes[self.grupos]]
+        return pd.Series(serie.iloc[posiciones].to_numpy(), index=serie.index[self.filas], name=serie.name)
+
+def agrupar_duplicados(serie):
+    """
+    Agrupa los comentarios duplicados y casi duplicados de una columna.
+    """
+    tokens = obtener_tokens_columna(serie)
+    with instrumentacion.medir("duplicados_texto", pregunta=serie.name, respuestas=len(tokens)):
+        # 1. Duplicados exactos: mismos tokens normalizados
+        claves = [
+            tokens.ids[inicio:fin].tobytes()
+            for inicio, fin in zip(tokens.desplazamientos[:-1], tokens.desplazamientos[1:])
+        ]
+        exactos, _ = pd.factorize(pd.Series(claves, dtype=object))
+        n_exactos = int(exactos.max()) + 1 if len(exactos) else 0
+        primera = np.full(n_exactos, len(exactos), dtype=np.int64)
+        np.minimum.at(primera, exactos, np.arange(len(exactos)))
+
+        # 2. Firmas de las respuestas distintas
+        longitudes = np.diff(tokens.desplazamientos)[primera]
+        desplazamientos = np.concatenate(([0], np.cumsum(longitudes)))
+        posiciones = np.repeat(tokens.desplazamientos[:-1][primera] - desplazamientos[:-1], longitudes) + np.arange(desplazamientos[-1])
+        firmas = firmas_minhash(tokens.ids[posiciones], desplazamientos)
+
+        # 3. Candidatas por LSH, verificadas con la similitud estimada por la firma
+        origen, destino = _parejas_candidatas(firmas)
+        con_palabras = longitudes > 0
+        aceptadas = []
+        for i in range(0, len(origen), TAMANO_LOTE_VERIFICACION):
+            a = origen[i:i + TAMANO_LOTE_VERIFICACION]
+            b = destino[i:i + TAMANO_LOTE_VERIFICACION]
+            similitud = (firmas[a] == firmas[b]).mean(axis=1)
+            aceptadas.append((similitud >= UMBRAL_SIMILITUD) & con_palabras[a] & con_palabras[b])
+        aceptadas = np.concatenate(aceptadas) if aceptadas else np.zeros(0, dtype=bool)
+        grafo = sparse.csr_matrix(
+            (np.ones(aceptadas.sum(), dtype=np.int8), (origen[aceptadas], destino[aceptadas])),
+            shape=(n_exactos, n_exactos)
+        )
+        centro = _agrupar_en_estrella((grafo + grafo.T).tocsr(), np.bincount(exactos, minlength=n_exactos), primera)
+
+        # Grupos numerados por orden de aparición; el representante es el centro
+        grupos, centros = pd.factorize(centro[exactos])
+        representantes = primera[np.asarray(centros)]
+        variantes = np.bincount(grupos[primera], minlength=len(representantes))
+
+    return DuplicadosColumna(
+        columna=serie.name,
+        filas=tokens.filas,
+        grupos=grupos.astype(np.int64),
+        representantes=representantes,
+        variantes=variantes
+    )
+
+def obtener_duplicados(serie):
+    """
+    Devuelve los grupos de duplicados de una columna, reutilizando los ya
+    calculados si la misma columna (mismo contenido y nombre) se procesó antes.
+    """
+    clave = huella_columna(serie)
+    with _bloqueo_cache:
+        if clave in _cache_duplicados:
+            _cache_duplicados.move_to_end(clave)
+            return _cache_duplicados[clave]
+
+    duplicados = agrupar_duplicados(serie)
+
+    with _bloqueo_cache:
+        _cache_duplicados[clave] = duplicados
+        while len(_cache_duplicados) > MAXIMO_COLUMNAS_EN_CACHE:
+            _cache_duplicados.popitem(last=False)
+    return duplicados
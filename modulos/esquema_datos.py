@@ -0,0 +1,95 @@
+# /modulos/esquema_datos.py
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from modulos.preguntas import obtener_preguntas_cuantitativas, obtener_preguntas_cualitativas
+from modulos.almacen_datos import heredar_identidad
+from modulos.instrumentacion import instrumentacion
+
+# Las primeras columnas del archivo son los criterios de referencia (A-E)
+NUMERO_COLUMNAS_REFERENCIA = 5
+
+TIPO_REFERENCIA = "referencia"
+TIPO_NUMERICA = "numerica"
+TIPO_CATEGORICA = "categorica"
+TIPO_TEXTO = "texto"
+
+def es_pregunta_de_comentario(pregunta):
+    """
+    Indica si una pregunta es de texto libre (comentarios).
+    """
+    return "comentarios" in pregunta.lower()
+
+def es_pregunta_de_seleccion_multiple(pregunta):
+    """
+    Indica si una pregunta admite varias opciones por respuesta.
+    """
+    return "selección múltiple" in pregunta.lower()
+
+def construir_esquema(df):
+    """
+    Asigna un tipo a cada columna conocida del archivo a partir de los
+    listados de preguntas cuantitativas y cualitativas.
+    """
+    esquema = {}
+    for col in df.columns[:NUMERO_COLUMNAS_REFERENCIA]:
+        esquema[col] = TIPO_REFERENCIA
+    for col in obtener_preguntas_cuantitativas(df):
+        esquema[col] = TIPO_NUMERICA
+    for col in obtener_preguntas_cualitativas(df):
+        esquema[col] = TIPO_TEXTO if es_pregunta_de_comentario(col) else TIPO_CATEGORICA
+    return esquema
+
+def _a_numerico_compacto(serie):
+    """
+    Convierte una serie al tipo numérico más pequeño que conserva sus valores:
+    entero con nulos (Int8/Int16/Int32) si todos son enteros, o float32 si no.
+    """
+    if is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+        numerica = serie
+    else:
+        numerica = pd.to_numeric(serie, errors='coerce')
+    valores = numerica.dropna()
+    if valores.empty:
+        return numerica.astype("float32")
+    if (valores % 1 == 0).all():
+        minimo, maximo = valores.min(), valores.max()
+        for tipo, limite in (("Int8", 127), ("Int16", 32767), ("Int32", 2147483647)):
+            if -limite - 1 <= minimo and maximo <= limite:
+                return numerica.astype(tipo)
+    return numerica.astype("float32")
+
+def aplicar_esquema(df, esquema=None):
+    """
+    Convierte una única vez, al cargar el archivo, cada columna a un tipo compacto:
+    preguntas cuantitativas a numéricos pequeños, respuestas categóricas y
+    columnas de referencia a 'category', y deja los comentarios como texto.
+    Devuelve el DataFrame tipado y un resumen con la memoria antes y después.
+    """
+    if esquema is None:
+        esquema = construir_esquema(df)
+
+    memoria_antes = int(df.memory_usage(deep=True).sum())
+    columnas = {}
+    with instrumentacion.medir("esquema", filas=len(df), columnas=df.shape[1]):
+        for col in df.columns:
+            tipo = esquema.get(col)
+            if tipo == TIPO_NUMERICA:
+                columnas[col] = _a_numerico_compacto(df[col])
+            elif tipo in (TIPO_CATEGORICA, TIPO_REFERENCIA):
+                columnas[col] = df[col].astype("category")
+            else:
+                columnas[col] = df[col]
+        df_tipado = pd.DataFrame(columnas, index=df.index)
+    df_tipado.attrs = dict(df.attrs)
+    # El tipado no cambia el contenido: conserva la identidad del dataset guardado
+    heredar_identidad(df_tipado, df)
+    memoria_despues = int(df_tipado.memory_usage(deep=True).sum())
+
+    resumen = {
+        "esquema": esquema,
+        "memoria_antes": memoria_antes,
+        "memoria_despues": memoria_despues,
+        "memoria_ahorrada": memoria_antes - memoria_despues
+    }
+    return df_tipado, resumen
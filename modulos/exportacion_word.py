@@ -0,0 +1,59 @@
+# /modulos/exportacion_word.py
+
+import re
+import math
+import numbers
+from xml.sax.saxutils import escape
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+# Escritura de tablas de Word en bloque. Rellenar una tabla con
+# tabla.add_row().cells celda a celda recorre la tabla entera en cada fila;
+# aquí se genera el XML de todas las filas de una vez y se añade a la tabla.
+
+# Caracteres de control que no admite XML 1.0
+_CARACTERES_NO_VALIDOS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _texto_celda(valor):
+    if valor is None:
+        return ""
+    # Recuentos como enteros; porcentajes, medias y demás decimales con dos cifras
+    if isinstance(valor, numbers.Integral) and not isinstance(valor, bool):
+        return str(int(valor))
+    if isinstance(valor, numbers.Real) and not isinstance(valor, bool):
+        return "-" if math.isnan(valor) else f"{valor:.2f}"
+    return escape(_CARACTERES_NO_VALIDOS.sub("", str(valor)))
+
+def _xml_fila(valores, anchos):
+    celdas = []
+    for valor, ancho in zip(valores, anchos):
+        texto = _texto_celda(valor)
+        contenido = f'<w:r><w:t xml:space="preserve">{texto}</w:t></w:r>' if texto else ""
+        celdas.append(
+            f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{ancho}"/></w:tcPr>'
+            f'<w:p>{contenido}</w:p></w:tc>'
+        )
+    return "<w:tr>" + "".join(celdas) + "</w:tr>"
+
+def agregar_tabla(document, filas, encabezados, estilo=None):
+    """
+    Añade al documento una tabla completa en una sola operación.
+    'filas' puede ser un DataFrame, un array o cualquier iterable de filas;
+    los enteros se escriben sin decimales, los demás números con dos
+    decimales (o "-" si faltan) y el resto con str(). Devuelve la tabla de
+    python-docx.
+    """
+    if hasattr(filas, "itertuples"):
+        filas = filas.itertuples(index=False, name=None)
+    encabezados = list(encabezados)
+
+    tabla = document.add_table(rows=0, cols=len(encabezados))
+    if estilo is not None:
+        tabla.style = estilo
+    anchos = [col.w.twips for col in tabla._tbl.tblGrid.gridCol_lst]
+
+    xml_filas = [_xml_fila(encabezados, anchos)]
+    xml_filas.extend(_xml_fila(fila, anchos) for fila in filas)
+    contenedor = parse_xml(f"<w:tbl {nsdecls('w')}>{''.join(xml_filas)}</w:tbl>")
+    tabla._tbl.extend(list(contenedor))
+    return tabla
@@ -0,0 +1,186 @@
+# /modulos/filtros.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from modulos.almacen_datos import hash_almacenado, fijar_identidad, heredar_identidad, marcar_solo_lectura
+from modulos.cache_resultados import huella_pregunta
+from modulos.esquema_datos import es_pregunta_de_seleccion_multiple
+from modulos.seleccion_multiple import obtener_indicadores
+from modulos.instrumentacion import instrumentacion
+
+# Filtro global de la aplicación: las filas que cumplen varias condiciones
+# "columna con alguno de estos valores" (una por columna de referencia o
+# pregunta). Cada columna se codifica una sola vez (códigos enteros sobre sus
+# valores distintos), cada condición es una máscara booleana guardada por
+# (contenido de la columna, valores) y el filtro completo es el producto
+# lógico de sus máscaras, de modo que al añadir o quitar una condición solo
+# se calcula la que cambia. En las preguntas de selección múltiple los
+# valores son las opciones, no las combinaciones.
+#
+# Los módulos de análisis reciben una vista con las filas del filtro, que se
+# construye una vez por (dataset, filtro) y tiene registrado su identificador
+# (ver hash_vista): las huellas de sus columnas se recuerdan igual que las del
+# dataset completo, así que volver a una unidad ya consultada reutiliza sus
+# resultados de la caché. Las columnas de comentarios de la vista se
+# tokenizan a partir de los tokens de la columna completa.
+#
+# Este módulo no importa streamlit.
+
+# Columnas codificadas, condiciones y vistas que se mantienen en memoria
+MAXIMO_COLUMNAS_CODIFICADAS = 256
+MAXIMO_MASCARAS_EN_CACHE = 1024
+MAXIMO_VISTAS_EN_CACHE = 8
+
+_cache_codigos = OrderedDict()
+_cache_mascaras = OrderedDict()
+_cache_vistas = OrderedDict()
+_bloqueo_cache = threading.Lock()
+
+def _obtener(cache, clave, calcular, maximo):
+    """
+    Devuelve cache[clave], calculándolo con 'calcular' si no está (LRU).
+    """
+    with _bloqueo_cache:
+        if clave in cache:
+            cache.move_to_end(clave)
+            return cache[clave]
+    valor = calcular()
+    with _bloqueo_cache:
+        cache[clave] = valor
+        while len(cache) > maximo:
+            cache.popitem(last=False)
+    return valor
+
+def crear_filtro(selecciones):
+    """
+    Crea un filtro a partir de un diccionario columna -> valores elegidos; las
+    columnas sin valores no filtran. El filtro es una tupla ordenada de
+    condiciones (columna, valores), así que sirve como clave de caché.
+    """
+    return tuple(sorted(
+        (str(columna), tuple(sorted(valores, key=str)))
+        for columna, valores in selecciones.items() if valores
+    ))
+
+def describir_filtro(filtro):
+    """
+    Texto breve con las condiciones del filtro.
+    """
+    return "; ".join(f"{columna}: {', '.join(map(str, valores))}" for columna, valores in filtro)
+
+def codificar_columna(df, columna):
+    """
+    Códigos de cada fila de una columna sobre sus valores distintos (-1 en los
+    vacíos) y la lista de esos valores, ordenados. Se calcula una vez por
+    contenido de la columna.
+    """
+    def calcular():
+        try:
+            codigos, valores = pd.factorize(df[columna], sort=True)
+        except TypeError:
+            # Tipos mezclados que no se pueden ordenar
+            codigos, valores = pd.factorize(df[columna])
+        return codigos.astype(np.int32), list(valores)
+    return _obtener(_cache_codigos, huella_pregunta(df, columna), calcular, MAXIMO_COLUMNAS_CODIFICADAS)
+
+def valores_columna(df, columna):
+    """
+    Valores que se pueden elegir en el filtro para una columna: sus valores
+    distintos o, en las preguntas de selección múltiple, sus opciones.
+    """
+    if es_pregunta_de_seleccion_multiple(columna):
+        return sorted(obtener_indicadores(df[columna]).opciones)
+    return codificar_columna(df, columna)[1]
+
+def mascara_condicion(df, columna, valores):
+    """
+    Máscara booleana de las filas en las que 'columna' toma alguno de los
+    'valores' (o incluye alguna de esas opciones, en selección múltiple).
+    """
+    def calcular():
+        elegidos = set(valores)
+        if es_pregunta_de_seleccion_multiple(columna):
+            indicadores = obtener_indicadores(df[columna])
+            opciones = [i for i, opcion in enumerate(indicadores.opciones) if opcion in elegidos]
+            return indicadores.matriz[:, opciones].getnnz(axis=1) > 0
+        codigos, distintos = codificar_columna(df, columna)
+        # Tabla de búsqueda por código; la última posición corresponde a los vacíos (-1)
+        tabla = np.zeros(len(distintos) + 1, dtype=bool)
+        tabla[:-1] = [valor in elegidos for valor in distintos]
+        return tabla[codigos]
+    clave = (huella_pregunta(df, columna), tuple(valores))
+    return _obtener(_cache_mascaras, clave, calcular, MAXIMO_MASCARAS_EN_CACHE)
+
+def mascara_filtro(df, filtro):
+    """
+    Máscara booleana de las filas que cumplen todas las condiciones del
+    filtro, o None si el filtro está vacío. Las condiciones sobre columnas que
+    no existen en el DataFrame se ignoran.
+    """
+    mascara = None
+    for columna, valores in filtro:
+        if columna not in df.columns:
+            continue
+        condicion = mascara_condicion(df, columna, valores)
+        mascara = condicion if mascara is None else mascara & condicion
+    return mascara
+
+def aplicar_filtro(df, filtro):
+    """
+    Devuelve la vista del DataFrame con las filas que cumplen el filtro (el
+    propio DataFrame si no filtra nada). Para un dataset guardado, la vista
+    se construye una vez por filtro y se reutiliza en las ejecuciones siguientes.
+    """
+    mascara = mascara_filtro(df, filtro)
+    if mascara is None:
+        return df
+    hash_dataset = hash_almacenado(df)
+    if hash_dataset is None:
+        return df[mascara]
+
+    def calcular():
+        with instrumentacion.medir("filtro_global", condiciones=len(filtro), filas=int(mascara.sum())):
+            filas = np.flatnonzero(mascara)
+            vista = df.take(filas)
+            huella = hashlib.blake2b(repr((hash_dataset, filtro)).encode("utf-8"), digest_size=16)
+            vista.attrs["hash_vista"] = huella.hexdigest()
+            vista.attrs["filas_vista"] = len(vista)
+            fijar_identidad(vista, hash_vista=huella.hexdigest())
+            # La vista se comparte entre ejecuciones y sesiones, como el dataset
+            marcar_solo_lectura(vista)
+        # Con la vista se guardan sus filas y el DataFrame completo, para origen_vista
+        return vista, filas, df
+    vista, _, _ = _obtener(_cache_vistas, (hash_dataset, filtro), calcular, MAXIMO_VISTAS_EN_CACHE)
+    return heredar_identidad(vista.copy(deep=False), vista)
+
+def origen_vista(serie, huella):
+    """
+    Para una columna de una vista de aplicar_filtro, devuelve el DataFrame
+    completo del que procede y las posiciones de sus filas en él; None si
+    no es una vista que siga en memoria. 'huella' es el hash del contenido
+    de la columna: una columna derivada que conserva attrs pero ha cambiado
+    no se toma por la de la vista.
+    """
+    identificador = serie.attrs.get("hash_vista")
+    if identificador is None or serie.attrs.get("filas_vista") != len(serie):
+        return None
+    with _bloqueo_cache:
+        candidatas = [
+            (vista, filas, df) for vista, filas, df in _cache_vistas.values()
+            if vista.attrs["hash_vista"] == identificador
+        ]
+    for vista, filas, df in candidatas:
+        if serie.name in vista.columns and huella_pregunta(vista, serie.name) == huella:
+            return df, filas
+    return None
+
+def descartar_vistas(hash_dataset):
+    """
+    Elimina las vistas filtradas de un dataset que ha cambiado.
+    """
+    with _bloqueo_cache:
+        for clave in [clave for clave in _cache_vistas if clave[0] == hash_dataset]:
+            del _cache_vistas[clave]
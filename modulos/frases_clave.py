@@ -0,0 +1,182 @@
+# /modulos/frases_clave.py
+
+import numpy as np
+import pandas as pd
+from modulos.instrumentacion import instrumentacion
+
+# Frases clave (bigramas y trigramas) de las columnas de comentarios. Contar
+# todos los n-gramas distintos de una columna grande ocupa mucha memoria, así
+# que las respuestas se recorren por lotes y los recuentos se resumen con el
+# algoritmo de Misra-Gries (equivalente a Space-Saving): cada grupo conserva
+# como mucho CAPACIDAD_RESUMEN n-gramas candidatos, y todo n-grama que
+# aparece más de total / (CAPACIDAD_RESUMEN + 1) veces sigue entre ellos.
+# Después se recuentan exactamente solo los candidatos y se ordenan por
+# información mutua puntual (PMI): cuánto más aparecen juntas las palabras
+# de lo que cabría esperar por su frecuencia por separado. Se usa la PMI
+# normalizada (entre -1 y 1), comparable entre bigramas y trigramas.
+#
+# Los n-gramas se identifican por los ids de vocabulario de sus palabras
+# empaquetados en un entero, sin construir cadenas hasta el resultado final.
+# No se consideran los que empiezan o terminan por una palabra vacía
+# ("de la"), pero sí los que la llevan en medio ("falta de supervisión").
+#
+# Este módulo no importa streamlit.
+
+ORDENES_NGRAMA = (2, 3)
+CAPACIDAD_RESUMEN = 2000
+TAMANO_LOTE_RESPUESTAS = 5000
+# Frecuencia mínima para considerar una frase y frases que se devuelven por grupo
+FRECUENCIA_MINIMA_FRASE = 3
+NUMERO_FRASES = 10
+
+# Bits por palabra en la clave de un n-grama (vocabularios de hasta 2^20 términos)
+_BITS_TERMINO = 20
+
+def _lote(tokens, respuestas):
+    """
+    Ids y desplazamientos de un subconjunto de respuestas, concatenados.
+    """
+    longitudes = np.diff(tokens.desplazamientos)[respuestas]
+    desplazamientos = np.concatenate(([0], np.cumsum(longitudes)))
+    posiciones = np.repeat(tokens.desplazamientos[:-1][respuestas] - desplazamientos[:-1], longitudes) + np.arange(desplazamientos[-1])
+    return tokens.ids[posiciones].astype(np.int64), desplazamientos
+
+def claves_ngramas(ids, desplazamientos, n, mascara_vacias):
+    """
+    Claves de los n-gramas de orden n de cada respuesta (sin cruzar de una
+    respuesta a otra). Devuelve (respuesta de cada n-grama, clave, número
+    total de n-gramas de cada respuesta antes de filtrar las palabras vacías).
+    """
+    longitudes = np.diff(desplazamientos)
+    totales = np.maximum(longitudes - n + 1, 0)
+    respuesta = np.repeat(np.arange(len(longitudes)), totales)
+    inicio = np.arange(len(respuesta)) + np.repeat(desplazamientos[:-1] - np.concatenate(([0], np.cumsum(totales)[:-1])), totales)
+    claves = np.zeros(len(respuesta), dtype=np.int64)
+    for t in range(n):
+        claves = (claves << _BITS_TERMINO) | ids[inicio + t]
+    validos = ~mascara_vacias[ids[inicio]] & ~mascara_vacias[ids[inicio + n - 1]]
+    return respuesta[validos], claves[validos], totales
+
+def palabras_ngrama(clave, n):
+    """
+    Ids de vocabulario de las palabras de un n-grama, en orden.
+    """
+    mascara = (1 << _BITS_TERMINO) - 1
+    return [(clave >> (_BITS_TERMINO * (n - 1 - t))) & mascara for t in range(n)]
+
+class ResumenNgramas:
+    """
+    Resumen de Misra-Gries por grupo: como mucho 'capacidad' n-gramas por
+    grupo, con una cota inferior de su frecuencia. Se actualiza por lotes.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD_RESUMEN):
+        self.capacidad = capacidad
+        self.conteos = None
+
+    def actualizar(self, grupos, claves):
+        """
+        Añade las apariciones de un lote ('grupos' y 'claves' de cada n-grama).
+        """
+        if len(claves) == 0:
+            return
+        nuevos = pd.Series(np.ones(len(claves), dtype=np.int64)).groupby([grupos, claves]).sum()
+        nuevos.index.names = ["grupo", "clave"]
+        if self.conteos is not None:
+            # Las claves ocupan hasta 60 bits: deben seguir siendo int64 (no float) al concatenar
+            nuevos = pd.concat([self.conteos, nuevos]).groupby(level=["grupo", "clave"], sort=False).sum()
+        conteos = nuevos
+        # En cada grupo se resta la cuenta del primer candidato que no cabe y se
+        # descartan los que quedan a cero (paso de fusión de Misra-Gries)
+        grupo = conteos.index.get_level_values("grupo")
+        rango = conteos.groupby(level="grupo").rank(method="first", ascending=False)
+        corte = conteos.where(rango == self.capacidad + 1).groupby(grupo).transform("max").fillna(0).astype(np.int64)
+        conteos = conteos - corte.to_numpy()
+        self.conteos = conteos[conteos > 0]
+
+    def candidatos(self):
+        """
+        Pares (grupo, clave) que siguen en el resumen.
+        """
+        if self.conteos is None:
+            return pd.MultiIndex.from_arrays([np.zeros(0, dtype=np.int64)] * 2, names=["grupo", "clave"])
+        return self.conteos.index
+
+def extraer_frases(tokens, seleccion=None, codigos_grupo=None, n_grupos=1,
+                   numero_frases=NUMERO_FRASES, frecuencia_minima=FRECUENCIA_MINIMA_FRASE):
+    """
+    Frases clave de una columna tokenizada, en conjunto o por grupos.
+    'seleccion' son las posiciones de las respuestas a considerar (None para
+    todas) y 'codigos_grupo' asigna a cada respuesta un grupo entre 0 y
+    n_grupos - 1 (o -1 para no contarla). Devuelve un DataFrame con el grupo,
+    la frase, su frecuencia y su PMI normalizada, con las 'numero_frases' de
+    mayor PMI de cada grupo entre las más frecuentes.
+    """
+    respuestas = np.arange(len(tokens)) if seleccion is None else np.asarray(seleccion)
+    grupos_respuesta = np.zeros(len(tokens), dtype=np.int64) if codigos_grupo is None else np.asarray(codigos_grupo)
+    respuestas = respuestas[grupos_respuesta[respuestas] >= 0]
+    mascara_vacias = tokens.mascara_palabras_vacias()
+    lotes = [respuestas[i:i + TAMANO_LOTE_RESPUESTAS] for i in range(0, len(respuestas), TAMANO_LOTE_RESPUESTAS)]
+    columnas = ["grupo", "Frase", "Frecuencia", "PMI"]
+    if not lotes:
+        return pd.DataFrame(columns=columnas)
+
+    with instrumentacion.medir("frases_clave", pregunta=tokens.columna, respuestas=len(respuestas)):
+        # Frecuencia de cada palabra y número de palabras de cada grupo, para la PMI
+        frecuencias_palabras = tokens.frecuencias_por_grupo(
+            np.where(np.isin(np.arange(len(tokens)), respuestas), grupos_respuesta, -1),
+            n_grupos, excluir_palabras_vacias=False
+        ).tocsr()
+        palabras_grupo = np.asarray(frecuencias_palabras.sum(axis=1)).ravel()
+
+        tablas = []
+        for n in ORDENES_NGRAMA:
+            # 1. Recorrido por lotes con memoria acotada: candidatos de cada grupo
+            resumen = ResumenNgramas()
+            for lote in lotes:
+                ids, desplazamientos = _lote(tokens, lote)
+                respuesta, claves, _ = claves_ngramas(ids, desplazamientos, n, mascara_vacias)
+                resumen.actualizar(grupos_respuesta[lote][respuesta], claves)
+            candidatos = resumen.candidatos()
+            if len(candidatos) == 0:
+                continue
+
+            # 2. Recuento exacto solo de los candidatos (y total de n-gramas por grupo)
+            codigos_candidato = pd.Series(np.arange(len(candidatos)), index=candidatos)
+            conteos = np.zeros(len(candidatos), dtype=np.int64)
+            ngramas_grupo = np.zeros(n_grupos, dtype=np.int64)
+            for lote in lotes:
+                ids, desplazamientos = _lote(tokens, lote)
+                respuesta, claves, totales = claves_ngramas(ids, desplazamientos, n, mascara_vacias)
+                ngramas_grupo += np.bincount(grupos_respuesta[lote], weights=totales, minlength=n_grupos).astype(np.int64)
+                posiciones = codigos_candidato.reindex(pd.MultiIndex.from_arrays([grupos_respuesta[lote][respuesta], claves])).to_numpy()
+                encontrados = ~np.isnan(posiciones)
+                conteos += np.bincount(posiciones[encontrados].astype(np.int64), minlength=len(candidatos))
+
+            # 3. PMI = log2(p(frase) / producto de p(palabra)) dentro de cada grupo,
+            # normalizada por su máximo, -(n - 1) * log2(p(frase))
+            grupo = candidatos.get_level_values("grupo").to_numpy()
+            clave = candidatos.get_level_values("clave").to_numpy()
+            vistos = conteos > 0
+            grupo, clave, conteos = grupo[vistos], clave[vistos], conteos[vistos]
+            log_probabilidad = np.log2(conteos / np.maximum(ngramas_grupo[grupo], 1))
+            pmi = log_probabilidad.copy()
+            for palabra in palabras_ngrama(clave, n):
+                frecuencia = np.asarray(frecuencias_palabras[grupo, palabra]).ravel()
+                pmi -= np.log2(np.maximum(frecuencia, 1) / np.maximum(palabras_grupo[grupo], 1))
+            maximo = -(n - 1) * log_probabilidad
+            pmi_normalizada = np.clip(np.where(maximo > 0, pmi / np.where(maximo > 0, maximo, 1), 1.0), -1, 1)
+            tablas.append(pd.DataFrame({"grupo": grupo, "clave": clave, "n": n, "Frecuencia": conteos, "PMI": pmi_normalizada}))
+
+        if not tablas:
+            return pd.DataFrame(columns=columnas)
+        frases = pd.concat(tablas, ignore_index=True)
+        frases = frases[frases["Frecuencia"] >= frecuencia_minima]
+        frases = frases.sort_values(["grupo", "PMI", "Frecuencia"], ascending=[True, False, False], kind="stable")
+        frases = frases.groupby("grupo", sort=False).head(numero_frases)
+        frases["Frase"] = [
+            " ".join(tokens.vocabulario[palabra] for palabra in palabras_ngrama(int(clave), n))
+            for clave, n in zip(frases["clave"], frases["n"])
+        ]
+        frases["PMI"] = frases["PMI"].round(2)
+    return frases[columnas].reset_index(drop=True)
@@ -0,0 +1,118 @@
+# /modulos/fusion_datos.py
+
+import time
+import pandas as pd
+from io import BytesIO
+from modulos.lectura_excel import (
+    obtener_contenido_archivo,
+    leer_archivo_excel,
+    leer_archivos_en_paralelo,
+    leer_archivos_por_bloques,
+    alinear_columnas
+)
+from modulos.almacen_datos import calcular_hash_contenidos, cargar_dataset, guardar_dataset
+from modulos.instrumentacion import instrumentacion
+
+# Núcleo de la carga y la fusión de libros de Excel, común a la aplicación y
+# al generador de informes por lotes: lee un libro o varios, alinea las
+# columnas de la fusión con la cabecera del primero, los concatena una única
+# vez y guarda la copia columnar del resultado. No registra la fusión en el índice (eso lo hace
+# la aplicación, que le da nombre) ni muestra nada: los errores se lanzan
+# como excepciones (ErrorLecturaExcel, LimiteMemoriaExcedido o ValueError).
+#
+# Este módulo no importa streamlit.
+
+def cargar_archivo(archivo, streaming=False, limite_memoria_mb=None):
+    """
+    Carga un único archivo de Excel. Si ya se había subido el mismo archivo,
+    se lee su copia columnar en lugar de volver a interpretar el .xlsx.
+    Con streaming=True el libro se lee por bloques con memoria acotada y
+    puede lanzar LimiteMemoriaExcedido.
+    """
+    nombre, contenido = obtener_contenido_archivo(archivo)
+    hash_dataset = calcular_hash_contenidos([contenido], "archivo")
+    df = cargar_dataset(hash_dataset)
+    if df is None:
+        with instrumentacion.medir("lectura_excel", archivo=nombre, streaming=streaming):
+            if streaming:
+                _, df, _, _ = leer_archivo_excel(nombre, contenido, streaming=True, limite_memoria_mb=limite_memoria_mb)
+            else:
+                df = pd.read_excel(BytesIO(contenido))
+        guardar_dataset(hash_dataset, df)
+        df = cargar_dataset(hash_dataset)
+    return df
+
+def leer_libros(contenidos, paralelo=True, max_workers=None, streaming=False, limite_memoria_mb=None):
+    """
+    Lee los libros en paralelo o, con streaming=True, por bloques y de uno en uno.
+    Registra el tiempo de lectura de cada archivo y el del conjunto.
+    """
+    with instrumentacion.medir("lectura_libros", archivos=len(contenidos), streaming=streaming):
+        if streaming:
+            lecturas = leer_archivos_por_bloques(contenidos, limite_memoria_mb=limite_memoria_mb)
+        else:
+            lecturas = leer_archivos_en_paralelo(contenidos, max_workers=max_workers if paralelo else 1)
+    # Los archivos pueden leerse en procesos trabajadores: de cada uno se registra su tiempo
+    for nombre, _, filas_procesadas, segundos in lecturas:
+        instrumentacion.registrar("lectura_excel", segundos, archivo=nombre, filas=filas_procesadas)
+    return lecturas
+
+def fusionar_contenidos(contenidos, paralelo=True, max_workers=None, streaming=False, limite_memoria_mb=None):
+    """
+    Fusiona una lista de (nombre, bytes) de libros de Excel. Devuelve el
+    DataFrame guardado (con su hash en attrs) y el log de la fusión, sin
+    nombre. Si estos mismos archivos ya se fusionaron se devuelve la copia
+    guardada sin volver a leerlos.
+    """
+    if not contenidos:
+        raise ValueError("No se han proporcionado archivos para fusionar.")
+    inicio = time.perf_counter()
+    hash_dataset = calcular_hash_contenidos([contenido for _, contenido in contenidos], "fusion")
+    df_cache = cargar_dataset(hash_dataset)
+    if df_cache is not None:
+        return df_cache, {
+            "Origen": "Caché",
+            "Total de filas": len(df_cache),
+            "Tiempo total de fusión (s)": round(time.perf_counter() - inicio, 3)
+        }
+
+    lecturas = leer_libros(contenidos, paralelo, max_workers, streaming, limite_memoria_mb)
+
+    # La primera fila de los archivos adicionales se ignora: sus columnas
+    # se alinean con la cabecera del primer archivo
+    columnas_base = lecturas[0][1].columns
+    dataframes = []
+    avisos = []
+    for nombre, df_temp, _, _ in lecturas:
+        dataframes.append(alinear_columnas(df_temp, columnas_base, avisos, nombre))
+
+    # Una única concatenación evita recopiar el DataFrame acumulado en cada archivo
+    inicio_concat = time.perf_counter()
+    with instrumentacion.medir("concatenacion", archivos=len(dataframes)):
+        df_final = pd.concat(dataframes, ignore_index=True)
+    segundos_concat = time.perf_counter() - inicio_concat
+    del dataframes
+
+    # Limpieza final: las filas vacías ya se eliminan al leer cada archivo
+    df_final.dropna(how='all', inplace=True)
+    guardar_dataset(hash_dataset, df_final)
+
+    log = {
+        "Total de filas procesadas": sum(filas for _, _, filas, _ in lecturas),
+        "Filas por archivo": {nombre: filas for nombre, _, filas, _ in lecturas},
+        "Detalle por archivo": {
+            nombre: {"Filas": filas, "Tiempo de lectura (s)": round(segundos, 3)}
+            for nombre, _, filas, segundos in lecturas
+        },
+        "Tiempo de concatenación (s)": round(segundos_concat, 3),
+        "Tiempo total de fusión (s)": round(time.perf_counter() - inicio, 3)
+    }
+    if avisos:
+        log["Avisos"] = avisos
+    return cargar_dataset(hash_dataset), log
+
+def fusionar_archivos(archivos, **opciones):
+    """
+    Igual que fusionar_contenidos, a partir de rutas o archivos cargados.
+    """
+    return fusionar_contenidos([obtener_contenido_archivo(archivo) for archivo in archivos], **opciones)
@@ -0,0 +1,142 @@
+# /modulos/graficos.py
+
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from modulos.instrumentacion import instrumentacion
+
+# Cada gráfico se describe con una especificación (diccionario serializable)
+# y se dibuja una sola vez a PNG. La vista de Streamlit y la exportación a
+# Word comparten esos bytes, y la figura de matplotlib se libera en el acto.
+#
+# Este módulo no importa streamlit: sus funciones se ejecutan en procesos
+# trabajadores con el backend Agg.
+
+DPI_FIGURAS = 100
+# Por debajo de este número de gráficos no compensa arrancar procesos
+MINIMO_FIGURAS_EN_PARALELO = 6
+
+_pool = None
+_bloqueo_pool = threading.Lock()
+
+def _dibujar_histograma(ax, datos):
+    ax.hist(datos["bordes"][:-1], bins=datos["bordes"], weights=datos["conteos"])
+    ax.set_xlabel("Valor")
+    ax.set_ylabel("Frecuencia")
+
+def _dibujar_barras(ax, datos):
+    import seaborn as sns
+    sns.barplot(x=datos["x"], y=datos["y"], data=datos["tabla"], ax=ax, palette='viridis')
+
+def _dibujar_pastel(ax, datos):
+    import seaborn as sns
+    ax.pie(datos["valores"], labels=datos["etiquetas"], autopct='%1.1f%%', startangle=90, colors=sns.color_palette('pastel'))
+    ax.axis('equal')
+
+def _dibujar_mapa_calor(ax, datos):
+    import numpy as np
+    valores = np.asarray(datos["valores"], dtype="float64")
+    imagen = ax.imshow(np.ma.masked_invalid(valores), aspect="auto", cmap="viridis", vmin=0)
+    ax.figure.colorbar(imagen, ax=ax, label=datos.get("etiqueta_valores"))
+    ax.set_xticks(range(len(datos["columnas"])), datos["columnas"], rotation=45, ha="right")
+    ax.set_yticks(range(len(datos["filas"])), datos["filas"], fontsize=7)
+    # Las celdas marcadas se señalan con un asterisco
+    for i, j in zip(*np.nonzero(np.asarray(datos["marcas"], dtype=bool))):
+        ax.text(j, i, "*", ha="center", va="center", color="white", fontsize=10, fontweight="bold")
+    # Las etiquetas de las preguntas son largas: ajustar los márgenes al guardar
+    ax.figure.set_layout_engine("tight")
+
+_DIBUJANTES = {
+    "histograma": _dibujar_histograma,
+    "barras": _dibujar_barras,
+    "pastel": _dibujar_pastel,
+    "mapa_calor": _dibujar_mapa_calor
+}
+
+def especificacion(tipo, titulo, datos, tamano=(6.4, 4.8)):
+    """
+    Crea la especificación de un gráfico.
+    """
+    return {"tipo": tipo, "titulo": titulo, "datos": datos, "tamano": tamano}
+
+def renderizar_figura(espec):
+    """
+    Dibuja un gráfico a partir de su especificación y devuelve los bytes PNG.
+    Se usa Figure directamente (sin pyplot), así que la figura no queda
+    registrada en ningún sitio y se libera al salir de la función.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=espec["tamano"])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    _DIBUJANTES[espec["tipo"]](ax, espec["datos"])
+    ax.set_title(espec["titulo"])
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", dpi=DPI_FIGURAS)
+    return buffer.getvalue()
+
+def _renderizar_con_tiempo(espec):
+    # En los procesos trabajadores se mide aquí y el tiempo se devuelve con la imagen
+    inicio = time.perf_counter()
+    imagen = renderizar_figura(espec)
+    return imagen, time.perf_counter() - inicio
+
+def _renderizar_en_proceso(especificaciones):
+    imagenes = []
+    for espec in especificaciones:
+        with instrumentacion.medir("renderizado_figura", tipo=espec["tipo"], figura=espec["titulo"]):
+            imagenes.append(renderizar_figura(espec))
+    return imagenes
+
+def _inicializar_trabajador():
+    import matplotlib
+    matplotlib.use("Agg")
+
+def _obtener_pool():
+    """
+    Devuelve el pool de procesos compartido, creándolo la primera vez.
+    """
+    global _pool
+    with _bloqueo_pool:
+        if _pool is None:
+            contexto = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=contexto,
+                initializer=_inicializar_trabajador
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+def renderizar_figuras(especificaciones, paralelo=True):
+    """
+    Dibuja una lista de especificaciones y devuelve sus PNG en el mismo orden.
+    Con muchos gráficos el trabajo se reparte en un pool de procesos.
+    Se registra el tiempo de dibujo de cada gráfico y el del conjunto.
+    """
+    especificaciones = list(especificaciones)
+    with instrumentacion.medir("renderizado_figuras", figuras=len(especificaciones)):
+        return _renderizar_figuras(especificaciones, paralelo)
+
+def _renderizar_figuras(especificaciones, paralelo):
+    global _pool
+    if not paralelo or len(especificaciones) < MINIMO_FIGURAS_EN_PARALELO or (os.cpu_count() or 1) == 1:
+        return _renderizar_en_proceso(especificaciones)
+    try:
+        imagenes_y_tiempos = list(_obtener_pool().map(_renderizar_con_tiempo, especificaciones))
+    except BrokenProcessPool:
+        # Si un trabajador muere, se descarta el pool y se dibuja en este proceso
+        with _bloqueo_pool:
+            _pool = None
+        return _renderizar_en_proceso(especificaciones)
+    for espec, (_, segundos) in zip(especificaciones, imagenes_y_tiempos):
+        instrumentacion.registrar("renderizado_figura", segundos, tipo=espec["tipo"], figura=espec["titulo"])
+    return [imagen for imagen, _ in imagenes_y_tiempos]
@@ -0,0 +1,296 @@
+# /modulos/indice_comentarios.py
+
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from modulos.almacen_datos import hash_almacenado, ruta_indice_comentarios
+from modulos.cache_resultados import huella_columna
+from modulos.esquema_datos import es_pregunta_de_comentario
+from modulos.procesamiento_texto import obtener_tokens_columna, tokenizar, _PATRON_PALABRA
+from modulos.instrumentacion import instrumentacion
+
+# Índice invertido de todas las columnas de comentarios de un dataset, para
+# buscar palabras y frases y verlas en su contexto (KWIC). Cada término
+# normalizado (minúsculas y sin tildes, como en la tokenización) tiene su
+# lista de apariciones ordenada; cada aparición es un entero de 64 bits con
+# (columna, fila, posición de la palabra en la respuesta). Una frase se
+# resuelve buscando, a partir del término menos frecuente, que los demás
+# aparezcan en las posiciones siguientes de la misma respuesta.
+#
+# El índice se construye a partir de los tokens ya calculados y se guarda en
+# disco junto a la copia columnar del dataset, así que solo se construye una
+# vez por dataset aunque lo abran varias sesiones o se reinicie la aplicación.
+#
+# Este módulo no importa streamlit.
+
+# Cambiar al modificar el formato del archivo o la forma de construirlo: los
+# índices antiguos se reconstruyen. La versión 2 descarta los índices
+# construidos con tokens desordenados por matriz_terminos (ya corregido).
+VERSION_INDICE = 2
+# Bits de cada parte de la clave de una aparición (columna | fila | posición)
+_BITS_POSICION = 20
+_BITS_FILA = 32
+_MASCARA_POSICION = (1 << _BITS_POSICION) - 1
+# Índices que se mantienen en memoria
+MAXIMO_INDICES_EN_CACHE = 4
+# Palabras de contexto a cada lado y apariciones que se devuelven por búsqueda
+PALABRAS_CONTEXTO = 8
+MAXIMO_RESULTADOS = 200
+
+_cache_indices = OrderedDict()
+_bloqueo_cache = threading.Lock()
+
+_PATRON_FRASE = re.compile(r'"([^"]*)"|(\S+)')
+
+def _claves(columna, fila, posicion):
+    return (
+        (columna.astype(np.int64) << (_BITS_FILA + _BITS_POSICION))
+        | (fila.astype(np.int64) << _BITS_POSICION)
+        | np.minimum(posicion, _MASCARA_POSICION).astype(np.int64)
+    )
+
+def _separar_claves(claves):
+    columna = claves >> (_BITS_FILA + _BITS_POSICION)
+    fila = (claves >> _BITS_POSICION) & ((1 << _BITS_FILA) - 1)
+    posicion = claves & _MASCARA_POSICION
+    return columna, fila, posicion
+
+def _contenidas(buscadas, ordenadas):
+    """
+    Máscara de los elementos de 'buscadas' que están en el array ordenado 'ordenadas'.
+    """
+    posiciones = np.searchsorted(ordenadas, buscadas)
+    encontradas = posiciones < len(ordenadas)
+    encontradas[encontradas] = ordenadas[posiciones[encontradas]] == buscadas[encontradas]
+    return encontradas
+
+def _respuestas(claves):
+    """
+    Respuestas distintas (columna y fila) de un array ordenado de claves.
+    """
+    respuestas = claves >> _BITS_POSICION
+    return respuestas[np.concatenate(([True], respuestas[1:] != respuestas[:-1]))]
+
+def interpretar_consulta(consulta):
+    """
+    Divide una consulta en segmentos: cada texto entre comillas es una frase
+    y cada palabra suelta es un término. Devuelve la lista de segmentos, cada
+    uno como lista de tokens normalizados.
+    """
+    segmentos = []
+    for frase, palabra in _PATRON_FRASE.findall(consulta):
+        tokens = tokenizar(frase or palabra)
+        if frase:
+            if tokens:
+                segmentos.append(tokens)
+        else:
+            segmentos.extend([token] for token in tokens)
+    return segmentos
+
+class IndiceComentarios:
+    """
+    Índice invertido de las columnas de comentarios. 'inicios' delimita en
+    'claves' las apariciones de cada término del 'vocabulario'.
+    """
+
+    def __init__(self, columnas, vocabulario, inicios, claves):
+        self.columnas = columnas
+        self.vocabulario = vocabulario
+        self.terminos = {termino: i for i, termino in enumerate(vocabulario)}
+        self.inicios = inicios
+        self.claves = claves
+
+    def __len__(self):
+        return len(self.claves)
+
+    def apariciones(self, termino):
+        """
+        Claves (ordenadas) de las apariciones de un término normalizado.
+        """
+        i = self.terminos.get(termino)
+        if i is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.claves[self.inicios[i]:self.inicios[i + 1]]
+
+    def buscar_frase(self, tokens):
+        """
+        Claves de las apariciones de la frase (la clave de su primera palabra).
+        """
+        listas = [self.apariciones(token) for token in tokens]
+        # Se parte de la palabra menos frecuente, desplazada a la posición de la primera
+        base = int(np.argmin([len(lista) for lista in listas]))
+        candidatas = listas[base][(listas[base] & _MASCARA_POSICION) >= base] - base
+        for desplazamiento, lista in enumerate(listas):
+            if desplazamiento == base or len(candidatas) == 0:
+                continue
+            candidatas = candidatas[_contenidas(candidatas + desplazamiento, lista)]
+        return candidatas
+
+    def buscar(self, consulta, columnas=None, mascara_filas=None):
+        """
+        Apariciones de una consulta: respuestas que contienen todos sus
+        segmentos (palabras o frases entre comillas), limitadas a 'columnas'
+        (nombres) y a las filas con True en 'mascara_filas'. Devuelve un
+        DataFrame con columna, fila, posición y longitud de cada aparición del
+        primer segmento, ordenado por columna y fila.
+        """
+        segmentos = interpretar_consulta(consulta)
+        vacio = pd.DataFrame({
+            "columna": np.zeros(0, dtype=np.int64), "fila": np.zeros(0, dtype=np.int64),
+            "posicion": np.zeros(0, dtype=np.int64), "longitud": np.zeros(0, dtype=np.int64)
+        })
+        if not segmentos:
+            return vacio
+
+        with instrumentacion.medir("busqueda_comentarios", consulta=consulta):
+            apariciones = [self.buscar_frase(tokens) for tokens in segmentos]
+            claves = apariciones[0]
+            # Solo las respuestas (columna y fila) que contienen también los demás segmentos
+            for otras in apariciones[1:]:
+                claves = claves[_contenidas(claves >> _BITS_POSICION, _respuestas(otras))]
+            columna, fila, posicion = _separar_claves(claves)
+            validas = np.ones(len(claves), dtype=bool)
+            if columnas is not None:
+                codigos = [i for i, nombre in enumerate(self.columnas) if nombre in set(columnas)]
+                validas &= np.isin(columna, codigos)
+            if mascara_filas is not None:
+                validas &= np.asarray(mascara_filas, dtype=bool)[fila]
+
+        if not validas.any():
+            return vacio
+        return pd.DataFrame({
+            "columna": columna[validas], "fila": fila[validas],
+            "posicion": posicion[validas], "longitud": len(segmentos[0])
+        })
+
+    def contexto(self, df, apariciones, maximo=MAXIMO_RESULTADOS, palabras=PALABRAS_CONTEXTO):
+        """
+        Tabla KWIC de las primeras 'maximo' apariciones: pregunta, fila,
+        contexto a la izquierda, texto encontrado y contexto a la derecha,
+        tomados del texto original de cada respuesta.
+        """
+        filas_tabla = []
+        for columna, fila, posicion, longitud in apariciones.head(maximo).itertuples(index=False):
+            pregunta = self.columnas[columna]
+            texto = str(df[pregunta].iat[fila])
+            palabras_texto = list(_PATRON_PALABRA.finditer(texto.lower()))
+            if posicion + longitud > len(palabras_texto):
+                continue
+            inicio = palabras_texto[posicion].start()
+            fin = palabras_texto[posicion + longitud - 1].end()
+            inicio_contexto = palabras_texto[max(posicion - palabras, 0)].start()
+            fin_contexto = palabras_texto[min(posicion + longitud - 1 + palabras, len(palabras_texto) - 1)].end()
+            filas_tabla.append({
+                "Pregunta": pregunta,
+                "Fila": int(fila),
+                "Contexto anterior": ("…" if inicio_contexto > 0 else "") + texto[inicio_contexto:inicio].lstrip(),
+                "Texto": texto[inicio:fin],
+                "Contexto posterior": texto[fin:fin_contexto].rstrip() + ("…" if fin_contexto < len(texto) else "")
+            })
+        return pd.DataFrame(filas_tabla, columns=["Pregunta", "Fila", "Contexto anterior", "Texto", "Contexto posterior"])
+
+    def guardar(self, ruta):
+        """
+        Guarda el índice (escritura atómica, sin compresión para cargarlo rápido).
+        """
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        ruta_temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            ruta_temporal,
+            version=np.array(VERSION_INDICE),
+            columnas=np.array(self.columnas, dtype=str),
+            vocabulario=np.array(self.vocabulario, dtype=str),
+            inicios=self.inicios,
+            claves=self.claves
+        )
+        os.replace(ruta_temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta, columnas):
+        """
+        Carga un índice guardado, o devuelve None si no existe, es de otra
+        versión o no corresponde a las mismas columnas de comentarios.
+        """
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with np.load(ruta) as datos:
+                if int(datos["version"]) != VERSION_INDICE or datos["columnas"].tolist() != list(columnas):
+                    return None
+                return cls(
+                    columnas=datos["columnas"].tolist(),
+                    vocabulario=datos["vocabulario"].tolist(),
+                    inicios=datos["inicios"],
+                    claves=datos["claves"]
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+def construir_indice(df, columnas):
+    """
+    Construye el índice de las columnas de comentarios de 'df' a partir de
+    sus tokens (ya calculados si la columna se analizó antes).
+    """
+    terminos = {}
+    listas_terminos, listas_claves = [], []
+    with instrumentacion.medir("indice_comentarios", filas=len(df), columnas=len(columnas)):
+        for codigo, pregunta in enumerate(columnas):
+            tokens = obtener_tokens_columna(df[pregunta])
+            # Vocabulario de la columna -> vocabulario común del índice
+            mapa = np.fromiter(
+                (terminos.setdefault(termino, len(terminos)) for termino in tokens.vocabulario),
+                dtype=np.int64, count=len(tokens.vocabulario)
+            )
+            longitudes = np.diff(tokens.desplazamientos)
+            fila = np.repeat(tokens.filas, longitudes)
+            posicion = np.arange(len(tokens.ids)) - np.repeat(tokens.desplazamientos[:-1], longitudes)
+            listas_terminos.append(mapa[tokens.ids])
+            listas_claves.append(_claves(np.full(len(fila), codigo), fila, posicion))
+
+        termino = np.concatenate(listas_terminos) if listas_terminos else np.zeros(0, dtype=np.int64)
+        claves = np.concatenate(listas_claves) if listas_claves else np.zeros(0, dtype=np.int64)
+        # Las claves ya están ordenadas dentro de cada término (columna, fila y posición crecientes)
+        orden = np.argsort(termino, kind="stable")
+        inicios = np.concatenate(([0], np.cumsum(np.bincount(termino, minlength=len(terminos))))).astype(np.int64)
+
+    return IndiceComentarios(
+        columnas=list(columnas),
+        vocabulario=list(terminos),
+        inicios=inicios,
+        claves=claves[orden]
+    )
+
+def obtener_indice(df):
+    """
+    Devuelve el índice de comentarios del dataset: de memoria, del archivo
+    guardado junto al dataset o construyéndolo (y guardándolo) si no existe.
+    Un DataFrame que no es un dataset guardado se indexa solo en memoria.
+    """
+    columnas = [str(col) for col in df.columns if es_pregunta_de_comentario(str(col))]
+    hash_dataset = hash_almacenado(df)
+    clave = hash_dataset or tuple(huella_columna(df[col]) for col in columnas)
+    with _bloqueo_cache:
+        if clave in _cache_indices:
+            _cache_indices.move_to_end(clave)
+            return _cache_indices[clave]
+
+    indice = None
+    if hash_dataset is not None:
+        indice = IndiceComentarios.cargar(ruta_indice_comentarios(hash_dataset), columnas)
+    if indice is None:
+        indice = construir_indice(df, columnas)
+        if hash_dataset is not None:
+            try:
+                indice.guardar(ruta_indice_comentarios(hash_dataset))
+            except OSError:
+                # Sin disco se sigue trabajando con el índice en memoria
+                pass
+
+    with _bloqueo_cache:
+        _cache_indices[clave] = indice
+        while len(_cache_indices) > MAXIMO_INDICES_EN_CACHE:
+            _cache_indices.popitem(last=False)
+    return indice
@@ -0,0 +1,235 @@
+# /modulos/informes_lote.py
+#
+# Generación de informes por lotes, sin la interfaz de Streamlit: divide un
+# dataset por una columna de referencia (por ejemplo, hospital o unidad
+# docente) y genera para cada unidad un .docx con el análisis cuantitativo y
+# el cualitativo. Las unidades se procesan en paralelo en un pool de procesos.
+#
+# Uso, desde la raíz del repositorio:
+#     python -m modulos.informes_lote --fusion fusionado_010125_1 --columna Hospital
+#     python -m modulos.informes_lote archivo1.xlsx archivo2.xlsx --columna Hospital --salida informes
+
+import os
+import re
+import sys
+import time
+import zipfile
+import argparse
+import tempfile
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DIRECTORIO_SALIDA = "informes"
+
+def _inicializar_trabajador():
+    import matplotlib
+    matplotlib.use("Agg")
+
+def nombre_archivo_unidad(unidad):
+    """
+    Convierte el nombre de una unidad en un nombre de archivo seguro.
+    """
+    nombre = re.sub(r"[^\w\-]+", "_", str(unidad)).strip("_")
+    return nombre or "sin_nombre"
+
+def _preguntas_con_respuestas(df, preguntas):
+    return [pregunta for pregunta in preguntas if df[pregunta].notna().any()]
+
+def generar_informe_unidad(unidad, df_unidad, columna, ruta):
+    """
+    Calcula los análisis cuantitativo y cualitativo de una unidad y los
+    escribe en un único documento de Word. Se ejecuta en un proceso
+    trabajador, por eso los gráficos se dibujan en el mismo proceso.
+    Devuelve la unidad, la ruta del documento, sus filas y los segundos empleados.
+    """
+    from docx import Document
+    from modulos.preguntas import obtener_preguntas_cuantitativas, obtener_preguntas_cualitativas
+    from modulos.analisis_cuantitativo import calcular_analisis_cuantitativo, escribir_analisis_cuantitativo
+    from modulos.analisis_cualitativo import calcular_analisis_cualitativo, escribir_analisis_cualitativo
+
+    inicio = time.perf_counter()
+    # Las preguntas sin ninguna respuesta en la unidad no aparecen en su informe
+    preguntas_cuantitativas = _preguntas_con_respuestas(df_unidad, obtener_preguntas_cuantitativas(df_unidad))
+    preguntas_cualitativas = _preguntas_con_respuestas(df_unidad, obtener_preguntas_cualitativas(df_unidad))
+
+    document = Document()
+    document.add_heading(f"Informe de la Encuesta de Residentes: {unidad}", 0)
+    document.add_paragraph(f"{columna}: {unidad}. Respuestas analizadas: {len(df_unidad)}.")
+
+    if preguntas_cuantitativas:
+        document.add_heading('Resultados del Análisis Cuantitativo', 1)
+        escribir_analisis_cuantitativo(
+            document, calcular_analisis_cuantitativo(df_unidad, preguntas_cuantitativas, paralelo=False)
+        )
+        document.add_page_break()
+
+    if preguntas_cualitativas:
+        document.add_heading('Resultados del Análisis Cualitativo', 1)
+        escribir_analisis_cualitativo(
+            document, calcular_analisis_cualitativo(df_unidad, preguntas_cualitativas, paralelo=False)
+        )
+
+    document.save(ruta)
+    return unidad, ruta, len(df_unidad), time.perf_counter() - inicio
+
+def dividir_por_unidad(df, columna, unidades=None):
+    """
+    Divide el DataFrame por los valores de 'columna' (las filas sin valor se
+    descartan). Con 'unidades' solo se devuelven esas unidades.
+    """
+    if unidades is not None:
+        unidades = {str(unidad) for unidad in unidades}
+    for unidad, df_unidad in df.groupby(columna, observed=True, sort=True):
+        if unidades is None or str(unidad) in unidades:
+            yield unidad, df_unidad
+
+def generar_informes_por_unidad(df, columna, directorio_salida=DIRECTORIO_SALIDA, unidades=None,
+                                max_workers=None, al_terminar=None):
+    """
+    Genera un informe de Word por cada unidad de 'columna' en 'directorio_salida'.
+    Con más de un proceso las unidades se reparten en un pool; 'al_terminar'
+    se llama con (unidad, ruta, filas, segundos) o (unidad, None, filas, error)
+    a medida que termina cada una. Devuelve la lista de esos resultados.
+    """
+    os.makedirs(directorio_salida, exist_ok=True)
+    trabajos = []
+    rutas_usadas = set()
+    for unidad, df_unidad in dividir_por_unidad(df, columna, unidades):
+        nombre = nombre_archivo_unidad(unidad)
+        # Dos unidades distintas pueden dar el mismo nombre de archivo
+        sufijo = 1
+        while nombre in rutas_usadas:
+            sufijo += 1
+            nombre = f"{nombre_archivo_unidad(unidad)}_{sufijo}"
+        rutas_usadas.add(nombre)
+        ruta = os.path.join(directorio_salida, f"informe_{nombre}.docx")
+        trabajos.append((unidad, df_unidad, columna, ruta))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    resultados = []
+
+    def registrar(resultado):
+        resultados.append(resultado)
+        if al_terminar is not None:
+            al_terminar(*resultado)
+
+    if max_workers == 1 or len(trabajos) <= 1:
+        _inicializar_trabajador()
+        for unidad, df_unidad, columna_unidad, ruta in trabajos:
+            try:
+                registrar(generar_informe_unidad(unidad, df_unidad, columna_unidad, ruta))
+            except Exception as e:
+                registrar((unidad, None, len(df_unidad), e))
+        return resultados
+
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(trabajos)), mp_context=contexto,
+                             initializer=_inicializar_trabajador) as pool:
+        futuros = {pool.submit(generar_informe_unidad, *trabajo): trabajo for trabajo in trabajos}
+        for futuro in as_completed(futuros):
+            unidad, df_unidad, _, _ = futuros[futuro]
+            try:
+                registrar(futuro.result())
+            except Exception as e:
+                registrar((unidad, None, len(df_unidad), e))
+    return resultados
+
+def informes_por_unidad_zip(df, columna, unidades=None, progreso=None):
+    """
+    Genera los informes por unidad en una carpeta temporal y los devuelve en
+    un archivo ZIP (BytesIO), con un errores.txt si alguna unidad falla.
+    'progreso' se llama con (unidades terminadas, total, unidad) a medida
+    que termina cada una. Es la función de la exportación en segundo plano.
+    """
+    total = sum(1 for _ in dividir_por_unidad(df[[columna]], columna, unidades))
+    terminadas = []
+
+    def al_terminar(unidad, ruta, filas, detalle):
+        terminadas.append(unidad)
+        if progreso is not None:
+            progreso(len(terminadas), total, str(unidad))
+
+    if progreso is not None:
+        progreso(0, total, "Preparando las unidades")
+    with tempfile.TemporaryDirectory(prefix="informes_") as directorio:
+        resultados = generar_informes_por_unidad(df, columna, directorio, unidades=unidades, al_terminar=al_terminar)
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+            errores = []
+            for unidad, ruta, filas, detalle in resultados:
+                if ruta is None:
+                    errores.append(f"{unidad} ({filas} filas): {detalle}")
+                else:
+                    archivo_zip.write(ruta, os.path.basename(ruta))
+            if errores:
+                archivo_zip.writestr("errores.txt", "\n".join(errores))
+    buffer.seek(0)
+    return buffer
+
+def cargar_dataset_lote(archivos=None, fusion=None):
+    """
+    Carga el dataset de entrada: una fusión guardada, un único Excel o la
+    fusión de varios. Devuelve el DataFrame ya tipado según el esquema; si
+    no se puede cargar lanza ValueError, ErrorLecturaExcel o LimiteMemoriaExcedido.
+    """
+    from modulos.esquema_datos import aplicar_esquema
+    if fusion is not None:
+        from modulos.almacen_datos import cargar_fusion
+        df, _ = cargar_fusion(fusion)
+        if df is None:
+            raise ValueError(f"No existe la fusión '{fusion}'.")
+    elif len(archivos) == 1:
+        # Carga y fusión sin streamlit: lanzan una excepción si fallan y no registran la fusión
+        from modulos.fusion_datos import cargar_archivo
+        df = cargar_archivo(archivos[0])
+    else:
+        from modulos.fusion_datos import fusionar_archivos
+        df, _ = fusionar_archivos(archivos)
+    if df is None:
+        raise ValueError("No se pudo guardar la copia columnar del dataset.")
+    df_tipado, _ = aplicar_esquema(df)
+    return df_tipado
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description="Genera un informe de Word por unidad (hospital, especialidad...) sin abrir la aplicación."
+    )
+    parser.add_argument("archivos", nargs="*", help="Archivos Excel de entrada; si son varios se fusionan.")
+    parser.add_argument("--fusion", help="Nombre de una fusión guardada (por ejemplo fusionado_010125_1).")
+    parser.add_argument("--columna", help="Columna por la que dividir el dataset (por defecto, la primera).")
+    parser.add_argument("--unidades", nargs="+", help="Generar solo los informes de estas unidades.")
+    parser.add_argument("--salida", default=DIRECTORIO_SALIDA, help="Carpeta donde se escriben los informes.")
+    parser.add_argument("--procesos", type=int, default=None, help="Número de procesos (por defecto, uno por núcleo).")
+    args = parser.parse_args(argumentos)
+
+    if bool(args.archivos) == bool(args.fusion):
+        parser.error("Indica archivos Excel o --fusion, pero no ambos.")
+
+    from modulos.lectura_excel import ErrorLecturaExcel, LimiteMemoriaExcedido
+    inicio = time.perf_counter()
+    try:
+        df = cargar_dataset_lote(args.archivos, args.fusion)
+    except (ValueError, ErrorLecturaExcel, LimiteMemoriaExcedido) as e:
+        print(f"No se pudo cargar el dataset: {e}", file=sys.stderr)
+        return 1
+    columna = args.columna or df.columns[0]
+    if columna not in df.columns:
+        parser.error(f"La columna '{columna}' no existe. Columnas de referencia: {list(df.columns[:5])}")
+    print(f"Dataset cargado: {len(df)} filas. Dividiendo por '{columna}'...")
+
+    def informar(unidad, ruta, filas, detalle):
+        if ruta is None:
+            print(f"  ERROR  {unidad} ({filas} filas): {detalle}", file=sys.stderr)
+        else:
+            print(f"  {unidad} ({filas} filas): {ruta} [{detalle:.1f} s]")
+
+    resultados = generar_informes_por_unidad(
+        df, columna, args.salida, unidades=args.unidades, max_workers=args.procesos, al_terminar=informar
+    )
+    errores = sum(1 for _, ruta, _, _ in resultados if ruta is None)
+    print(f"Informes generados: {len(resultados) - errores} de {len(resultados)} en {time.perf_counter() - inicio:.1f} s")
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
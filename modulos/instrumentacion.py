@@ -0,0 +1,168 @@
+# /modulos/instrumentacion.py
+
+import os
+import json
+import time
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Instrumentación de las etapas costosas de la aplicación (lectura de Excel,
+# concatenación, conversión numérica, tokenización, dibujo de gráficos y
+# montaje de los .docx). Cada medición guarda el tiempo real de la etapa, el
+# pico de memoria reservada durante ella (si la medición de memoria está
+# activa) y el detalle que la identifica: pregunta, archivo, filas...
+#
+# Las mediciones se guardan en memoria para el panel de rendimiento y se
+# escriben como líneas JSON en un archivo de registro, para localizar en
+# producción qué preguntas o archivos son lentos.
+#
+# La medición de memoria usa tracemalloc, que ralentiza las reservas de
+# memoria, por eso está desactivada por defecto. tracemalloc es global al
+# proceso: con varias sesiones trabajando a la vez los picos son aproximados,
+# y no incluye lo que se hace en procesos trabajadores (de esas etapas solo
+# se registra el tiempo).
+#
+# Este módulo no importa streamlit.
+
+# Archivo de registro (vacío para no escribirlo) y tamaño a partir del cual se rota
+RUTA_REGISTRO_RENDIMIENTO = os.environ.get("RUTA_REGISTRO_RENDIMIENTO", os.path.join("data", "rendimiento.jsonl"))
+TAMANO_MAXIMO_REGISTRO_MB = float(os.environ.get("TAMANO_MAXIMO_REGISTRO_MB", "50"))
+MEDIR_MEMORIA_RENDIMIENTO = os.environ.get("MEDIR_MEMORIA_RENDIMIENTO", "0") == "1"
+
+# Mediciones que se conservan en memoria para el panel
+MAXIMO_MEDICIONES_EN_MEMORIA = 5000
+
+class Instrumentacion:
+    """
+    Registro de mediciones por etapa, seguro entre hilos (cada sesión de
+    Streamlit se ejecuta en su propio hilo).
+    """
+
+    def __init__(self, ruta_registro, tamano_maximo_bytes, medir_memoria=False):
+        self.ruta_registro = ruta_registro
+        self.tamano_maximo_bytes = tamano_maximo_bytes
+        self._mediciones = deque(maxlen=MAXIMO_MEDICIONES_EN_MEMORIA)
+        self._bloqueo = threading.Lock()
+        self._local = threading.local()
+        if medir_memoria:
+            self.activar_memoria(True)
+
+    def _estado_hilo(self):
+        if not hasattr(self._local, "pila"):
+            self._local.pila = []
+            self._local.contexto = {}
+        return self._local
+
+    def fijar_contexto(self, **contexto):
+        """
+        Datos que se añaden a todas las mediciones del hilo actual (por
+        ejemplo, la sesión de Streamlit que se está ejecutando).
+        """
+        self._estado_hilo().contexto = contexto
+
+    @property
+    def midiendo_memoria(self):
+        return tracemalloc.is_tracing()
+
+    def activar_memoria(self, activar):
+        """
+        Activa o desactiva la medición de memoria con tracemalloc.
+        """
+        if activar and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not activar and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def medir(self, etapa, **detalle):
+        """
+        Mide el bloque como una etapa: tiempo real y, si se mide la memoria,
+        pico de memoria reservada por encima de la que había al empezar.
+        Las etapas pueden anidarse: el pico de una etapa incluye el de las
+        etapas que contiene.
+        """
+        estado = self._estado_hilo()
+        memoria = tracemalloc.is_tracing()
+        marco = {"memoria_inicial": 0, "pico": 0}
+        if memoria:
+            actual, pico = tracemalloc.get_traced_memory()
+            # reset_peak borra el pico de la etapa que contiene a esta: se guarda antes
+            if estado.pila:
+                estado.pila[-1]["pico"] = max(estado.pila[-1]["pico"], pico)
+            tracemalloc.reset_peak()
+            marco = {"memoria_inicial": actual, "pico": actual}
+        estado.pila.append(marco)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            estado.pila.pop()
+            pico_bytes = None
+            if memoria and tracemalloc.is_tracing():
+                pico = max(marco["pico"], tracemalloc.get_traced_memory()[1])
+                pico_bytes = max(pico - marco["memoria_inicial"], 0)
+                if estado.pila:
+                    estado.pila[-1]["pico"] = max(estado.pila[-1]["pico"], pico)
+            self.registrar(etapa, segundos, pico_bytes, **detalle)
+
+    def registrar(self, etapa, segundos, pico_bytes=None, **detalle):
+        """
+        Registra una medición hecha fuera de medir(), por ejemplo el tiempo
+        que devuelve un proceso trabajador.
+        """
+        medicion = {
+            "instante": datetime.now().isoformat(timespec="milliseconds"),
+            "etapa": etapa,
+            "segundos": round(segundos, 6),
+            "pico_mb": None if pico_bytes is None else round(pico_bytes / 1024**2, 3),
+            "pid": os.getpid(),
+            **self._estado_hilo().contexto,
+            **detalle
+        }
+        with self._bloqueo:
+            self._mediciones.append(medicion)
+            self._escribir(medicion)
+        return medicion
+
+    def _escribir(self, medicion):
+        if not self.ruta_registro:
+            return
+        try:
+            directorio = os.path.dirname(self.ruta_registro)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            # Al superar el tamaño máximo se conserva una sola copia anterior
+            if os.path.exists(self.ruta_registro) and os.path.getsize(self.ruta_registro) > self.tamano_maximo_bytes:
+                os.replace(self.ruta_registro, f"{self.ruta_registro}.1")
+            with open(self.ruta_registro, "a", encoding="utf-8") as f:
+                f.write(json.dumps(medicion, ensure_ascii=False, default=str) + "\n")
+        except OSError:
+            # Un fallo del registro no debe interrumpir el análisis
+            pass
+
+    def mediciones(self, **filtro):
+        """
+        Mediciones en memoria, de la más antigua a la más reciente, que
+        coinciden con todos los campos de 'filtro' (por ejemplo, sesion=...).
+        """
+        with self._bloqueo:
+            mediciones = list(self._mediciones)
+        return [
+            medicion for medicion in mediciones
+            if all(medicion.get(campo) == valor for campo, valor in filtro.items())
+        ]
+
+    def vaciar(self):
+        with self._bloqueo:
+            self._mediciones.clear()
+
+# Instrumentación única del proceso, compartida por todas las sesiones
+instrumentacion = Instrumentacion(
+    ruta_registro=RUTA_REGISTRO_RENDIMIENTO,
+    tamano_maximo_bytes=TAMANO_MAXIMO_REGISTRO_MB * 1024**2,
+    medir_memoria=MEDIR_MEMORIA_RENDIMIENTO
+)
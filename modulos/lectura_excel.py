@@ -0,0 +1,280 @@
+# /modulos/lectura_excel.py
+
+import os
+import sys
+import time
+import warnings
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from openpyxl import load_workbook
+
+# Este módulo no importa streamlit: sus funciones se ejecutan en procesos
+# trabajadores y conviene que arranquen rápido.
+
+# Lectura por bloques: filas por bloque y techo de memoria en MB (0 = sin límite).
+# El techo puede fijarse en el despliegue con la variable de entorno LIMITE_MEMORIA_MB.
+# Se compara con una estimación del pico de la lectura y la fusión: los bytes de
+# los libros que se tienen en memoria, la tabla de textos compartidos de openpyxl
+# y el doble de los datos leídos (la concatenación final tiene a la vez los bloques
+# y el resultado). No cubre lo que se hace después (tipado, copia en disco).
+TAMANO_BLOQUE = 5000
+LIMITE_MEMORIA_MB = float(os.environ.get("LIMITE_MEMORIA_MB", "0"))
+
+class ErrorLecturaExcel(Exception):
+    """
+    Error al leer un archivo concreto durante una lectura en lote.
+    """
+    def __init__(self, nombre, error):
+        super().__init__(f"{nombre}: {error}")
+        self.nombre = nombre
+        self.error = error
+
+class LimiteMemoriaExcedido(MemoryError):
+    """
+    La lectura por bloques ha superado el techo de memoria configurado.
+    """
+
+def obtener_contenido_archivo(archivo):
+    """
+    Devuelve el nombre y el contenido en bytes de un archivo cargado
+    (objeto de Streamlit, objeto tipo fichero o ruta en disco).
+    """
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, "rb") as f:
+            return os.path.basename(archivo), f.read()
+    if hasattr(archivo, "getvalue"):
+        return archivo.name, archivo.getvalue()
+    archivo.seek(0)
+    return archivo.name, archivo.read()
+
+def _nombres_columnas(cabecera):
+    """
+    Construye los nombres de columna igual que pd.read_excel: celdas vacías
+    como 'Unnamed: i' y nombres repetidos con sufijos '.1', '.2', ...
+    """
+    nombres = []
+    vistos = {}
+    for i, valor in enumerate(cabecera):
+        nombre = f"Unnamed: {i}" if valor is None else str(valor)
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre_unico = f"{nombre}.{vistos[nombre]}"
+            while nombre_unico in vistos:
+                vistos[nombre] += 1
+                nombre_unico = f"{nombre}.{vistos[nombre]}"
+            vistos[nombre_unico] = 0
+            nombre = nombre_unico
+        else:
+            vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
+
+def _memoria_textos_compartidos(libro):
+    """
+    Bytes aproximados de la tabla de textos compartidos que openpyxl carga
+    completa al abrir el libro (los textos y su índice), incluso en modo de
+    solo lectura.
+    """
+    textos = getattr(libro, "shared_strings", None) or []
+    return sum(sys.getsizeof(texto) for texto in textos) + 2 * sys.getsizeof(list(textos))
+
+def iterar_bloques_excel(origen, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recorre la primera hoja de un libro con openpyxl en modo de solo lectura
+    y devuelve DataFrames de como mucho 'tamano_bloque' filas, sin cargar el
+    libro completo en memoria. Las filas totalmente vacías se descartan al vuelo.
+    Cada bloque lleva en attrs['filas_leidas'] las filas leídas antes de
+    descartar y en attrs['memoria_lector'] la memoria estimada del lector.
+    """
+    libro = load_workbook(origen, read_only=True, data_only=True)
+    try:
+        memoria_lector = _memoria_textos_compartidos(libro)
+        hoja = libro.worksheets[0]
+        hoja.reset_dimensions()
+        filas = hoja.iter_rows(values_only=True)
+        cabecera = next(filas, None)
+        if cabecera is None:
+            return
+        # Las celdas vacías al final de la cabecera no son columnas
+        cabecera = list(cabecera)
+        while cabecera and cabecera[-1] is None:
+            cabecera.pop()
+        columnas = _nombres_columnas(cabecera)
+        ancho = len(columnas)
+
+        bloque = []
+        filas_leidas = 0
+        for fila in filas:
+            filas_leidas += 1
+            fila = fila[:ancho]
+            if all(valor is None for valor in fila):
+                continue
+            if len(fila) < ancho:
+                fila = fila + (None,) * (ancho - len(fila))
+            bloque.append(fila)
+            if len(bloque) >= tamano_bloque:
+                df_bloque = pd.DataFrame.from_records(bloque, columns=columnas)
+                df_bloque.attrs["filas_leidas"] = filas_leidas
+                df_bloque.attrs["memoria_lector"] = memoria_lector
+                yield df_bloque
+                bloque = []
+                filas_leidas = 0
+        if bloque or filas_leidas:
+            df_bloque = pd.DataFrame.from_records(bloque, columns=columnas)
+            df_bloque.attrs["filas_leidas"] = filas_leidas
+            df_bloque.attrs["memoria_lector"] = memoria_lector
+            yield df_bloque
+    finally:
+        libro.close()
+
+def leer_excel_streaming(origen, tamano_bloque=TAMANO_BLOQUE, limite_memoria_mb=None, memoria_fija=0):
+    """
+    Lee un libro de Excel por bloques con memoria acotada. Lanza
+    LimiteMemoriaExcedido en cuanto el pico estimado supera el techo, antes
+    de que el contenedor se quede sin memoria: 'memoria_fija' (bytes que ya
+    ocupa el llamador, como el contenido de los libros), el lector de
+    openpyxl y el doble de los bloques leídos, por la concatenación final.
+    Devuelve el DataFrame (sin filas vacías) y las filas leídas.
+    """
+    if limite_memoria_mb is None:
+        limite_memoria_mb = LIMITE_MEMORIA_MB
+    limite_bytes = limite_memoria_mb * 1024 * 1024 if limite_memoria_mb else None
+
+    bloques = []
+    memoria_usada = 0
+    filas_leidas = 0
+    for bloque in iterar_bloques_excel(origen, tamano_bloque):
+        filas_leidas += bloque.attrs.pop("filas_leidas")
+        memoria_lector = bloque.attrs.pop("memoria_lector")
+        bloque = bloque.infer_objects()
+        memoria_usada += int(bloque.memory_usage(deep=True).sum())
+        if limite_bytes is not None and memoria_fija + memoria_lector + 2 * memoria_usada > limite_bytes:
+            raise LimiteMemoriaExcedido(
+                f"La lectura necesitaría más de {limite_memoria_mb:g} MB "
+                f"tras {filas_leidas} filas."
+            )
+        bloques.append(bloque)
+
+    if not bloques:
+        return pd.DataFrame(), filas_leidas
+    with warnings.catch_warnings():
+        # Una columna vacía en un bloque y con datos en otro avisa del cambio
+        # futuro de tipos en concat; el infer_objects final fija el tipo correcto
+        warnings.simplefilter("ignore", FutureWarning)
+        df = pd.concat(bloques, ignore_index=True)
+    del bloques
+    # Los bloques pueden haber inferido tipos distintos para una misma columna
+    return df.infer_objects(), filas_leidas
+
+def leer_archivo_excel(nombre, contenido, streaming=False, limite_memoria_mb=None, memoria_fija=None):
+    """
+    Lee un libro de Excel desde sus bytes y elimina las filas vacías.
+    Devuelve el nombre, el DataFrame, las filas leídas y el tiempo de lectura.
+    En la lectura por bloques, 'memoria_fija' es la memoria que ya se ocupa
+    fuera de la lectura (por defecto, los bytes del propio libro).
+    """
+    inicio = time.perf_counter()
+    if streaming:
+        df, filas_leidas = leer_excel_streaming(
+            BytesIO(contenido), limite_memoria_mb=limite_memoria_mb,
+            memoria_fija=len(contenido) if memoria_fija is None else memoria_fija
+        )
+    else:
+        df = pd.read_excel(BytesIO(contenido), header=0)
+        filas_leidas = len(df)
+        df = df.dropna(how='all')
+    return nombre, df, filas_leidas, time.perf_counter() - inicio
+
+# Columnas renombradas que se detallan en el aviso de una alineación por posición
+MAXIMO_COLUMNAS_EN_AVISO = 5
+
+def alinear_columnas(df, columnas_base, avisos=None, nombre=None):
+    """
+    Alinea las columnas de un DataFrame con la cabecera del primer archivo.
+    Si tiene las mismas columnas en otro orden se reordenan por nombre. Si
+    los nombres difieren pero el número de columnas coincide se asignan por
+    posición (cabeceras con otra redacción) y se añade un aviso a la lista
+    'avisos'; si no, se alinean por nombre.
+    """
+    columnas = list(df.columns)
+    columnas_base = list(columnas_base)
+    if columnas == columnas_base:
+        return df
+    if len(columnas) == len(columnas_base):
+        if df.columns.is_unique and set(columnas) == set(columnas_base):
+            return df[columnas_base]
+        if avisos is not None:
+            renombradas = [(antigua, nueva) for antigua, nueva in zip(columnas, columnas_base) if antigua != nueva]
+            detalle = "; ".join(f"'{antigua}' -> '{nueva}'" for antigua, nueva in renombradas[:MAXIMO_COLUMNAS_EN_AVISO])
+            if len(renombradas) > MAXIMO_COLUMNAS_EN_AVISO:
+                detalle += f"; y {len(renombradas) - MAXIMO_COLUMNAS_EN_AVISO} más"
+            avisos.append(
+                f"{nombre or 'Archivo'}: {len(renombradas)} columnas con otro nombre que la cabecera "
+                f"base, asignadas por posición ({detalle})"
+            )
+        return df.set_axis(columnas_base, axis=1)
+    return df.reindex(columns=columnas_base)
+
+def leer_archivos_en_paralelo(contenidos, max_workers=None):
+    """
+    Lee una lista de (nombre, bytes) en un pool de procesos.
+    Los resultados se devuelven en el mismo orden que la entrada.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(contenidos)))
+
+    if max_workers == 1:
+        resultados = []
+        for nombre, contenido in contenidos:
+            try:
+                resultados.append(leer_archivo_excel(nombre, contenido))
+            except Exception as e:
+                raise ErrorLecturaExcel(nombre, e) from e
+        return resultados
+
+    # 'spawn' evita heredar los hilos del servidor de Streamlit en los procesos hijos
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto) as pool:
+        futuros = [(nombre, pool.submit(leer_archivo_excel, nombre, contenido)) for nombre, contenido in contenidos]
+        resultados = []
+        for nombre, futuro in futuros:
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                for _, pendiente in futuros:
+                    pendiente.cancel()
+                raise ErrorLecturaExcel(nombre, e) from e
+        return resultados
+
+def leer_archivos_por_bloques(contenidos, limite_memoria_mb=None):
+    """
+    Lee una lista de (nombre, bytes) de uno en uno y por bloques, con un
+    único techo de memoria para todos los archivos. La estimación incluye
+    los bytes de todos los libros (se tienen en memoria durante toda la
+    lectura) y el doble de lo ya leído, por la concatenación de la fusión.
+    """
+    if limite_memoria_mb is None:
+        limite_memoria_mb = LIMITE_MEMORIA_MB
+    resultados = []
+    memoria_contenidos = sum(len(contenido) for _, contenido in contenidos)
+    memoria_leida = 0
+    for nombre, contenido in contenidos:
+        memoria_fija = memoria_contenidos + 2 * memoria_leida
+        try:
+            resultado = leer_archivo_excel(
+                nombre, contenido, streaming=True, limite_memoria_mb=limite_memoria_mb, memoria_fija=memoria_fija
+            )
+        except LimiteMemoriaExcedido:
+            raise
+        except Exception as e:
+            raise ErrorLecturaExcel(nombre, e) from e
+        resultados.append(resultado)
+        memoria_leida += int(resultado[1].memory_usage(deep=True).sum())
+        if limite_memoria_mb and memoria_contenidos + 2 * memoria_leida > limite_memoria_mb * 1024 * 1024:
+            raise LimiteMemoriaExcedido(
+                f"La fusión de los archivos leídos necesitaría más de {limite_memoria_mb:g} MB (último: {nombre})."
+            )
+    return resultados
@@ -4,6 +4,98 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from modulos.tablas_cruzadas import obtener_cubo
+from modulos.preguntas import obtener_preguntas_cuantitativas, obtener_preguntas_cualitativas
+from modulos.esquema_datos import es_pregunta_de_comentario, es_pregunta_de_seleccion_multiple
+from modulos.graficos import especificacion, renderizar_figura
+from modulos.significacion import (
+    calcular_matriz_significacion,
+    matriz_para_mapa_calor,
+    PRUEBA_KRUSKAL_WALLIS,
+    PRUEBA_ANOVA,
+    ALFA_POR_DEFECTO
+)
+
+# Longitud máxima de las etiquetas de preguntas en el mapa de calor
+LONGITUD_ETIQUETA_MAPA = 70
+
+def _recortar_etiqueta(texto, longitud=LONGITUD_ETIQUETA_MAPA):
+    texto = str(texto)
+    return texto if len(texto) <= longitud else texto[:longitud - 1] + "…"
+
+def mostrar_matriz_significacion(df, columnas_referencia):
+    """
+    Contrasta de una vez todas las combinaciones de columnas de referencia y
+    preguntas, y muestra las diferencias ordenadas y un mapa de calor.
+    """
+    st.subheader("Matriz de Significación")
+    st.write(
+        "Compara todas las preguntas con las columnas de referencia: chi-cuadrado y V de Cramér "
+        "para las preguntas categóricas (las de selección múltiple, opción a opción), "
+        "y Kruskal-Wallis o ANOVA para las numéricas. "
+        "Los p-valores se corrigen por comparaciones múltiples (Benjamini-Hochberg)."
+    )
+
+    referencias = st.multiselect(
+        "Columnas de referencia a contrastar:",
+        options=columnas_referencia,
+        default=columnas_referencia,
+        key="referencias_significacion"
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        prueba_numerica = st.radio(
+            "Prueba para las preguntas numéricas:",
+            (PRUEBA_KRUSKAL_WALLIS, PRUEBA_ANOVA),
+            key="prueba_numerica_significacion"
+        )
+    with col2:
+        alfa = st.number_input(
+            "Nivel de significación (tras la corrección):",
+            min_value=0.001, max_value=0.2, value=ALFA_POR_DEFECTO, step=0.01, format="%.3f",
+            key="alfa_significacion"
+        )
+
+    if st.button("Calcular Matriz de Significación"):
+        if not referencias:
+            st.warning("Debes seleccionar al menos una columna de referencia.")
+            return
+
+        preguntas_numericas = obtener_preguntas_cuantitativas(df)
+        preguntas_categoricas = [
+            pregunta for pregunta in obtener_preguntas_cualitativas(df)
+            if not es_pregunta_de_comentario(pregunta)
+        ]
+        if not preguntas_numericas and not preguntas_categoricas:
+            st.warning("El archivo no contiene preguntas reconocidas para contrastar.")
+            return
+
+        try:
+            with st.spinner("Calculando contrastes..."):
+                resultado = calcular_matriz_significacion(
+                    df, referencias, preguntas_categoricas, preguntas_numericas, prueba_numerica
+                )
+                efecto, significativo = matriz_para_mapa_calor(resultado, alfa)
+                imagen = renderizar_figura(especificacion(
+                    "mapa_calor",
+                    "Tamaño del efecto por pregunta y referencia (* significativo)",
+                    {
+                        "valores": efecto.to_numpy(),
+                        "marcas": significativo.to_numpy(),
+                        "filas": [_recortar_etiqueta(p) for p in efecto.index],
+                        "columnas": list(efecto.columns),
+                        "etiqueta_valores": "Tamaño del efecto"
+                    },
+                    tamano=(10, max(4, 0.22 * len(efecto) + 2))
+                ))
+        except Exception as e:
+            st.error(f"Error al calcular la matriz de significación: {e}")
+            return
+
+        n_significativas = int((resultado["p ajustado (BH)"] < alfa).sum())
+        st.write(f"Combinaciones con diferencias significativas: {n_significativas} de {len(resultado)}")
+        st.dataframe(resultado)
+        st.image(imagen)
 
 def mostrar_modulo_comparador(df):
     """
@@ -48,6 +140,9 @@ def mostrar_modulo_comparador(df):
             return
 
         st.subheader("Resultados de la Comparación")
+
+        # Las tablas se calculan una vez por dataset y par de columnas
+        cubo = obtener_cubo(df)
         
         for pregunta in preguntas_seleccionadas:
             st.markdown(f"### Comparación para la pregunta: {pregunta}")
@@ -56,9 +151,11 @@ def mostrar_modulo_comparador(df):
                 st.markdown(f"**Comparado por:** {ref_col}")
                 
                 try:
-                    # Agrupar por la columna de referencia y contar valores
-                    df_comparacion = df.groupby([ref_col, pregunta]).size().unstack(fill_value=0)
+                    # Tabla de frecuencias referencia x respuesta (solo combinaciones presentes)
+                    df_comparacion = cubo.tabla(ref_col, pregunta)
                     st.dataframe(df_comparacion)
+                    if es_pregunta_de_seleccion_multiple(pregunta):
+                        st.caption("Pregunta de selección múltiple: cada respuesta cuenta en todas las opciones que incluye.")
                     
                     # Generar un gráfico de barras
                     fig, ax = plt.subplots(figsize=(12, 6))
@@ -73,4 +170,7 @@ def mostrar_modulo_comparador(df):
                 except Exception as e:
                     st.error(f"Error al generar la comparación para {ref_col} y {pregunta}: {e}")
             
-            st.markdown("---")
\ No newline at end of file
+            st.markdown("---")
+
+    st.markdown("---")
+    mostrar_matriz_significacion(df, columnas_referencia)
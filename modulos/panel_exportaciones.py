@@ -0,0 +1,82 @@
+# /modulos/panel_exportaciones.py
+
+import streamlit as st
+from modulos.trabajos_exportacion import cola_exportaciones, ESTADO_TERMINADO, ESTADO_ERROR
+from modulos.esquema_datos import NUMERO_COLUMNAS_REFERENCIA
+from modulos.filtros import describir_filtro
+
+MIME_WORD = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+MIME_ZIP = "application/zip"
+# Cada cuántos segundos se refresca la lista mientras hay trabajos activos
+INTERVALO_REFRESCO_S = 2
+
+def descripcion_exportacion(titulo, filtro=()):
+    """
+    Descripción de una exportación, con el filtro global con el que se pidió.
+    """
+    return f"{titulo} ({describir_filtro(filtro)})" if filtro else titulo
+
+def encolar_exportacion(sesion, descripcion, nombre_archivo, funcion, *args, **kwargs):
+    """
+    Añade una exportación a la cola y lo indica con un aviso; el documento
+    aparece en la sección "Exportaciones" de la barra lateral.
+    """
+    cola_exportaciones.encolar(sesion, descripcion, nombre_archivo, funcion, *args, **kwargs)
+    st.toast(f"{descripcion}: en preparación. Descárgalo desde «Exportaciones» en la barra lateral.")
+
+def _mostrar_trabajo(trabajo):
+    st.caption(f"**{trabajo.descripcion}**")
+    if trabajo.estado == ESTADO_TERMINADO:
+        mime = MIME_ZIP if trabajo.nombre_archivo.endswith(".zip") else MIME_WORD
+        st.download_button(
+            "Descargar", data=trabajo.datos, file_name=trabajo.nombre_archivo, mime=mime,
+            key=f"descarga_exportacion_{trabajo.identificador}"
+        )
+    elif trabajo.estado == ESTADO_ERROR:
+        st.error(f"No se pudo generar: {trabajo.error}")
+    else:
+        texto = trabajo.estado if not trabajo.total else f"{trabajo.completados} de {trabajo.total}: {trabajo.detalle}"
+        st.progress(trabajo.fraccion, text=texto)
+    if not trabajo.activo:
+        st.button(
+            "Descartar", key=f"descartar_exportacion_{trabajo.identificador}",
+            on_click=cola_exportaciones.descartar, args=(trabajo.identificador,)
+        )
+
+@st.experimental_fragment(run_every=INTERVALO_REFRESCO_S)
+def _mostrar_trabajos(sesion):
+    # Fragmento que se vuelve a ejecutar solo, sin el resto de la página,
+    # para seguir el avance de los trabajos
+    trabajos = cola_exportaciones.trabajos(sesion)
+    if not trabajos:
+        st.caption("No hay exportaciones en esta sesión.")
+    for trabajo in reversed(trabajos):
+        _mostrar_trabajo(trabajo)
+
+def mostrar_exportaciones(sesion, df, filtro=()):
+    """
+    Sección "Exportaciones" de la barra lateral: lanza los informes por unidad
+    de las filas del filtro global y muestra el avance de todas las
+    exportaciones de la sesión, con su botón de descarga cuando terminan.
+    """
+    from modulos.informes_lote import informes_por_unidad_zip
+
+    st.sidebar.subheader("Exportaciones")
+    with st.sidebar.expander("Informes por unidad"):
+        if df.empty:
+            st.caption("Ninguna fila cumple el filtro global.")
+            columna = None
+        else:
+            columna = st.selectbox(
+                "Un informe por cada valor de:",
+                df.columns[:NUMERO_COLUMNAS_REFERENCIA].tolist(),
+                key="columna_informes_unidad"
+            )
+        if st.button("Generar informes (ZIP)", key="generar_informes_unidad", disabled=columna is None):
+            encolar_exportacion(
+                sesion, descripcion_exportacion(f"Informes por {columna}", filtro),
+                "informes_por_unidad.zip", informes_por_unidad_zip, df, columna
+            )
+
+    with st.sidebar:
+        _mostrar_trabajos(sesion)
@@ -0,0 +1,62 @@
+# /modulos/panel_rendimiento.py
+
+import streamlit as st
+import pandas as pd
+from modulos.instrumentacion import instrumentacion
+
+# Mediciones recientes que se muestran en el panel
+MEDICIONES_EN_PANEL = 50
+
+def resumen_por_etapa(mediciones):
+    """
+    Agrupa las mediciones por etapa: número de mediciones, tiempo total y
+    máximo, y pico de memoria máximo.
+    """
+    df = pd.DataFrame(mediciones)
+    if df.empty:
+        return df
+    resumen = df.groupby("etapa").agg(
+        mediciones=("segundos", "size"),
+        segundos_totales=("segundos", "sum"),
+        segundos_maximos=("segundos", "max"),
+        pico_maximo_mb=("pico_mb", "max")
+    )
+    return resumen.sort_values("segundos_totales", ascending=False)
+
+def mostrar_panel_rendimiento(sesion):
+    """
+    Panel opcional de la barra lateral con las mediciones de la sesión:
+    tiempo y memoria por etapa y las preguntas, archivos y gráficos más lentos.
+    """
+    if not st.sidebar.checkbox("Panel de rendimiento", key="panel_rendimiento"):
+        return
+
+    with st.sidebar:
+        medir_memoria = st.checkbox(
+            "Medir memoria (tracemalloc, más lento)",
+            value=instrumentacion.midiendo_memoria,
+            key="medir_memoria_rendimiento"
+        )
+        # La medición de memoria es común a todo el proceso
+        if medir_memoria != instrumentacion.midiendo_memoria:
+            instrumentacion.activar_memoria(medir_memoria)
+
+        mediciones = instrumentacion.mediciones(sesion=sesion)
+        if not mediciones:
+            st.caption("Todavía no hay mediciones en esta sesión.")
+            return
+
+        st.caption("Por etapa")
+        st.dataframe(resumen_por_etapa(mediciones))
+
+        # Lo más lento de cada etapa, con la pregunta, el archivo o el gráfico que lo identifica
+        st.caption(f"Últimas {MEDICIONES_EN_PANEL} mediciones, de la más lenta a la más rápida")
+        recientes = pd.DataFrame(mediciones[-MEDICIONES_EN_PANEL:])
+        columnas = [
+            columna for columna in ("etapa", "segundos", "pico_mb", "pregunta", "archivo", "figura", "filas")
+            if columna in recientes.columns
+        ]
+        st.dataframe(recientes.sort_values("segundos", ascending=False)[columnas], hide_index=True)
+
+        if instrumentacion.ruta_registro:
+            st.caption(f"Registro completo en {instrumentacion.ruta_registro}")
@@ -0,0 +1,106 @@
+# /modulos/preguntas.py
+
+# Listados de preguntas de la encuesta. Este módulo no importa nada pesado
+# para que la carga de datos y el esquema no tengan que cargar los módulos
+# de análisis (matplotlib, python-docx, ...).
+
+# Preguntas de la encuesta por tipo, tal como aparecen en la cabecera de los archivos
+PREGUNTAS_CUANTITATIVAS = [
+    "Durante el primer año de residencia, valore el proceso de acogida en su Servicio",
+    "Valore el proceso de integración en su Servicio desde que inició su formación hasta la actualidad",
+    "Valore la dedicación en tiempo de su tutor/a en su labor tutorial",
+    "Valore el asesoramiento en docencia que recibes de su tutor/a",
+    "Valore la accesibilidad de su tutor/a (¿Está disponible cuándo le necesitas?)",
+    "Valore la satisfacción global con su tutor/a",
+    "Valore la información de la Guía Itinerario Formativo Tipo (GIFT) que su Unidad Docente ha elaborado",
+    "Valore la adaptación del PIF a los contenidos y desarrollo de su especialidad",
+    "¿Cómo valora las facilidades que le ha ofrecido el personal sanitario para el aprendizaje de métodos, técnicas y procedimientos diagnósticos y terapéuticos?",
+    "Valore la satisfacción global sobre la planificación y desarrollo de la formación",
+    "Por término medio, ¿a cuántas sesiones clínicas, bibliográficas, seminarios y otras actividades docentes asiste al mes en su Servicio/Centro o Unidad Docente?",
+    "Por término medio, ¿cuántas sesiones clínicas, bibliográficas, seminarios u otras actividades docentes imparte al mes en su Servicio/Centro o Unidad Docente?",
+    "Valore la ayuda que ha recibido para la preparación de las sesiones impartidas",
+    "Valore la facilidad que le ofrecen para asistir a las sesiones",
+    "Valore las facilidades ofrecidas para asistir a congresos, cursos, reuniones científicas y actividades formativas no incluidas en el programa de la especialidad pero recomendadas por el tutor/a",
+    "Valore el asesoramiento recibido para realizar trabajos de investigación cuando se ha solicitado",
+    "¿Cuántas comunicaciones ha presentado en jornadas o congresos nacionales o internacionales?",
+    "¿En cuántos estudios publicados en revistas nacionales o internacionales ha participado?",
+    "¿Cómo valora las actividades formativas transversales ofertadas por su Centro/Unidad Docente?",
+    "¿Cómo valora las actividades complementarias de su especialidad?",
+    "Valore la satisfacción global de las sesiones clínicas, actividades de investigación y actividades formativas complementarias",
+    "Valore su nivel de formación en valores profesionales, actitudes y comportamientos éticos (conocimientos, habilidades y actitudes)",
+    "Valore su nivel de formación en competencias relacionadas con aspectos médicos legales",
+    "Valore su nivel de formación en competencias de comunicación con el paciente y la familia",
+    "Valore su nivel de formación en competencias necesarias para la comunicación con otros profesionales",
+    "Valore su nivel de formación en estadística/investigación",
+    "Valore su nivel de formación en competencias para el trabajo en equipo",
+    "Valore su nivel de formación en el manejo de información (sistemas de registros del hospital/centro de salud indicadores)",
+    "Valore su nivel de formación en competencias de gestión clínica (calidad, utilización racional de los recursos, ...)",
+    "Valore su nivel de formación en competencias par el autoaprendizaje",
+    "Valore su nivel de formación en habilidades básicas de transmisión de conocimientos y como docente",
+    "Valore la satisfacción global sobre competencias adquiridas hasta la actualidad",
+    "¿Cómo valora el cumplimiento de su calendario de rotaciones?",
+    "¿Cómo valora la supervisión individual de su formación de la áreas asistenciales por las que rota?",
+    "Valore la responsabilidad progresiva asumida a lo largo de su formación",
+    "Valore las facilidades que le ha ofrecido el equipo, para la adquisición de habilidades clínicas",
+    "Valore la confianza que depositan en usted, para que asumas un grado de responsabilidad creciente",
+    "Valore la preocupación de su Servicio/Centro de Salud por su formación",
+    "Valore la satisfacción global sobre las rotaciones internas",
+    "Por término medio, ¿cuántas guardias realiza al mes?",
+    "Si ha superado el primer año de residencia, ¿cómo valora la supervisión individual durante las guardias desde entonces?",
+    "Valore la satisfacción global sobre las guardias",
+    "Valore las facilidades ofrecidas para realizar las rotaciones externas propuestas por el tutor/a",
+    "Valore la satisfacción global de las rotaciones externas",
+    "Valore la satisfacción global de la Comisión de Docencia",
+    "Valore la satisfacción global sobre la comunicación de resultados",
+    "Valore la satisfacción global respecto a su residencia"
+]
+
+PREGUNTAS_CUALITATIVAS = [
+    "Comentarios sobre la acogida e integración en el Servicio",
+    "¿Realiza tutorías estructuradas cada tres meses con su tutor/a?",
+    "¿Conoce los criterios que se aplican para evaluarle de forma continuada? - Informe de evaluación de las rotaciones",
+    "¿Qué criterios cree usted que se aplican para evaluarle de forma continuada? - Informe de evaluación de la rotaciones. Selección múltiple",
+    "¿Conoce los criterios que se aplican para realizar las evaluaciones anuales? - Informe de evaluación anual del tutor",
+    "¿Qué criterios cree usted que se aplican para evaluarle de forma anual? - Informe de evaluación anual del tutor. Selección múltiple",
+    "Comentarios sobre la tutorización",
+    "¿Dispone de un Libro de Residente?",
+    "¿Cómo valora la formación en ética y profesionalismo? - (Comentarios)",
+    "¿Cómo valora la planificación y desarrollo de la formación? - (Comentarios)",
+    "Comentarios sobre las sesiones clínicas, actividades de investigación y actividades formativas complementarias",
+    "Comentarios sobre competencias adquiridas",
+    "Comentarios sobre el cumplimiento del calendario y las rotaciones",
+    "Comentarios sobre las rotaciones internas",
+    "Comentarios sobre las guardias",
+    "¿La Unidad Docente le ha informado del Plan de Ayudas del SCS para las Rotaciones Externas?",
+    "Comentarios sobre las rotaciones externas",
+    "¿Conoce la existencia de la Comisión de Docencia de su Unidad Docente?",
+    "¿Conoce al vocal que representa a los residentes en la Comisión de Docencia?",
+    "¿Ha planteado alguna vez una queja, propuesta o sugerencia a la Comisión de Docencia?",
+    "Comentarios sobre la Comisión de Docencia",
+    "¿Le comunican los resultados de la encuesta anual de satisfacción de residentes de su hospital/CCAA?",
+    "¿A través de que vía se le comunican dichos resultados? Selección múltiple",
+    "Comentarios sobre la comunicación de resultados",
+    "Si tuviera que volver a elegir centro para realizar su residencia, ¿volvería a seleccionar este centro?",
+    "Comentarios sobre la valoración general",
+    "Comentarios de propuestas de mejora"
+]
+
+def obtener_preguntas_cuantitativas(df):
+    """
+    Identifica y devuelve las columnas con preguntas de tipo cuantitativo
+    basándose en la lista proporcionada por el usuario.
+    """
+    preguntas_en_df = [col for col in df.columns if col in PREGUNTAS_CUANTITATIVAS]
+    
+    return preguntas_en_df
+
+def obtener_preguntas_cualitativas(df):
+    """
+    Identifica y devuelve las columnas con preguntas de tipo cualitativo.
+    """
+    columnas = df.columns.tolist()
+    # Las preguntas cualitativas son todas las que no están en las primeras 5 columnas
+    # ni son las preguntas de tipo cuantitativo
+    preguntas_en_df = [col for col in columnas if col in PREGUNTAS_CUALITATIVAS]
+    
+    return preguntas_en_df
@@ -2,68 +2,202 @@
 
 import streamlit as st
 import pandas as pd
-import os
+import numpy as np
+import time
 from datetime import datetime
+from modulos.lectura_excel import (
+    ErrorLecturaExcel,
+    LimiteMemoriaExcedido,
+    obtener_contenido_archivo,
+    alinear_columnas
+)
+from modulos.fusion_datos import cargar_archivo, leer_libros, fusionar_contenidos
+from modulos.almacen_datos import (
+    calcular_hash_contenidos,
+    cargar_dataset,
+    guardar_dataset,
+    reservar_nombre_fusion,
+    registrar_fusion,
+    buscar_fusion_por_hash,
+    preparar_para_arrow,
+    actualizar_fusion,
+    eliminar_dataset,
+    cargar_fusion
+)
+from modulos.instrumentacion import instrumentacion
 
 def crear_nombre_fusionado():
     """
-    Crea un nombre de archivo único para los archivos fusionados.
-    El formato es 'fusionado_DDMMYY_N', donde N es un contador para el día.
+    Crea un nombre único para los archivos fusionados.
+    El formato es 'fusionado_DDMMYY_N', donde N es un contador para el día
+    que se guarda en el índice de fusiones.
     """
-    hoy = datetime.now().strftime("%d%m%y")
-    archivos_existentes = [f for f in os.listdir("data") if f.startswith(f"fusionado_{hoy}")]
-    contador = len(archivos_existentes) + 1
-    return f"fusionado_{hoy}_{contador}.xlsx"
+    return reservar_nombre_fusion()
 
-def fusionar_archivos_excel(archivos):
+def cargar_archivo_excel(archivo, streaming=False, limite_memoria_mb=None):
     """
-    Fusiona múltiples archivos de Excel en un solo DataFrame.
+    Carga un único archivo de Excel (ver fusion_datos.cargar_archivo).
     """
-    if not os.path.exists("data"):
-        os.makedirs("data")
+    return cargar_archivo(archivo, streaming=streaming, limite_memoria_mb=limite_memoria_mb)
+
+def fusionar_archivos_excel(archivos, paralelo=True, max_workers=None, streaming=False, limite_memoria_mb=None):
+    """
+    Fusiona múltiples archivos de Excel en un solo DataFrame y registra la
+    fusión con un nombre nuevo. La lectura, la alineación con la cabecera
+    del primer archivo y la concatenación se hacen en fusion_datos; aquí se
+    muestran el avance y los errores. Con streaming=True los libros se leen
+    de uno en uno y por bloques, con un techo de memoria común.
+    """
+    if not archivos:
+        st.warning("No se han proporcionado archivos para fusionar.")
+        return None, None
 
-    df_final = pd.DataFrame()
-    procesadas_por_archivo = {}
-    total_filas_procesadas = 0
-    
     st.info("Iniciando proceso de fusión...")
-    
+    inicio = time.perf_counter()
+
     with st.spinner('Fusionando archivos...'):
-        for i, archivo in enumerate(archivos):
-            try:
-                # Leer el archivo, ignorando la primera fila en los archivos adicionales
-                header = 0
-                if i > 0:
-                    header = None
-                
-                df_temp = pd.read_excel(archivo, header=header)
-                st.write(f"Procesando archivo: {archivo.name}")
-                
-                # Usar la primera fila del primer archivo como cabecera si es el primer archivo
-                if i == 0:
-                    df_final = df_temp
-                else:
-                    df_final = pd.concat([df_final, df_temp], ignore_index=True)
-                
-                filas_procesadas = len(df_temp)
-                procesadas_por_archivo[archivo.name] = filas_procesadas
-                total_filas_procesadas += filas_procesadas
-
-            except Exception as e:
-                st.error(f"Error al procesar el archivo {archivo.name}: {e}")
-                return None, None
-    
-    # Limpieza final: Eliminar filas vacías o con datos solo en la columna 'A'
-    df_final.dropna(how='all', inplace=True)
-    
-    # Guardar el archivo fusionado y el log
+        contenidos = [obtener_contenido_archivo(archivo) for archivo in archivos]
+
+        # Si estos mismos archivos ya se fusionaron, se reutiliza la fusión registrada
+        hash_dataset = calcular_hash_contenidos([contenido for _, contenido in contenidos], "fusion")
+        nombre_previo, datos_previos = buscar_fusion_por_hash(hash_dataset)
+        if datos_previos is not None:
+            df_cache = cargar_dataset(hash_dataset)
+            if df_cache is not None:
+                st.write(f"Estos archivos ya se fusionaron en '{nombre_previo}'. Cargando la copia guardada.")
+                log = dict(datos_previos["log"])
+                log["Origen"] = f"Caché ({nombre_previo})"
+                log["Tiempo total de fusión (s)"] = round(time.perf_counter() - inicio, 3)
+                return df_cache, log
+
+        try:
+            df_final, log_fusion = fusionar_contenidos(
+                contenidos, paralelo=paralelo, max_workers=max_workers,
+                streaming=streaming, limite_memoria_mb=limite_memoria_mb
+            )
+        except ErrorLecturaExcel as e:
+            st.error(f"Error al procesar el archivo {e.nombre}: {e.error}")
+            return None, None
+        except LimiteMemoriaExcedido as e:
+            st.error(f"Se ha superado el límite de memoria configurado: {e}")
+            return None, None
+        for nombre in log_fusion.get("Filas por archivo", {}):
+            st.write(f"Archivo procesado: {nombre}")
+
+    for aviso in log_fusion.get("Avisos", []):
+        st.warning(aviso)
     nombre_fusionado = crear_nombre_fusionado()
-    ruta_guardado = os.path.join("data", nombre_fusionado)
-    df_final.to_excel(ruta_guardado, index=False)
-    
-    log = {
-        "Total de filas procesadas": total_filas_procesadas,
-        "Filas por archivo": procesadas_por_archivo
+    log = {"Fusión": nombre_fusionado, **log_fusion}
+    registrar_fusion(nombre_fusionado, hash_dataset, log)
+    return df_final, log
+
+def _invalidar_derivados(hash_antiguo, hash_nuevo):
+    """
+    Marca como obsoleto lo calculado sobre la versión anterior de un dataset:
+    su cubo de tablas cruzadas, sus vistas filtradas, los resultados de sus
+    columnas completas y su copia en el almacén compartido (las sesiones pasan
+    a la versión nueva).
+    """
+    from modulos.cache_resultados import invalidar_dataset
+    from modulos.tablas_cruzadas import descartar_cubo
+    from modulos.filtros import descartar_vistas
+    from modulos.almacen_compartido import almacen_compartido
+    descartar_cubo(hash_antiguo)
+    descartar_vistas(hash_antiguo)
+    almacen_compartido.sustituir(hash_antiguo, hash_nuevo)
+    return invalidar_dataset(hash_antiguo)
+
+def anadir_a_fusion(nombre_fusion, archivos, paralelo=True, max_workers=None, streaming=False, limite_memoria_mb=None):
+    """
+    Añade archivos nuevos a una fusión guardada sin volver a leer los que ya
+    contenía. Las respuestas que ya estaban en la fusión (o repetidas entre
+    los archivos nuevos) se descartan comparando el hash de cada fila.
+    La fusión conserva su nombre: se guarda la nueva versión del dataset, se
+    actualiza su log y se invalida solo lo calculado sobre la versión anterior.
+    """
+    if not archivos:
+        st.warning("No se han proporcionado archivos para añadir.")
+        return None, None
+
+    df_base, log_anterior = cargar_fusion(nombre_fusion)
+    if df_base is None:
+        st.error(f"No se pudo abrir la fusión '{nombre_fusion}'.")
+        return None, None
+    hash_anterior = df_base.attrs["hash_dataset"]
+
+    st.info(f"Añadiendo archivos a '{nombre_fusion}'...")
+    inicio = time.perf_counter()
+
+    with st.spinner('Leyendo los archivos nuevos...'):
+        contenidos = [obtener_contenido_archivo(archivo) for archivo in archivos]
+        hash_dataset = calcular_hash_contenidos(
+            [hash_anterior.encode("utf-8")] + [contenido for _, contenido in contenidos], "incremental"
+        )
+
+        try:
+            lecturas = leer_libros(contenidos, paralelo, max_workers, streaming, limite_memoria_mb)
+        except ErrorLecturaExcel as e:
+            st.error(f"Error al procesar el archivo {e.nombre}: {e.error}")
+            return None, None
+        except LimiteMemoriaExcedido as e:
+            st.error(f"Se ha superado el límite de memoria configurado: {e}")
+            return None, None
+
+        # Los archivos nuevos se alinean con la cabecera de la fusión
+        dataframes = [df_base]
+        origen_filas = []
+        avisos = []
+        for nombre, df_temp, _, _ in lecturas:
+            dataframes.append(alinear_columnas(df_temp, df_base.columns, avisos, nombre))
+            origen_filas.append(np.full(len(df_temp), nombre, dtype=object))
+        with instrumentacion.medir("concatenacion", archivos=len(dataframes)):
+            df_combinado = preparar_para_arrow(pd.concat(dataframes, ignore_index=True))
+
+        # Hash de cada fila sobre el DataFrame combinado, para que las filas
+        # antiguas y las nuevas se comparen con los mismos tipos de columna
+        n_base = len(df_base)
+        hashes = pd.util.hash_pandas_object(df_combinado, index=False).to_numpy()
+        hashes_nuevos = hashes[n_base:]
+        duplicadas = np.isin(hashes_nuevos, hashes[:n_base]) | pd.Series(hashes_nuevos).duplicated().to_numpy()
+        vacias = df_combinado.iloc[n_base:].isna().all(axis=1).to_numpy()
+        conservar = ~duplicadas & ~vacias
+        df_final = df_combinado.iloc[np.concatenate((np.arange(n_base), n_base + np.flatnonzero(conservar)))]
+
+    if not conservar.any():
+        st.info("Los archivos no contienen respuestas nuevas: la fusión no cambia.")
+        return df_base, log_anterior
+
+    origen_filas = np.concatenate(origen_filas) if origen_filas else np.array([], dtype=object)
+    incorporacion = {
+        "Fecha": datetime.now().isoformat(timespec="seconds"),
+        "Archivos": {},
+        "Filas añadidas": int(conservar.sum()),
+        "Filas duplicadas descartadas": int((duplicadas & ~vacias).sum())
     }
-    
-    return df_final, log
\ No newline at end of file
+    if avisos:
+        incorporacion["Avisos"] = avisos
+        for aviso in avisos:
+            st.warning(aviso)
+    for nombre, _, filas_procesadas, segundos in lecturas:
+        filas_del_archivo = origen_filas == nombre
+        incorporacion["Archivos"][nombre] = {
+            "Filas": filas_procesadas,
+            "Filas añadidas": int((conservar & filas_del_archivo).sum()),
+            "Tiempo de lectura (s)": round(segundos, 3)
+        }
+
+    guardar_dataset(hash_dataset, df_final)
+
+    log = dict(log_anterior or {})
+    log["Total de filas procesadas"] = log.get("Total de filas procesadas", n_base) + sum(l[2] for l in lecturas)
+    log["Filas por archivo"] = {**log.get("Filas por archivo", {}), **{l[0]: l[2] for l in lecturas}}
+    log["Incorporaciones"] = log.get("Incorporaciones", []) + [incorporacion]
+    log["Tiempo de la última incorporación (s)"] = round(time.perf_counter() - inicio, 3)
+    actualizar_fusion(nombre_fusion, hash_dataset, log)
+
+    # La versión anterior deja de estar registrada: se borra y se invalida lo derivado de ella
+    eliminar_dataset(hash_anterior)
+    resultados_invalidados = _invalidar_derivados(hash_anterior, hash_dataset)
+    st.write(f"Resultados en caché invalidados: {resultados_invalidados}")
+
+    return cargar_dataset(hash_dataset), log
@@ -0,0 +1,257 @@
+# /modulos/procesamiento_texto.py
+
+import os
+import re
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from modulos.cache_resultados import huella_columna
+from modulos.filtros import origen_vista
+from modulos.instrumentacion import instrumentacion
+
+# Tokenización de los comentarios de texto libre. Cada respuesta se tokeniza
+# por separado, con tablas de normalización y palabras vacías que se cargan
+# una sola vez, y el resultado se guarda por (contenido de la columna, columna)
+# para no volver a tokenizar. Los recuentos se obtienen de una matriz dispersa
+# respuestas x términos que se puede volver a agrupar por cualquier subgrupo.
+#
+# Este módulo no importa streamlit: tokenizar_lote se ejecuta en procesos trabajadores.
+
+# Palabras: secuencias de letras y dígitos (equivale al filtro isalnum del análisis original)
+_PATRON_PALABRA = re.compile(r"[^\W_]+")
+
+# Plegado de tildes y diéresis; la ñ se conserva porque distingue palabras (año/ano)
+_TABLA_PLEGADO = str.maketrans(
+    "áéíóúàèìòùäëïöüâêîôûÁÉÍÓÚÀÈÌÒÙÄËÏÖÜÂÊÎÔÛ",
+    "aeiouaeiouaeiouaeiouAEIOUAEIOUAEIOUAEIOU"
+)
+
+# Recursos de NLTK incluidos en el repositorio (misma estructura de carpetas
+# que nltk_data), para no depender de descargas en arranques sin red
+DIRECTORIO_RECURSOS_NLTK = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "recursos", "nltk_data"
+)
+
+# Con más respuestas que este umbral la tokenización se reparte en procesos
+UMBRAL_TOKENIZACION_PARALELA = 50_000
+TAMANO_LOTE_TOKENIZACION = 10_000
+# Columnas tokenizadas que se mantienen en memoria
+MAXIMO_COLUMNAS_EN_CACHE = 64
+
+_cache_tokens = OrderedDict()
+_bloqueo_cache = threading.Lock()
+
+def normalizar(texto):
+    """
+    Pasa el texto a minúsculas y quita tildes y diéresis.
+    """
+    return texto.lower().translate(_TABLA_PLEGADO)
+
+def tokenizar(texto):
+    """
+    Devuelve la lista de palabras normalizadas de una respuesta.
+    """
+    return _PATRON_PALABRA.findall(normalizar(texto))
+
+def tokenizar_lote(textos):
+    """
+    Tokeniza una lista de respuestas en minúsculas, sin plegar tildes: el
+    plegado se aplica después sobre el vocabulario, que es mucho más pequeño.
+    """
+    return [_PATRON_PALABRA.findall(texto.lower()) for texto in textos]
+
+@lru_cache(maxsize=1)
+def palabras_vacias():
+    """
+    Conjunto de palabras vacías en español, normalizadas igual que los tokens.
+    Se lee una única vez por proceso del corpus 'stopwords' incluido en
+    recursos/nltk_data, sin importar NLTK ni acceder a la red.
+    """
+    ruta = os.path.join(DIRECTORIO_RECURSOS_NLTK, "corpora", "stopwords", "spanish")
+    with open(ruta, "r", encoding="utf-8") as f:
+        return frozenset(normalizar(linea.strip()) for linea in f if linea.strip())
+
+class TokensColumna:
+    """
+    Tokens de las respuestas no vacías de una columna de comentarios.
+
+    Los tokens se guardan como identificadores de vocabulario concatenados
+    ('ids') con los desplazamientos de cada respuesta ('desplazamientos'),
+    de modo que se conserva el orden de las palabras ocupando poca memoria.
+    'filas' son las posiciones de las respuestas dentro de la columna original.
+    """
+
+    def __init__(self, columna, filas, vocabulario, ids, desplazamientos):
+        self.columna = columna
+        self.filas = filas
+        self.vocabulario = vocabulario
+        self.ids = ids
+        self.desplazamientos = desplazamientos
+        self._matriz = None
+        self._mascara_vacias = None
+
+    def __len__(self):
+        return len(self.filas)
+
+    def tokens(self, i):
+        """
+        Tokens de la respuesta i (en el orden de 'filas').
+        """
+        inicio, fin = self.desplazamientos[i], self.desplazamientos[i + 1]
+        return [self.vocabulario[t] for t in self.ids[inicio:fin]]
+
+    def matriz_terminos(self):
+        """
+        Matriz dispersa (respuestas x vocabulario) con el número de veces que
+        aparece cada término en cada respuesta. Se construye una sola vez.
+        """
+        if self._matriz is None:
+            datos = np.ones(len(self.ids), dtype=np.int32)
+            # sum_duplicates ordena los índices en su sitio: se pasa una copia
+            # para no alterar el orden de las palabras en 'ids'
+            matriz = sparse.csr_matrix(
+                (datos, self.ids.copy(), self.desplazamientos.copy()),
+                shape=(len(self.filas), len(self.vocabulario))
+            )
+            matriz.sum_duplicates()
+            self._matriz = matriz
+        return self._matriz
+
+    def mascara_palabras_vacias(self):
+        """
+        Vector booleano sobre el vocabulario: True en las palabras vacías.
+        """
+        if self._mascara_vacias is None:
+            vacias = palabras_vacias()
+            self._mascara_vacias = np.fromiter(
+                (termino in vacias for termino in self.vocabulario),
+                dtype=bool, count=len(self.vocabulario)
+            )
+        return self._mascara_vacias
+
+    def subconjunto(self, filas):
+        """
+        Tokens de las filas indicadas (posiciones ordenadas en la columna
+        original), sin volver a tokenizar. Comparte el vocabulario, así que
+        puede contener términos que no aparecen en el subconjunto.
+        """
+        filas = np.asarray(filas)
+        posiciones = np.searchsorted(filas, self.filas)
+        presentes = posiciones < len(filas)
+        presentes[presentes] = filas[posiciones[presentes]] == self.filas[presentes]
+        respuestas = np.flatnonzero(presentes)
+        longitudes = np.diff(self.desplazamientos)[respuestas]
+        desplazamientos = np.concatenate(([0], np.cumsum(longitudes)))
+        indices = np.repeat(self.desplazamientos[:-1][respuestas] - desplazamientos[:-1], longitudes) + np.arange(desplazamientos[-1])
+        return TokensColumna(
+            columna=self.columna,
+            filas=posiciones[respuestas],
+            vocabulario=self.vocabulario,
+            ids=self.ids[indices],
+            desplazamientos=desplazamientos
+        )
+
+    def frecuencias(self, seleccion=None, excluir_palabras_vacias=True):
+        """
+        Frecuencia de cada término, de mayor a menor. 'seleccion' es una
+        máscara booleana o un array de posiciones sobre las respuestas para
+        contar solo un subconjunto sin volver a tokenizar.
+        Los empates conservan el orden de primera aparición, como Counter.most_common.
+        """
+        if seleccion is None:
+            conteos = np.bincount(self.ids, minlength=len(self.vocabulario))
+        else:
+            conteos = np.asarray(self.matriz_terminos()[seleccion].sum(axis=0)).ravel()
+        if excluir_palabras_vacias:
+            conteos = np.where(self.mascara_palabras_vacias(), 0, conteos)
+        orden = np.argsort(-conteos, kind="stable")
+        orden = orden[conteos[orden] > 0]
+        return pd.Series(conteos[orden], index=[self.vocabulario[i] for i in orden], name=self.columna)
+
+    def frecuencias_por_grupo(self, codigos_grupo, n_grupos, excluir_palabras_vacias=True):
+        """
+        Matriz dispersa grupos x vocabulario con las frecuencias de cada subgrupo.
+        'codigos_grupo' asigna a cada respuesta un código entre 0 y n_grupos - 1
+        (o -1 para no contarla). Es un único producto de matrices dispersas.
+        """
+        codigos_grupo = np.asarray(codigos_grupo)
+        validos = codigos_grupo >= 0
+        indicadora = sparse.csr_matrix(
+            (np.ones(validos.sum(), dtype=np.int32), (codigos_grupo[validos], np.flatnonzero(validos))),
+            shape=(n_grupos, len(self.filas))
+        )
+        por_grupo = (indicadora @ self.matriz_terminos()).tocsr()
+        if excluir_palabras_vacias:
+            por_grupo = por_grupo @ sparse.diags((~self.mascara_palabras_vacias()).astype(np.int32))
+        return por_grupo
+
+def _tokenizar_textos(textos):
+    """
+    Tokeniza las respuestas por lotes, en varios procesos si son muchas.
+    """
+    if len(textos) <= UMBRAL_TOKENIZACION_PARALELA or (os.cpu_count() or 1) == 1:
+        return tokenizar_lote(textos)
+    lotes = [textos[i:i + TAMANO_LOTE_TOKENIZACION] for i in range(0, len(textos), TAMANO_LOTE_TOKENIZACION)]
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=contexto) as pool:
+        resultado = []
+        for tokens_lote in pool.map(tokenizar_lote, lotes):
+            resultado.extend(tokens_lote)
+        return resultado
+
+def construir_tokens_columna(serie):
+    """
+    Tokeniza las respuestas no vacías de una columna y construye su TokensColumna.
+    """
+    valores = serie.to_numpy()
+    no_vacias = ~pd.isna(valores)
+    filas = np.flatnonzero(no_vacias)
+    textos = [str(valor) for valor in valores[no_vacias]]
+
+    with instrumentacion.medir("tokenizacion", pregunta=serie.name, respuestas=len(textos)):
+        listas_tokens = _tokenizar_textos(textos)
+        longitudes = np.fromiter(map(len, listas_tokens), dtype=np.int64, count=len(listas_tokens))
+        desplazamientos = np.concatenate(([0], np.cumsum(longitudes)))
+        # factorize numera los términos en orden de primera aparición
+        ids, formas = pd.factorize(np.fromiter(chain.from_iterable(listas_tokens), dtype=object, count=int(desplazamientos[-1])))
+        # Plegar tildes solo en las formas distintas y unir las que coinciden (sesión/sesion)
+        ids_plegados, vocabulario = pd.factorize(np.array([forma.translate(_TABLA_PLEGADO) for forma in formas], dtype=object))
+
+    return TokensColumna(
+        columna=serie.name,
+        filas=filas,
+        vocabulario=vocabulario.tolist(),
+        ids=ids_plegados[ids].astype(np.int32),
+        desplazamientos=desplazamientos
+    )
+
+def obtener_tokens_columna(serie):
+    """
+    Devuelve los tokens de una columna, reutilizando los ya calculados si
+    la misma columna (mismo contenido y nombre) se tokenizó antes. Las
+    columnas de una vista filtrada se toman de los tokens de la columna completa.
+    """
+    clave = huella_columna(serie)
+    with _bloqueo_cache:
+        if clave in _cache_tokens:
+            _cache_tokens.move_to_end(clave)
+            return _cache_tokens[clave]
+
+    origen = origen_vista(serie, clave)
+    if origen is not None:
+        df_completo, filas = origen
+        tokens = obtener_tokens_columna(df_completo[serie.name]).subconjunto(filas)
+    else:
+        tokens = construir_tokens_columna(serie)
+
+    with _bloqueo_cache:
+        _cache_tokens[clave] = tokens
+        while len(_cache_tokens) > MAXIMO_COLUMNAS_EN_CACHE:
+            _cache_tokens.popitem(last=False)
+    return tokens
@@ -0,0 +1,222 @@
+# /modulos/prompts_ia.py
+
+import math
+import numpy as np
+import pandas as pd
+from modulos.duplicados_texto import obtener_duplicados
+
+# Construcción de los prompts de IA para las preguntas de comentarios. Los
+# comentarios se reparten en fragmentos que caben en un presupuesto de tokens
+# estimado localmente (sin llamar a ningún servicio) y, si no caben todos en
+# el número máximo de fragmentos, se toma una muestra estratificada por una
+# columna de referencia (hospital, especialidad...) proporcional al número
+# de respuestas de cada grupo. Cada fragmento mezcla comentarios de todos los
+# grupos y su texto solo se construye cuando se pide. Los comentarios casi
+# duplicados se sustituyen por el representante de su grupo, de modo que se
+# envían una sola vez con su número de repeticiones.
+#
+# Este módulo no importa streamlit.
+
+# Caracteres por token en textos en español con los tokenizadores habituales;
+# se usa un valor bajo para que la estimación quede por exceso
+CARACTERES_POR_TOKEN = 3.5
+PRESUPUESTO_TOKENS_POR_DEFECTO = 6000
+MAXIMO_FRAGMENTOS_POR_DEFECTO = 10
+# Presupuesto mínimo que debe quedar para comentarios tras las instrucciones
+MINIMO_TOKENS_COMENTARIOS = 200
+
+INSTRUCCIONES_ANALISIS = (
+    "Identifica las 5 categorías temáticas más relevantes, el sentimiento general de cada categoría "
+    "(positivo, negativo, neutro) y extrae las 3 frases más representativas para cada una. "
+    "Después, resume brevemente los hallazgos principales de este análisis."
+)
+
+def estimar_tokens(texto):
+    """
+    Estimación local (por exceso) del número de tokens de un texto.
+    """
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+def _estimar_tokens_lineas(lineas):
+    # Un token más por línea para el salto de línea
+    return np.ceil(lineas.str.len().to_numpy() / CARACTERES_POR_TOKEN).astype(np.int64) + 1
+
+class PlanPrompts:
+    """
+    Reparto de los comentarios de una pregunta en fragmentos. Guarda las
+    líneas de comentarios seleccionadas y los límites de cada fragmento;
+    el texto de cada prompt se construye al pedirlo.
+    """
+
+    def __init__(self, pregunta, referencia, lineas, limites, comentarios_totales, comentarios_incluidos, tokens):
+        self.pregunta = pregunta
+        self.referencia = referencia
+        self.lineas = lineas
+        self.limites = limites
+        self.comentarios_totales = comentarios_totales
+        self.comentarios_incluidos = comentarios_incluidos
+        self.tokens = tokens
+
+    def __len__(self):
+        return len(self.limites)
+
+    @property
+    def muestreado(self):
+        return self.comentarios_incluidos < self.comentarios_totales
+
+    def _cabecera(self, i):
+        partes = [
+            "Analiza los siguientes comentarios de una encuesta de satisfacción de residentes, "
+            f"respuestas a la pregunta: \"{self.pregunta}\"."
+        ]
+        if len(self) > 1:
+            partes.append(
+                f"Esta es la parte {i + 1} de {len(self)}; analízala por separado, "
+                "al final se pedirá unir los resultados de todas las partes."
+            )
+        if self.muestreado:
+            muestra = f"Se incluye una muestra de {self.comentarios_incluidos} de {self.comentarios_totales} comentarios"
+            partes.append(f"{muestra}, estratificada por {self.referencia}." if self.referencia else f"{muestra}.")
+        if self.referencia:
+            partes.append(f"Entre corchetes se indica {self.referencia} de cada comentario.")
+        partes.append("(×n) indica que el mismo comentario (o uno casi idéntico) se repite n veces.")
+        return " ".join(partes)
+
+    def prompt(self, i):
+        """
+        Texto del prompt del fragmento i (empezando en 0).
+        """
+        inicio, fin = self.limites[i]
+        comentarios = "\n".join(self.lineas[inicio:fin])
+        return f"{self._cabecera(i)}\n\n{comentarios}\n\n{INSTRUCCIONES_ANALISIS}"
+
+    def iterar_prompts(self):
+        for i in range(len(self)):
+            yield self.prompt(i)
+
+    def prompt_consolidacion(self):
+        """
+        Prompt para unir los resultados de los fragmentos en un único análisis.
+        """
+        return (
+            f"Te paso los análisis de las {len(self)} partes en que se dividieron los comentarios a la pregunta "
+            f"\"{self.pregunta}\". Únelos en un único análisis: {INSTRUCCIONES_ANALISIS}\n\n"
+            "[Pega aquí las respuestas obtenidas para cada parte]"
+        )
+
+    def texto_completo(self):
+        """
+        Todos los prompts del plan en un único texto, para descargarlo.
+        """
+        bloques = [
+            f"===== Fragmento {i + 1} de {len(self)} =====\n\n{prompt}"
+            for i, prompt in enumerate(self.iterar_prompts())
+        ]
+        if len(self) > 1:
+            bloques.append(f"===== Unir los resultados =====\n\n{self.prompt_consolidacion()}")
+        return "\n\n".join(bloques)
+
+def _asignar_presupuesto(tokens_estrato, respuestas_estrato, capacidad):
+    """
+    Reparte 'capacidad' tokens entre estratos en proporción a sus respuestas,
+    sin dar a ningún estrato más de lo que necesita y redistribuyendo el sobrante.
+    """
+    asignado = np.zeros(len(tokens_estrato), dtype=np.float64)
+    pendientes = np.ones(len(tokens_estrato), dtype=bool)
+    restante = float(capacidad)
+    while restante > 0 and pendientes.any():
+        pesos = np.where(pendientes, respuestas_estrato, 0).astype(np.float64)
+        cuota = restante * pesos / pesos.sum()
+        necesita = tokens_estrato - asignado
+        completos = pendientes & (cuota >= necesita)
+        if not completos.any():
+            asignado += np.where(pendientes, cuota, 0)
+            break
+        asignado[completos] = tokens_estrato[completos]
+        restante -= necesita[completos].sum()
+        pendientes &= ~completos
+    return asignado
+
+def planificar_prompts(df, pregunta, referencia=None, presupuesto_tokens=PRESUPUESTO_TOKENS_POR_DEFECTO,
+                       maximo_fragmentos=MAXIMO_FRAGMENTOS_POR_DEFECTO, semilla=0, agrupar_duplicados=True):
+    """
+    Reparte los comentarios de 'pregunta' en fragmentos de como mucho
+    'presupuesto_tokens' tokens estimados cada uno (instrucciones incluidas).
+    Los comentarios idénticos o casi idénticos (si 'agrupar_duplicados') de
+    un mismo grupo se agrupan en una línea con su número de repeticiones. Si no caben en 'maximo_fragmentos' (None para
+    no limitar), se toma una muestra estratificada por 'referencia'.
+    """
+    textos = df[pregunta].dropna().astype(str).str.strip()
+    textos = textos[textos != ""]
+    # Sin comentarios no hay nada que agrupar: el plan queda vacío
+    if agrupar_duplicados and not textos.empty:
+        representantes = obtener_duplicados(df[pregunta]).texto_representativo(df[pregunta])
+        textos = representantes.loc[textos.index].astype(str).str.strip()
+    if referencia is not None:
+        estratos = df.loc[textos.index, referencia].astype(object).where(lambda s: s.notna(), "Sin dato").astype(str)
+    else:
+        estratos = pd.Series("", index=textos.index)
+
+    plan = PlanPrompts(pregunta, referencia, [], [], len(textos), 0, 0)
+    disponible = presupuesto_tokens - estimar_tokens(plan._cabecera(0) + INSTRUCCIONES_ANALISIS) - 60
+    if disponible < MINIMO_TOKENS_COMENTARIOS:
+        raise ValueError(
+            f"El presupuesto de {presupuesto_tokens} tokens no deja sitio para los comentarios; "
+            f"usa al menos {presupuesto_tokens - disponible + MINIMO_TOKENS_COMENTARIOS}."
+        )
+    if textos.empty:
+        return plan
+
+    # Comentarios distintos por estrato, en orden aleatorio dentro de cada uno
+    repeticiones = pd.DataFrame({"estrato": estratos.to_numpy(), "texto": textos.to_numpy()}).value_counts(sort=False)
+    unicos = repeticiones.reset_index(name="repeticiones")
+    rng = np.random.default_rng(semilla)
+    unicos = unicos.iloc[rng.permutation(len(unicos))].sort_values("estrato", kind="stable").reset_index(drop=True)
+
+    # Un comentario no puede ocupar más que un fragmento entero
+    maximo_caracteres = int((disponible - 8) * CARACTERES_POR_TOKEN)
+    textos_linea = unicos["texto"].where(
+        unicos["texto"].str.len() <= maximo_caracteres,
+        unicos["texto"].str.slice(0, maximo_caracteres) + "…"
+    )
+    etiqueta = "- [" + unicos["estrato"] + "] " if referencia is not None else "- "
+    lineas = etiqueta + textos_linea + np.where(unicos["repeticiones"] > 1, " (×" + unicos["repeticiones"].astype(str) + ")", "")
+    tokens = _estimar_tokens_lineas(lineas)
+
+    # Muestra estratificada si no caben en el máximo de fragmentos
+    seleccion = np.ones(len(unicos), dtype=bool)
+    if maximo_fragmentos is not None and tokens.sum() > disponible * maximo_fragmentos:
+        codigos, _ = pd.factorize(unicos["estrato"], sort=True)
+        tokens_estrato = np.bincount(codigos, weights=tokens)
+        respuestas_estrato = np.bincount(codigos, weights=unicos["repeticiones"].to_numpy())
+        # El empaquetado deja huecos al final de cada fragmento: se reserva un margen
+        asignado = _asignar_presupuesto(tokens_estrato, respuestas_estrato, disponible * maximo_fragmentos * 0.95)
+        acumulado = pd.Series(tokens).groupby(codigos).cumsum().to_numpy()
+        seleccion = acumulado <= asignado[codigos]
+
+    # Intercalar los estratos para que cada fragmento tenga comentarios de todos
+    seleccionados = unicos[seleccion]
+    rango = seleccionados.groupby("estrato", sort=False).cumcount().to_numpy()
+    tamano = seleccionados.groupby("estrato", sort=False)["texto"].transform("size").to_numpy()
+    orden = np.lexsort((seleccionados["estrato"].to_numpy(), (rango + 0.5) / tamano))
+    lineas_plan = lineas[seleccion].to_numpy()[orden].tolist()
+    tokens_plan = tokens[seleccion][orden]
+
+    # Empaquetar las líneas en fragmentos sin superar el presupuesto
+    limites = []
+    inicio, ocupado = 0, 0
+    for i, tokens_linea in enumerate(tokens_plan):
+        if ocupado + tokens_linea > disponible and i > inicio:
+            limites.append((inicio, i))
+            inicio, ocupado = i, 0
+        ocupado += tokens_linea
+    limites.append((inicio, len(lineas_plan)))
+    if maximo_fragmentos is not None and len(limites) > maximo_fragmentos:
+        limites = limites[:maximo_fragmentos]
+        lineas_plan = lineas_plan[:limites[-1][1]]
+
+    plan.lineas = lineas_plan
+    plan.limites = limites
+    plan.comentarios_incluidos = int(seleccionados["repeticiones"].to_numpy()[orden][:len(lineas_plan)].sum())
+    plan.tokens = int(tokens_plan[:len(lineas_plan)].sum())
+    return plan
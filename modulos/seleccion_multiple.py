@@ -0,0 +1,129 @@
+# /modulos/seleccion_multiple.py
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from modulos.cache_resultados import huella_columna
+from modulos.instrumentacion import instrumentacion
+
+# Preguntas de selección múltiple. Cada respuesta es la lista de opciones
+# elegidas separadas por ';' (formato de los formularios exportados), así que
+# cada combinación distinta aparece como una respuesta distinta. Aquí cada
+# columna se descompone una sola vez en una matriz dispersa de indicadores
+# (respuestas x opciones): las frecuencias de cada opción, la co-ocurrencia
+# entre opciones y las tablas por columna de referencia son productos de
+# matrices dispersas. Las matrices se guardan por contenido de la columna.
+#
+# Este módulo no importa streamlit.
+
+SEPARADOR_OPCIONES = ";"
+# Columnas de selección múltiple que se mantienen en memoria
+MAXIMO_COLUMNAS_EN_CACHE = 32
+
+_cache_indicadores = OrderedDict()
+_bloqueo_cache = threading.Lock()
+
+def separar_opciones(respuesta):
+    """
+    Devuelve las opciones distintas de una respuesta, en el orden en que aparecen.
+    """
+    opciones = (opcion.strip() for opcion in str(respuesta).split(SEPARADOR_OPCIONES))
+    return list(dict.fromkeys(opcion for opcion in opciones if opcion))
+
+class IndicadoresSeleccion:
+    """
+    Matriz dispersa de indicadores de una columna de selección múltiple:
+    una fila por fila de la columna original y una columna por opción, con 1
+    si la respuesta incluye la opción. Las filas sin respuesta quedan vacías.
+    """
+
+    def __init__(self, columna, opciones, matriz):
+        self.columna = columna
+        self.opciones = opciones
+        self.matriz = matriz
+
+    def respuestas(self):
+        """
+        Número de filas que han elegido al menos una opción.
+        """
+        return int((self.matriz.getnnz(axis=1) > 0).sum())
+
+    def frecuencias(self):
+        """
+        Número de respuestas que incluyen cada opción, de mayor a menor.
+        """
+        conteos = np.asarray(self.matriz.sum(axis=0)).ravel()
+        orden = np.argsort(-conteos, kind="stable")
+        orden = orden[conteos[orden] > 0]
+        return pd.Series(conteos[orden], index=[self.opciones[i] for i in orden], name=self.columna)
+
+    def coocurrencia(self):
+        """
+        Tabla opciones x opciones con el número de respuestas que eligen ambas;
+        la diagonal es la frecuencia de cada opción.
+        """
+        conteos = (self.matriz.T @ self.matriz).toarray()
+        return pd.DataFrame(conteos, index=self.opciones, columns=self.opciones)
+
+    def tabla_cruzada(self, codigos_grupo, n_grupos):
+        """
+        Matriz grupos x opciones con las veces que se elige cada opción en cada
+        grupo. 'codigos_grupo' asigna a cada fila un código entre 0 y
+        n_grupos - 1 (o -1 para no contarla). Es un único producto disperso.
+        """
+        codigos_grupo = np.asarray(codigos_grupo)
+        validos = codigos_grupo >= 0
+        indicadora = sparse.csr_matrix(
+            (np.ones(validos.sum(), dtype=np.int32), (codigos_grupo[validos], np.flatnonzero(validos))),
+            shape=(n_grupos, self.matriz.shape[0])
+        )
+        return (indicadora @ self.matriz).toarray()
+
+def construir_indicadores(serie):
+    """
+    Descompone una columna de selección múltiple en su matriz de indicadores.
+    Cada combinación distinta se separa en opciones una sola vez y las filas
+    se obtienen con un producto por la matriz de respuestas x combinaciones.
+    """
+    with instrumentacion.medir("indicadores_seleccion_multiple", pregunta=serie.name, filas=len(serie)):
+        codigos, combinaciones = pd.factorize(serie)
+        indices_opciones = {}
+        filas_combinacion, columnas_opcion = [], []
+        for i, combinacion in enumerate(np.asarray(combinaciones, dtype=object)):
+            for opcion in separar_opciones(combinacion):
+                filas_combinacion.append(i)
+                columnas_opcion.append(indices_opciones.setdefault(opcion, len(indices_opciones)))
+        opciones_por_combinacion = sparse.csr_matrix(
+            (np.ones(len(filas_combinacion), dtype=np.int32), (filas_combinacion, columnas_opcion)),
+            shape=(len(combinaciones), len(indices_opciones))
+        )
+
+        validas = np.flatnonzero(codigos >= 0)
+        combinacion_por_fila = sparse.csr_matrix(
+            (np.ones(len(validas), dtype=np.int32), (validas, codigos[validas])),
+            shape=(len(serie), len(combinaciones))
+        )
+        matriz = (combinacion_por_fila @ opciones_por_combinacion).tocsr()
+
+    return IndicadoresSeleccion(columna=serie.name, opciones=list(indices_opciones), matriz=matriz)
+
+def obtener_indicadores(serie):
+    """
+    Devuelve la matriz de indicadores de una columna, reutilizando la ya
+    calculada si la misma columna (mismo contenido y nombre) se procesó antes.
+    """
+    clave = huella_columna(serie)
+    with _bloqueo_cache:
+        if clave in _cache_indicadores:
+            _cache_indicadores.move_to_end(clave)
+            return _cache_indicadores[clave]
+
+    indicadores = construir_indicadores(serie)
+
+    with _bloqueo_cache:
+        _cache_indicadores[clave] = indicadores
+        while len(_cache_indicadores) > MAXIMO_COLUMNAS_EN_CACHE:
+            _cache_indicadores.popitem(last=False)
+    return indicadores
@@ -0,0 +1,145 @@
+# /modulos/sentimiento.py
+
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from modulos.procesamiento_texto import normalizar
+from modulos.instrumentacion import instrumentacion
+
+# Sentimiento de los comentarios con un léxico de polaridad incluido en el
+# repositorio (recursos/lexico/polaridad_es.tsv), sin red ni modelos. Cada
+# palabra del léxico aporta su polaridad (entre -1 y 1); la aportación se
+# invierte si hay un negador ("no", "sin", "nunca", "poco"...) en las
+# VENTANA_NEGACION palabras anteriores de la misma respuesta (sin un "pero"
+# o "aunque" entre medias) y se refuerza si la palabra anterior es un
+# intensificador ("muy", "bastante"...).
+#
+# Todo se calcula sobre los tokens ya guardados: los factores de negación e
+# intensificación se obtienen con operaciones vectoriales sobre la secuencia
+# de palabras, y la puntuación de todas las respuestas es un único producto
+# de la matriz dispersa respuestas x vocabulario (con esos factores) por el
+# vector de polaridades del vocabulario.
+#
+# Este módulo no importa streamlit.
+
+RUTA_LEXICO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "recursos", "lexico", "polaridad_es.tsv"
+)
+
+NEGADORES = frozenset(normalizar(palabra) for palabra in (
+    "no", "nunca", "jamás", "tampoco", "ni", "sin", "nada", "nadie", "ningún", "ninguna", "ninguno",
+    "apenas", "poco", "poca", "pocos", "pocas"
+))
+INTENSIFICADORES = frozenset(normalizar(palabra) for palabra in (
+    "muy", "mucho", "mucha", "muchos", "muchas", "muchísimo", "muchísima", "bastante", "bastantes",
+    "demasiado", "demasiada", "tan", "tanto", "tanta", "súper", "super", "realmente", "totalmente",
+    "sumamente", "extremadamente", "especialmente", "increíblemente", "absolutamente", "claramente"
+))
+# Conjunciones que cierran el alcance de una negación ("no es malo, pero...")
+FIN_NEGACION = frozenset(normalizar(palabra) for palabra in ("pero", "aunque", "sino", "embargo"))
+VENTANA_NEGACION = 3
+FACTOR_INTENSIFICACION = 1.5
+# La suma de polaridades s se lleva a (-1, 1) con s / sqrt(s^2 + ALFA_NORMALIZACION)
+ALFA_NORMALIZACION = 1.0
+# Puntuaciones a partir de las cuales un comentario es positivo o negativo
+UMBRAL_POLARIDAD = 0.05
+
+CATEGORIAS_SENTIMIENTO = ["Positivo", "Neutro", "Negativo"]
+
+@lru_cache(maxsize=1)
+def lexico_polaridad():
+    """
+    Diccionario forma normalizada -> polaridad. Se lee una única vez por proceso.
+    """
+    lexico = {}
+    with open(RUTA_LEXICO, "r", encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            forma, polaridad = linea.split("\t")
+            lexico[normalizar(forma)] = float(polaridad)
+    return lexico
+
+def _vectores_vocabulario(vocabulario):
+    """
+    Polaridad, negadores, fines de negación e intensificadores sobre el
+    vocabulario de una columna.
+    """
+    lexico = lexico_polaridad()
+    polaridad = np.fromiter((lexico.get(termino, 0.0) for termino in vocabulario), dtype=np.float64, count=len(vocabulario))
+    mascaras = [
+        np.fromiter((termino in conjunto for termino in vocabulario), dtype=bool, count=len(vocabulario))
+        for conjunto in (NEGADORES, FIN_NEGACION, INTENSIFICADORES)
+    ]
+    return (polaridad, *mascaras)
+
+def puntuar_comentarios(tokens):
+    """
+    Puntuación de sentimiento (entre -1 y 1) de cada respuesta de una
+    columna tokenizada, en el orden de tokens.filas.
+    """
+    with instrumentacion.medir("sentimiento", pregunta=tokens.columna, respuestas=len(tokens)):
+        polaridad, negadores, fines_negacion, intensificadores = _vectores_vocabulario(tokens.vocabulario)
+        ids = tokens.ids
+        longitudes = np.diff(tokens.desplazamientos)
+        posicion = np.arange(len(ids))
+        inicio_respuesta = np.repeat(tokens.desplazamientos[:-1], longitudes)
+
+        # Último negador y último fin de negación hasta cada palabra: niega si el
+        # negador está en la misma respuesta, a VENTANA_NEGACION palabras o menos
+        # y después de cualquier "pero"
+        ultimo_negador = np.maximum.accumulate(np.where(negadores[ids], posicion, -1)) if len(ids) else posicion
+        ultimo_fin = np.maximum.accumulate(np.where(fines_negacion[ids], posicion, -1)) if len(ids) else posicion
+        negada = (
+            (ultimo_negador >= inicio_respuesta) & (ultimo_negador > ultimo_fin)
+            & (posicion > ultimo_negador) & (posicion - ultimo_negador <= VENTANA_NEGACION)
+        )
+        intensificada = np.concatenate(([False], intensificadores[ids][:-1])) & (posicion > inicio_respuesta)
+        factores = np.where(negada, -1.0, 1.0) * np.where(intensificada, FACTOR_INTENSIFICACION, 1.0)
+
+        matriz = sparse.csr_matrix(
+            (factores, ids.copy(), tokens.desplazamientos.copy()),
+            shape=(len(tokens), len(tokens.vocabulario))
+        )
+        suma = matriz @ polaridad
+    return suma / np.sqrt(suma ** 2 + ALFA_NORMALIZACION)
+
+def clasificar(puntuaciones):
+    """
+    Código de categoría de cada puntuación: 0 positivo, 1 neutro, 2 negativo.
+    """
+    return np.where(puntuaciones >= UMBRAL_POLARIDAD, 0, np.where(puntuaciones <= -UMBRAL_POLARIDAD, 2, 1))
+
+def distribucion_sentimiento(puntuaciones):
+    """
+    Número y porcentaje de comentarios de cada categoría.
+    """
+    conteos = np.bincount(clasificar(puntuaciones), minlength=len(CATEGORIAS_SENTIMIENTO))
+    return pd.DataFrame({
+        "Sentimiento": CATEGORIAS_SENTIMIENTO,
+        "Comentarios": conteos,
+        "Porcentaje (%)": (conteos / max(conteos.sum(), 1) * 100).round(2)
+    })
+
+def sentimiento_por_grupo(puntuaciones, codigos_grupo, valores):
+    """
+    Por cada valor de una columna de referencia: comentarios, porcentaje de
+    cada categoría y puntuación media. 'codigos_grupo' asigna a cada
+    puntuación un código sobre 'valores' (o -1 para no contarla).
+    """
+    codigos_grupo = np.asarray(codigos_grupo)
+    validos = codigos_grupo >= 0
+    codigos = codigos_grupo[validos]
+    categorias = clasificar(puntuaciones[validos])
+    conteos = np.zeros((len(valores), len(CATEGORIAS_SENTIMIENTO)), dtype=np.int64)
+    np.add.at(conteos, (codigos, categorias), 1)
+    totales = conteos.sum(axis=1)
+    tabla = pd.DataFrame({"Comentarios": totales}, index=pd.Index(valores, name=None))
+    for i, categoria in enumerate(CATEGORIAS_SENTIMIENTO):
+        tabla[f"{categoria} (%)"] = (conteos[:, i] / np.maximum(totales, 1) * 100).round(2)
+    sumas = np.bincount(codigos, weights=puntuaciones[validos], minlength=len(valores))
+    tabla["Puntuación media"] = (sumas / np.maximum(totales, 1)).round(3)
+    return tabla[tabla["Comentarios"] > 0]
@@ -0,0 +1,250 @@
+# /modulos/significacion.py
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from modulos.tablas_cruzadas import obtener_cubo
+from modulos.esquema_datos import es_pregunta_de_seleccion_multiple
+from modulos.seleccion_multiple import obtener_indicadores
+
+# Matriz de significación del módulo comparador: contrasta de una vez todas
+# las combinaciones columna de referencia x pregunta.
+#
+# Todas las pruebas se calculan a partir de tablas de frecuencias apiladas
+# (preguntas x valores de referencia x respuestas) que se obtienen con un único
+# np.bincount por columna de referencia sobre los códigos enteros del cubo de
+# tablas cruzadas:
+#   - preguntas categóricas: chi-cuadrado de independencia y V de Cramér;
+#   - preguntas de selección múltiple: cada opción por separado (elegida o no
+#     entre quienes respondieron), con las tablas de la matriz de indicadores,
+#     en lugar de tratar cada combinación de opciones como una respuesta;
+#   - preguntas numéricas: Kruskal-Wallis (rangos medios a partir de las
+#     frecuencias de cada valor, con corrección por empates) o ANOVA de un factor.
+# Los p-valores de todas las pruebas se corrigen juntos por Benjamini-Hochberg.
+#
+# Este módulo no importa streamlit.
+
+PRUEBA_CHI_CUADRADO = "Chi-cuadrado"
+PRUEBA_KRUSKAL_WALLIS = "Kruskal-Wallis"
+PRUEBA_ANOVA = "ANOVA"
+
+# Medida del tamaño del efecto que acompaña a cada prueba
+TAMANO_EFECTO = {
+    PRUEBA_CHI_CUADRADO: "V de Cramér",
+    PRUEBA_KRUSKAL_WALLIS: "Épsilon cuadrado",
+    PRUEBA_ANOVA: "Eta cuadrado"
+}
+
+ALFA_POR_DEFECTO = 0.05
+
+def _codigos_numericos(cubo, pregunta):
+    """
+    Códigos de una pregunta numérica ordenados por valor, y los valores
+    correspondientes como float. Las respuestas no numéricas pasan a -1.
+    """
+    codigos, valores = cubo.codigos(pregunta)
+    numericos = pd.to_numeric(pd.Series(valores, dtype=object), errors='coerce').to_numpy(dtype="float64")
+    orden = np.argsort(numericos, kind="stable")  # los NaN quedan al final
+    rango = np.empty(len(orden), dtype=np.int64)
+    rango[orden] = np.arange(len(orden))
+    validos = ~np.isnan(numericos)
+    nuevos = np.where(codigos >= 0, rango[np.maximum(codigos, 0)], -1)
+    nuevos[(codigos >= 0) & ~validos[np.maximum(codigos, 0)]] = -1
+    return nuevos, numericos[orden]
+
+def _tablas_apiladas(codigos_ref, n_ref, codigos_preguntas, n_respuestas):
+    """
+    Cuenta en un solo bincount las tablas referencia x respuesta de todas las
+    preguntas. Devuelve un array (preguntas, n_ref, n_respuestas) rellenado
+    con ceros hasta el mayor número de respuestas distintas.
+    """
+    n_preguntas = len(codigos_preguntas)
+    tamano_tabla = n_ref * n_respuestas
+    centinela = n_preguntas * tamano_tabla
+    indices = np.empty((n_preguntas, len(codigos_ref)), dtype=np.int64)
+    base_ref = codigos_ref * n_respuestas
+    for k, codigos in enumerate(codigos_preguntas):
+        np.add(base_ref + k * tamano_tabla, codigos, out=indices[k])
+        indices[k, (codigos < 0) | (codigos_ref < 0)] = centinela
+    conteos = np.bincount(indices.ravel(), minlength=centinela + 1)[:-1]
+    return conteos.reshape(n_preguntas, n_ref, n_respuestas).astype("float64")
+
+def _chi_cuadrado(tablas):
+    """
+    Chi-cuadrado de independencia y V de Cramér de cada tabla apilada.
+    """
+    por_fila = tablas.sum(axis=2)
+    por_columna = tablas.sum(axis=1)
+    total = por_fila.sum(axis=1)
+    filas_presentes = (por_fila > 0).sum(axis=1)
+    columnas_presentes = (por_columna > 0).sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        esperadas = por_fila[:, :, None] * por_columna[:, None, :] / total[:, None, None]
+        estadistico = np.where(esperadas > 0, (tablas - esperadas) ** 2 / esperadas, 0.0).sum(axis=(1, 2))
+        grados = (filas_presentes - 1) * (columnas_presentes - 1)
+        p = np.where(grados > 0, stats.chi2.sf(estadistico, np.maximum(grados, 1)), np.nan)
+        minimo = np.minimum(filas_presentes, columnas_presentes) - 1
+        efecto = np.where(grados > 0, np.sqrt(estadistico / (total * np.maximum(minimo, 1))), np.nan)
+    return estadistico, grados, p, efecto, total
+
+def _kruskal_wallis(tablas):
+    """
+    Kruskal-Wallis de cada tabla apilada (respuestas ordenadas por valor).
+    Cada valor recibe el rango medio de sus empates, de modo que la suma de
+    rangos de cada grupo es un producto de la tabla por el vector de rangos.
+    """
+    por_fila = tablas.sum(axis=2)
+    por_valor = tablas.sum(axis=1)
+    total = por_fila.sum(axis=1)
+    grupos = (por_fila > 0).sum(axis=1)
+
+    rango_medio = np.cumsum(por_valor, axis=1) - (por_valor - 1) / 2
+    suma_rangos = np.einsum("qrk,qk->qr", tablas, rango_medio)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        termino = np.where(por_fila > 0, suma_rangos ** 2 / por_fila, 0.0).sum(axis=1)
+        estadistico = 12 / (total * (total + 1)) * termino - 3 * (total + 1)
+        empates = 1 - (por_valor ** 3 - por_valor).sum(axis=1) / (total ** 3 - total)
+        estadistico = np.where(empates > 0, estadistico / empates, np.nan)
+        grados = grupos - 1
+        validos = (grados > 0) & ~np.isnan(estadistico)
+        p = np.where(validos, stats.chi2.sf(estadistico, np.maximum(grados, 1)), np.nan)
+        efecto = np.where(validos, estadistico / (total - 1), np.nan)
+    return estadistico, grados, p, efecto, total
+
+def _anova(tablas, valores):
+    """
+    ANOVA de un factor de cada tabla apilada, con las sumas por grupo
+    obtenidas como productos de la tabla por los valores de las respuestas.
+    """
+    por_fila = tablas.sum(axis=2)
+    total = por_fila.sum(axis=1)
+    grupos = (por_fila > 0).sum(axis=1)
+
+    suma = np.einsum("qrk,qk->qr", tablas, valores)
+    suma_cuadrados = np.einsum("qrk,qk->q", tablas, valores ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_global = suma.sum(axis=1) / total
+        entre = np.where(por_fila > 0, suma ** 2 / por_fila, 0.0).sum(axis=1) - total * media_global ** 2
+        total_cuadrados = suma_cuadrados - total * media_global ** 2
+        dentro = total_cuadrados - entre
+        gl_entre = grupos - 1
+        gl_dentro = total - grupos
+        estadistico = (entre / gl_entre) / (dentro / gl_dentro)
+        validos = (gl_entre > 0) & (gl_dentro > 0) & np.isfinite(estadistico)
+        p = np.where(validos, stats.f.sf(estadistico, np.maximum(gl_entre, 1), np.maximum(gl_dentro, 1)), np.nan)
+        efecto = np.where(validos, entre / total_cuadrados, np.nan)
+    return estadistico, gl_entre, p, efecto, total
+
+def _tablas_opciones(indicadores, codigos_ref, n_ref):
+    """
+    Tablas referencia x (elegida, no elegida) de cada opción de una pregunta
+    de selección múltiple, entre las filas que eligieron al menos una opción.
+    Devuelve un array (opciones, n_ref, 2).
+    """
+    respondidas = indicadores.matriz.getnnz(axis=1) > 0
+    codigos_respondidas = np.where(respondidas, codigos_ref, -1)
+    elegidas = indicadores.tabla_cruzada(codigos_respondidas, n_ref).T.astype("float64")
+    por_grupo = np.bincount(codigos_respondidas[codigos_respondidas >= 0], minlength=n_ref)
+    return np.stack([elegidas, por_grupo[None, :] - elegidas], axis=2)
+
+def corregir_benjamini_hochberg(p_valores):
+    """
+    P-valores ajustados por Benjamini-Hochberg; los NaN se conservan.
+    """
+    p_valores = np.asarray(p_valores, dtype="float64")
+    ajustados = np.full_like(p_valores, np.nan)
+    validos = ~np.isnan(p_valores)
+    if validos.any():
+        ajustados[validos] = stats.false_discovery_control(p_valores[validos], method="bh")
+    return ajustados
+
+def calcular_matriz_significacion(df, referencias, preguntas_categoricas, preguntas_numericas,
+                                  prueba_numerica=PRUEBA_KRUSKAL_WALLIS):
+    """
+    Contrasta cada columna de referencia con cada pregunta y devuelve una tabla
+    con una fila por combinación, ordenada por p-valor ajustado y tamaño del efecto.
+    Las preguntas categóricas usan chi-cuadrado y las numéricas Kruskal-Wallis
+    o ANOVA según 'prueba_numerica'. Las de selección múltiple (entre las
+    categóricas) se contrastan opción a opción.
+    """
+    cubo = obtener_cubo(df)
+    preguntas_multiples = [p for p in preguntas_categoricas if es_pregunta_de_seleccion_multiple(p)]
+    preguntas_categoricas = [p for p in preguntas_categoricas if not es_pregunta_de_seleccion_multiple(p)]
+    preguntas_numericas = list(preguntas_numericas)
+
+    codigos_categoricas = [cubo.codigos(p) for p in preguntas_categoricas]
+    indicadores_multiples = [obtener_indicadores(cubo.df[p]) for p in preguntas_multiples]
+    # Cada opción es una fila del resultado: "pregunta [opción]"
+    opciones_multiples = [
+        f"{indicadores.columna} [{opcion}]"
+        for indicadores in indicadores_multiples for opcion in indicadores.opciones
+    ]
+    codigos_numericas = [_codigos_numericos(cubo, p) for p in preguntas_numericas]
+
+    bloques = []
+    for referencia in referencias:
+        codigos_ref, valores_ref = cubo.codigos(referencia)
+        n_ref = len(valores_ref)
+
+        if preguntas_categoricas:
+            n_respuestas = max(len(valores) for _, valores in codigos_categoricas)
+            tablas = _tablas_apiladas(codigos_ref, n_ref, [c for c, _ in codigos_categoricas], n_respuestas)
+            bloques.append((referencia, preguntas_categoricas, PRUEBA_CHI_CUADRADO, _chi_cuadrado(tablas)))
+
+        if opciones_multiples:
+            tablas = np.concatenate([
+                _tablas_opciones(indicadores, codigos_ref, n_ref) for indicadores in indicadores_multiples
+            ])
+            bloques.append((referencia, opciones_multiples, PRUEBA_CHI_CUADRADO, _chi_cuadrado(tablas)))
+
+        if preguntas_numericas:
+            n_respuestas = max(len(valores) for _, valores in codigos_numericas)
+            tablas = _tablas_apiladas(codigos_ref, n_ref, [c for c, _ in codigos_numericas], n_respuestas)
+            if prueba_numerica == PRUEBA_ANOVA:
+                valores = np.zeros((len(codigos_numericas), n_respuestas))
+                for k, (_, valores_pregunta) in enumerate(codigos_numericas):
+                    valores[k, :len(valores_pregunta)] = np.nan_to_num(valores_pregunta)
+                resultado = _anova(tablas, valores)
+            else:
+                resultado = _kruskal_wallis(tablas)
+            bloques.append((referencia, preguntas_numericas, prueba_numerica, resultado))
+
+    if not bloques:
+        return pd.DataFrame(columns=[
+            "Referencia", "Pregunta", "Prueba", "Estadístico", "Grados de libertad",
+            "N", "p", "p ajustado (BH)", "Tamaño del efecto", "Medida del efecto"
+        ])
+
+    partes = []
+    for referencia, preguntas, prueba, (estadistico, grados, p, efecto, total) in bloques:
+        partes.append(pd.DataFrame({
+            "Referencia": referencia,
+            "Pregunta": preguntas,
+            "Prueba": prueba,
+            "Estadístico": estadistico,
+            "Grados de libertad": grados,
+            "N": total.astype(np.int64),
+            "p": p,
+            "Tamaño del efecto": efecto,
+            "Medida del efecto": TAMANO_EFECTO[prueba]
+        }))
+    resultado = pd.concat(partes, ignore_index=True)
+    resultado.insert(7, "p ajustado (BH)", corregir_benjamini_hochberg(resultado["p"]))
+    resultado = resultado.sort_values(
+        ["p ajustado (BH)", "Tamaño del efecto"], ascending=[True, False], na_position="last"
+    ).reset_index(drop=True)
+    resultado.attrs["referencias"] = list(referencias)
+    return resultado
+
+def matriz_para_mapa_calor(resultado, alfa=ALFA_POR_DEFECTO):
+    """
+    Reorganiza el resultado en una matriz pregunta x referencia con el tamaño
+    del efecto, con las preguntas ordenadas de mayor a menor efecto máximo,
+    y una matriz booleana con las combinaciones significativas tras la corrección.
+    """
+    efecto = resultado.pivot(index="Pregunta", columns="Referencia", values="Tamaño del efecto")
+    significativo = resultado.pivot(index="Pregunta", columns="Referencia", values="p ajustado (BH)") < alfa
+    orden = efecto.max(axis=1).sort_values(ascending=False, na_position="last").index
+    referencias = resultado.attrs.get("referencias") or list(dict.fromkeys(resultado["Referencia"]))
+    return efecto.loc[orden, referencias], significativo.loc[orden, referencias]
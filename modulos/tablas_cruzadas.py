@@ -0,0 +1,137 @@
+# /modulos/tablas_cruzadas.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from modulos.almacen_datos import hash_almacenado, hash_vista
+from modulos.esquema_datos import es_pregunta_de_seleccion_multiple
+from modulos.seleccion_multiple import obtener_indicadores
+
+# Cubo de tablas cruzadas (columna de referencia x pregunta) del módulo
+# comparador. Cada columna se codifica una sola vez como enteros 0..k-1 y
+# cada tabla es un único np.bincount sobre los códigos combinados; las tablas
+# se guardan por dataset, de modo que cambiar las selecciones o volver a
+# ejecutar el script solo consulta tablas ya calculadas. En las preguntas de
+# selección múltiple las columnas de la tabla son las opciones (no cada
+# combinación de opciones) y la tabla es un producto de matrices dispersas.
+#
+# Este módulo no importa streamlit.
+
+# Datasets cuyo cubo se mantiene en memoria
+MAXIMO_CUBOS_EN_CACHE = 4
+
+_cache_cubos = OrderedDict()
+_bloqueo_cache = threading.Lock()
+
+def _codificar(serie):
+    """
+    Devuelve los códigos enteros de una columna (-1 para los nulos) y sus
+    valores distintos, en el mismo orden en que groupby ordena las claves.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(dtype=np.int64), pd.Index(serie.cat.categories)
+    codigos, valores = pd.factorize(serie, sort=True)
+    return codigos.astype(np.int64), pd.Index(valores)
+
+class CuboTablasCruzadas:
+    """
+    Tablas de frecuencias de un DataFrame para cualquier par de columnas.
+    Los códigos de cada columna y las tablas de cada par se calculan la
+    primera vez que se piden y se reutilizan después.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._codigos = {}
+        self._tablas = {}
+        self._bloqueo = threading.Lock()
+
+    def codigos(self, columna):
+        """
+        Códigos enteros y valores distintos de una columna (memoizados).
+        """
+        if columna not in self._codigos:
+            self._codigos[columna] = _codificar(self.df[columna])
+        return self._codigos[columna]
+
+    def _calcular_tabla(self, referencia, pregunta):
+        codigos_ref, valores_ref = self.codigos(referencia)
+        if es_pregunta_de_seleccion_multiple(pregunta):
+            indicadores = obtener_indicadores(self.df[pregunta])
+            conteos = indicadores.tabla_cruzada(codigos_ref, len(valores_ref))
+            valores_preg = pd.Index(indicadores.opciones)
+        else:
+            codigos_preg, valores_preg = self.codigos(pregunta)
+            validos = (codigos_ref >= 0) & (codigos_preg >= 0)
+            n_ref, n_preg = len(valores_ref), len(valores_preg)
+            conteos = np.bincount(
+                codigos_ref[validos] * n_preg + codigos_preg[validos],
+                minlength=n_ref * n_preg
+            ).reshape(n_ref, n_preg)
+
+        # Como groupby(observed=True).size().unstack(): solo filas y columnas presentes
+        filas = conteos.sum(axis=1) > 0
+        columnas = conteos.sum(axis=0) > 0
+        return pd.DataFrame(
+            conteos[np.ix_(filas, columnas)],
+            index=valores_ref[filas].rename(referencia),
+            columns=valores_preg[columnas].rename(pregunta)
+        )
+
+    def tabla(self, referencia, pregunta):
+        """
+        Tabla de frecuencias con los valores de 'referencia' en las filas y
+        las respuestas de 'pregunta' en las columnas (las opciones, si es de
+        selección múltiple: cada respuesta cuenta en todas las que incluye).
+        """
+        clave = (referencia, pregunta)
+        with self._bloqueo:
+            if clave not in self._tablas:
+                self._tablas[clave] = self._calcular_tabla(referencia, pregunta)
+            return self._tablas[clave]
+
+    def precalcular(self, referencias, preguntas):
+        """
+        Calcula de una vez todas las tablas de las referencias y preguntas dadas.
+        """
+        for referencia in referencias:
+            for pregunta in preguntas:
+                self.tabla(referencia, pregunta)
+
+def huella_dataset(df):
+    """
+    Identificador del dataset: el hash con que se guardó en el almacén (o el
+    de su vista filtrada) o, si no lo tiene, un hash de su contenido.
+    """
+    hash_dataset = hash_almacenado(df) or hash_vista(df)
+    if hash_dataset is not None:
+        return hash_dataset
+    h = hashlib.blake2b(digest_size=16)
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def obtener_cubo(df):
+    """
+    Devuelve el cubo de tablas cruzadas del dataset, reutilizando el de
+    ejecuciones o sesiones anteriores si ya se creó para los mismos datos.
+    """
+    clave = huella_dataset(df)
+    with _bloqueo_cache:
+        if clave in _cache_cubos:
+            _cache_cubos.move_to_end(clave)
+            return _cache_cubos[clave]
+        cubo = CuboTablasCruzadas(df)
+        _cache_cubos[clave] = cubo
+        while len(_cache_cubos) > MAXIMO_CUBOS_EN_CACHE:
+            _cache_cubos.popitem(last=False)
+        return cubo
+
+def descartar_cubo(hash_dataset):
+    """
+    Elimina el cubo de un dataset que ha cambiado.
+    """
+    with _bloqueo_cache:
+        _cache_cubos.pop(hash_dataset, None)
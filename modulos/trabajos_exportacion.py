@@ -0,0 +1,167 @@
+# /modulos/trabajos_exportacion.py
+
+import os
+import time
+import atexit
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modulos.instrumentacion import instrumentacion
+
+# Exportaciones en segundo plano. Cada informe de Word (cuantitativo,
+# cualitativo o por unidades) se genera como un trabajo en un pool de hilos
+# del proceso de Streamlit, fuera de la ejecución del script: la página no
+# se bloquea mientras se monta el documento y volver a ejecutar el script
+# (al tocar cualquier widget) no descarta el trabajo. Los hilos comparten la
+# caché de resultados, así que las preguntas ya analizadas no se recalculan;
+# los gráficos y los informes por unidad siguen usando sus pools de procesos.
+#
+# La función de cada trabajo recibe un argumento 'progreso' al que informa
+# de los pasos completados (preguntas o unidades) sobre el total. Los
+# documentos terminados se guardan en memoria hasta que caducan o se
+# descartan; los límites pueden fijarse en el despliegue con las variables de
+# entorno MAXIMO_EXPORTACIONES_SIMULTANEAS y CADUCIDAD_EXPORTACIONES_S.
+#
+# Este módulo no importa streamlit.
+
+MAXIMO_EXPORTACIONES_SIMULTANEAS = int(os.environ.get("MAXIMO_EXPORTACIONES_SIMULTANEAS", "2"))
+CADUCIDAD_EXPORTACIONES_S = float(os.environ.get("CADUCIDAD_EXPORTACIONES_S", "1800"))
+# Trabajos que se conservan por sesión: al pasar de aquí se descartan los terminados más antiguos
+MAXIMO_TRABAJOS_POR_SESION = 10
+
+ESTADO_EN_COLA = "En cola"
+ESTADO_EN_CURSO = "En curso"
+ESTADO_TERMINADO = "Terminado"
+ESTADO_ERROR = "Error"
+
+class TrabajoExportacion:
+    """
+    Un informe que se genera en segundo plano: su avance y, al terminar, los
+    bytes del documento (o el error).
+    """
+
+    def __init__(self, identificador, sesion, descripcion, nombre_archivo):
+        self.identificador = identificador
+        self.sesion = sesion
+        self.descripcion = descripcion
+        self.nombre_archivo = nombre_archivo
+        self.estado = ESTADO_EN_COLA
+        self.completados = 0
+        self.total = 0
+        self.detalle = ""
+        self.datos = None
+        self.error = None
+        self.creado = time.monotonic()
+        self.terminado = None
+
+    @property
+    def activo(self):
+        return self.estado in (ESTADO_EN_COLA, ESTADO_EN_CURSO)
+
+    @property
+    def fraccion(self):
+        """
+        Fracción completada, entre 0 y 1.
+        """
+        if self.estado == ESTADO_TERMINADO:
+            return 1.0
+        return min(self.completados / self.total, 1.0) if self.total else 0.0
+
+    def progreso(self, completados, total, detalle=""):
+        """
+        Función de avance que reciben los exportadores.
+        """
+        self.completados = completados
+        self.total = total
+        self.detalle = detalle
+
+class ColaExportaciones:
+    """
+    Trabajos de exportación de todas las sesiones del proceso, ejecutados en
+    un pool de hilos, con los documentos terminados guardados hasta que caducan.
+    """
+
+    def __init__(self, maximo_simultaneas, caducidad):
+        self.maximo_simultaneas = maximo_simultaneas
+        self.caducidad = caducidad
+        self._pool = None
+        self._trabajos = {}  # identificador -> TrabajoExportacion
+        self._contador = itertools.count(1)
+        self._bloqueo = threading.Lock()
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.maximo_simultaneas, thread_name_prefix="exportacion")
+            atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+        return self._pool
+
+    def _expulsar(self, ahora):
+        # Documentos caducados y, en cada sesión, los terminados que sobran (de más antiguo a más reciente)
+        por_sesion = {}
+        for identificador, trabajo in list(self._trabajos.items()):
+            if trabajo.terminado is not None and ahora - trabajo.terminado > self.caducidad:
+                del self._trabajos[identificador]
+            else:
+                por_sesion.setdefault(trabajo.sesion, []).append(trabajo)
+        for trabajos in por_sesion.values():
+            terminados = [trabajo for trabajo in trabajos if not trabajo.activo]
+            for trabajo in terminados[:max(len(trabajos) - MAXIMO_TRABAJOS_POR_SESION, 0)]:
+                del self._trabajos[trabajo.identificador]
+
+    def encolar(self, sesion, descripcion, nombre_archivo, funcion, *args, **kwargs):
+        """
+        Añade un trabajo: funcion(*args, progreso=..., **kwargs) debe devolver
+        el documento (bytes o BytesIO). Devuelve el TrabajoExportacion.
+        """
+        with self._bloqueo:
+            self._expulsar(time.monotonic())
+            trabajo = TrabajoExportacion(next(self._contador), sesion, descripcion, nombre_archivo)
+            self._trabajos[trabajo.identificador] = trabajo
+            self._obtener_pool().submit(self._ejecutar, trabajo, funcion, args, kwargs)
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion, args, kwargs):
+        # Las mediciones del trabajo se asocian a la sesión que lo pidió
+        instrumentacion.fijar_contexto(sesion=trabajo.sesion)
+        trabajo.estado = ESTADO_EN_CURSO
+        try:
+            with instrumentacion.medir("exportacion_segundo_plano", informe=trabajo.descripcion):
+                datos = funcion(*args, progreso=trabajo.progreso, **kwargs)
+            trabajo.datos = datos.getvalue() if hasattr(datos, "getvalue") else bytes(datos)
+            trabajo.estado = ESTADO_TERMINADO
+        except Exception as e:
+            trabajo.error = str(e) or type(e).__name__
+            trabajo.estado = ESTADO_ERROR
+        finally:
+            trabajo.terminado = time.monotonic()
+
+    def trabajos(self, sesion):
+        """
+        Trabajos de una sesión, del más antiguo al más reciente.
+        """
+        with self._bloqueo:
+            self._expulsar(time.monotonic())
+            return [trabajo for trabajo in self._trabajos.values() if trabajo.sesion == sesion]
+
+    def descartar(self, identificador):
+        """
+        Elimina un trabajo terminado y su documento.
+        """
+        with self._bloqueo:
+            trabajo = self._trabajos.get(identificador)
+            if trabajo is not None and not trabajo.activo:
+                del self._trabajos[identificador]
+
+    def huella(self):
+        """
+        Trabajos en curso y memoria ocupada por los documentos guardados.
+        """
+        with self._bloqueo:
+            trabajos = list(self._trabajos.values())
+        return {
+            "trabajos": len(trabajos),
+            "activos": sum(trabajo.activo for trabajo in trabajos),
+            "memoria_mb": sum(len(trabajo.datos) for trabajo in trabajos if trabajo.datos) / 1024**2
+        }
+
+cola_exportaciones = ColaExportaciones(MAXIMO_EXPORTACIONES_SIMULTANEAS, CADUCIDAD_EXPORTACIONES_S)
@@ -0,0 +1,64 @@
+# /tests/test_almacen_datos.py
+
+import pandas as pd
+import pytest
+from modulos.almacen_datos import guardar_dataset, cargar_dataset, hash_almacenado, hash_vista
+from modulos.cache_resultados import huella_pregunta
+from modulos.esquema_datos import aplicar_esquema
+from modulos.filtros import aplicar_filtro, crear_filtro, origen_vista
+from modulos.procesamiento_texto import obtener_tokens_columna
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({
+        "Hospital": ["Insular", "Negrín", "Insular", "Negrín"],
+        "Comentarios": ["falta tiempo asistencial", "buena docencia", "poco tiempo", "docencia escasa"]
+    })
+    guardar_dataset("prueba_identidad", df)
+    return cargar_dataset("prueba_identidad")
+
+def test_solo_el_dataset_cargado_conserva_el_hash(dataset):
+    assert hash_almacenado(dataset) == "prueba_identidad"
+    assert hash_almacenado(aplicar_esquema(dataset)[0]) == "prueba_identidad"
+    # attrs se propaga a los DataFrames derivados, pero su contenido puede ser otro
+    cambiado = dataset.assign(Comentarios="texto cambiado")
+    assert cambiado.attrs["hash_dataset"] == "prueba_identidad"
+    assert hash_almacenado(cambiado) is None
+    assert hash_almacenado(dataset.copy()) is None
+    assert huella_pregunta(cambiado, "Comentarios") != huella_pregunta(dataset, "Comentarios")
+
+def test_solo_la_vista_filtrada_conserva_su_identificador(dataset):
+    vista = aplicar_filtro(dataset, crear_filtro({"Hospital": ["Insular"]}))
+    assert hash_vista(vista) is not None
+    assert origen_vista(vista["Comentarios"], huella_pregunta(vista, "Comentarios")) is not None
+    cambiada = vista.fillna("x").assign(Comentarios=["otro texto", "distinto"])
+    assert hash_vista(cambiada) is None
+    serie = cambiada["Comentarios"]
+    assert origen_vista(serie, huella_pregunta(cambiada, "Comentarios")) is None
+    tokens = obtener_tokens_columna(serie)
+    assert [tokens.tokens(i) for i in range(len(tokens))] == [["otro", "texto"], ["distinto"]]
+
+def test_las_vistas_compartidas_no_modifican_el_dataset(dataset):
+    from modulos.almacen_compartido import AlmacenCompartido
+    almacen = AlmacenCompartido(inactividad_maxima=60)
+    vista, _ = almacen.adquirir("prueba_identidad", "sesion_a", dataset)
+    assert hash_almacenado(vista) == "prueba_identidad"
+    with pytest.raises(ValueError):
+        vista.loc[0, "Hospital"] = "Negrín"
+    vista["Comentarios"] = "sustituida en esta sesión"
+    otra, _ = almacen.adquirir("prueba_identidad", "sesion_b")
+    assert otra.loc[0, "Hospital"] == "Insular"
+    assert otra.loc[0, "Comentarios"] == "falta tiempo asistencial"
+    assert not pd.get_option("mode.copy_on_write")
+
+def test_una_carga_fallida_no_deja_su_cerrojo(dataset):
+    from modulos.almacen_compartido import AlmacenCompartido
+    almacen = AlmacenCompartido(inactividad_maxima=60)
+    assert almacen.adquirir("no_existe", "sesion_a") == (None, None)
+    assert almacen._cargas == {}
+    # El dataset aparece más tarde (por ejemplo, al volver a subirlo) y se carga con normalidad
+    guardar_dataset("no_existe", dataset)
+    vista, _ = almacen.adquirir("no_existe", "sesion_a")
+    assert len(vista) == 4 and hash_almacenado(vista) == "no_existe"
+    assert almacen._cargas == {} and almacen.cargas == 1
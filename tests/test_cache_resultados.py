@@ -0,0 +1,54 @@
+# /tests/test_cache_resultados.py
+
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from modulos.almacen_datos import guardar_dataset, cargar_dataset
+from modulos.cache_resultados import CacheResultados, cache_resultados, clave_resultado, invalidar_dataset
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    guardar_dataset("prueba_cache", pd.DataFrame({
+        "Hospital": ["Insular", "Negrín", "Insular"],
+        "Satisfacción general": [4.0, 2.0, 5.0]
+    }))
+    return cargar_dataset("prueba_cache")
+
+def test_clave_por_contenido_y_no_por_identidad_heredada(dataset):
+    clave = clave_resultado("descriptivo", dataset, "Satisfacción general")
+    assert clave_resultado("descriptivo", cargar_dataset("prueba_cache"), "Satisfacción general") == clave
+    assert clave_resultado("descriptivo", dataset, "Satisfacción general", decimales=2) != clave
+    # Los DataFrames derivados heredan attrs, pero su clave sale de su propio contenido
+    cambiado = dataset.assign(**{"Satisfacción general": [1.0, 1.0, 1.0]})
+    assert clave_resultado("descriptivo", cambiado, "Satisfacción general") != clave
+    sin_cambios = dataset.copy()
+    sin_cambios["Hospital"] = "Otro"
+    assert clave_resultado("descriptivo", sin_cambios, "Satisfacción general") == clave
+
+def test_invalidar_dataset_descarta_sus_resultados(dataset):
+    clave = clave_resultado("descriptivo", dataset, "Satisfacción general")
+    otra = clave_resultado("descriptivo", dataset.iloc[:1].copy(), "Satisfacción general")
+    cache_resultados.guardar(clave, "completo")
+    cache_resultados.guardar(otra, "subconjunto")
+    assert invalidar_dataset("prueba_cache") == 1
+    assert cache_resultados.obtener(clave) is None
+    assert cache_resultados.obtener(otra) == "subconjunto"
+
+def test_expulsion_por_tamano_y_antiguedad(monkeypatch):
+    cache = CacheResultados(limite_bytes=200, antiguedad_maxima=10)
+    ahora = [100.0]
+    monkeypatch.setattr("modulos.cache_resultados.time", SimpleNamespace(monotonic=lambda: ahora[0]))
+    cache.guardar("a", np.zeros(10))
+    cache.guardar("b", np.zeros(10))
+    assert cache.obtener("a") is not None  # "b" pasa a ser la menos usada
+    cache.guardar("c", np.zeros(10))
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") is not None and cache.obtener("c") is not None
+    assert cache.tamano_total == 160
+    cache.guardar("grande", np.zeros(100))  # mayor que el límite: no se guarda
+    assert cache.obtener("grande") is None
+    ahora[0] += 11
+    assert cache.obtener("a") is None
+    assert cache.estadisticas()["expulsiones"] == 2
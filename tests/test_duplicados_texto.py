@@ -0,0 +1,38 @@
+# /tests/test_duplicados_texto.py
+
+import numpy as np
+import pandas as pd
+from modulos.duplicados_texto import obtener_duplicados
+
+def test_columna_sin_respuestas():
+    serie = pd.Series([None, None], name="Comentarios vacíos")
+    duplicados = obtener_duplicados(serie)
+    assert duplicados.respuestas == 0
+    assert duplicados.respuestas_distintas == 0
+    assert duplicados.tabla_grupos(serie).empty
+    assert duplicados.texto_representativo(serie).empty
+
+def test_columna_con_una_respuesta():
+    serie = pd.Series([None, "Muy buena atención en urgencias"], name="Comentarios únicos")
+    duplicados = obtener_duplicados(serie)
+    assert duplicados.respuestas == 1
+    assert duplicados.respuestas_distintas == 1
+    assert duplicados.tabla_grupos(serie).empty
+    assert duplicados.texto_representativo(serie).to_dict() == {1: "Muy buena atención en urgencias"}
+
+def test_agrupa_duplicados_exactos_y_casi_duplicados():
+    base = "faltan residentes en la guardia de fin de semana y no hay tiempo para la docencia"
+    serie = pd.Series([
+        base,
+        "La docencia teórica es muy buena",
+        base.upper() + "!",
+        base + " nunca",
+        "Las rotaciones externas no se reconocen"
+    ], name="Comentarios repetidos")
+    duplicados = obtener_duplicados(serie)
+    assert duplicados.respuestas == 5
+    # Las mayúsculas y la puntuación no cuentan: la tercera es la misma respuesta
+    assert duplicados.grupos[0] == duplicados.grupos[2] == duplicados.grupos[3]
+    assert len(np.unique(duplicados.grupos)) == 3
+    tabla = duplicados.tabla_grupos(serie)
+    assert tabla.to_dict("records") == [{"Comentario": base, "Repeticiones": 3, "Variantes": 2}]
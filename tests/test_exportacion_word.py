@@ -0,0 +1,27 @@
+# /tests/test_exportacion_word.py
+
+import numpy as np
+import pandas as pd
+from docx import Document
+from modulos.exportacion_word import agregar_tabla
+
+def _textos(tabla):
+    return [[celda.text for celda in fila.cells] for fila in tabla.rows]
+
+def test_recuentos_sin_decimales_y_porcentajes_con_dos():
+    frecuencias = pd.DataFrame({
+        "Respuesta": ["Sí", "No", "NS/NC"],
+        "Frecuencia Absoluta": np.array([188, 12, 0], dtype=np.int64),
+        "Frecuencia Relativa (%)": [94.0, 6.0, np.nan]
+    })
+    tabla = agregar_tabla(Document(), frecuencias, list(frecuencias.columns))
+    assert _textos(tabla) == [
+        ["Respuesta", "Frecuencia Absoluta", "Frecuencia Relativa (%)"],
+        ["Sí", "188", "94.00"],
+        ["No", "12", "6.00"],
+        ["NS/NC", "0", "-"]
+    ]
+
+def test_filas_con_texto_a_escapar():
+    tabla = agregar_tabla(Document(), [("<a> & \x07b", None, True)], ["Texto", "Vacío", "Lógico"])
+    assert _textos(tabla)[1] == ["<a> & b", "", "True"]
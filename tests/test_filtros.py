@@ -0,0 +1,60 @@
+# /tests/test_filtros.py
+
+import numpy as np
+import pandas as pd
+import pytest
+import modulos.filtros as filtros
+from modulos.almacen_datos import guardar_dataset, cargar_dataset, hash_vista
+from modulos.filtros import crear_filtro, describir_filtro, valores_columna, mascara_filtro, aplicar_filtro, descartar_vistas
+
+MULTIPLE = "Herramientas de evaluación (selección múltiple)"
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    guardar_dataset("prueba_filtros", pd.DataFrame({
+        "Hospital": ["Insular", "Negrín", "Insular", None, "Materno"],
+        "Año de residencia": ["R1", "R2", "R2", "R1", "R3"],
+        MULTIPLE: ["Libro del Residente;Entrevistas", "Entrevistas", None, "Libro del Residente", "Sesiones"]
+    }))
+    return cargar_dataset("prueba_filtros")
+
+def test_filtro_como_clave_estable():
+    filtro = crear_filtro({"Hospital": ["Negrín", "Insular"], "Año de residencia": ["R2"], "Sexo": []})
+    assert filtro == crear_filtro({"Año de residencia": ["R2"], "Hospital": ["Insular", "Negrín"]})
+    assert describir_filtro(filtro) == "Año de residencia: R2; Hospital: Insular, Negrín"
+
+def test_mascaras_iguales_a_isin(dataset):
+    assert valores_columna(dataset, "Hospital") == ["Insular", "Materno", "Negrín"]
+    assert valores_columna(dataset, MULTIPLE) == ["Entrevistas", "Libro del Residente", "Sesiones"]
+    filtro = crear_filtro({"Hospital": ["Insular", "Negrín"], "Año de residencia": ["R2"]})
+    esperada = dataset["Hospital"].isin(["Insular", "Negrín"]) & dataset["Año de residencia"].eq("R2")
+    np.testing.assert_array_equal(mascara_filtro(dataset, filtro), esperada.to_numpy())
+    # En selección múltiple se filtra por opción, no por combinación
+    np.testing.assert_array_equal(
+        mascara_filtro(dataset, crear_filtro({MULTIPLE: ["Entrevistas"]})), [True, True, False, False, False]
+    )
+    assert mascara_filtro(dataset, crear_filtro({"No existe": ["x"]})) is None
+
+def test_la_vista_se_reutiliza(dataset):
+    assert aplicar_filtro(dataset, ()) is dataset
+    filtro = crear_filtro({"Hospital": ["Insular"]})
+    vista = aplicar_filtro(dataset, filtro)
+    assert vista["Año de residencia"].tolist() == ["R1", "R2"]
+    assert hash_vista(vista) is not None
+    otra = aplicar_filtro(cargar_dataset("prueba_filtros"), filtro)
+    # Otra ejecución recibe una copia superficial de la misma vista, sin volver a construirla
+    assert otra is not vista and hash_vista(otra) == hash_vista(vista)
+    assert np.shares_memory(otra["Año de residencia"].to_numpy(), vista["Año de residencia"].to_numpy())
+    assert len([clave for clave in filtros._cache_vistas if clave[0] == "prueba_filtros"]) == 1
+    with pytest.raises(ValueError):
+        vista.iloc[0, 1] = "R5"
+
+    descartar_vistas("prueba_filtros")
+    assert not [clave for clave in filtros._cache_vistas if clave[0] == "prueba_filtros"]
+
+def test_dataframe_no_guardado_se_filtra_sin_vista(dataset):
+    df = dataset.copy()
+    vista = aplicar_filtro(df, crear_filtro({"Hospital": ["Materno"]}))
+    assert vista[MULTIPLE].tolist() == ["Sesiones"]
+    assert hash_vista(vista) is None
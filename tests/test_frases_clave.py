@@ -0,0 +1,56 @@
+# /tests/test_frases_clave.py
+
+from collections import Counter
+import numpy as np
+import pandas as pd
+from modulos.procesamiento_texto import construir_tokens_columna
+from modulos.frases_clave import ResumenNgramas, extraer_frases
+
+def _tokens():
+    textos = (
+        ["Falta de supervisión en las guardias"] * 4
+        + ["Buena docencia y buena supervisión"] * 3
+        + ["La presión asistencial es alta"] * 3
+        + ["Las guardias son largas", "Sin comentarios", None]
+    )
+    return construir_tokens_columna(pd.Series(textos, name="Comentarios"))
+
+def test_frases_frecuentes_ordenadas_por_pmi():
+    frases = extraer_frases(_tokens(), frecuencia_minima=3)
+    assert list(frases.columns) == ["grupo", "Frase", "Frecuencia", "PMI"]
+    por_frase = dict(zip(frases["Frase"], frases["Frecuencia"]))
+    assert por_frase["presion asistencial"] == 3
+    assert por_frase["falta de supervision"] == 4
+    # No empiezan ni terminan por palabra vacía
+    assert not any(frase.split()[0] in ("de", "la", "las", "en") for frase in frases["Frase"])
+    assert not any(frase.split()[-1] in ("de", "la", "las", "en") for frase in frases["Frase"])
+    assert frases["Frecuencia"].min() >= 3
+    assert frases["PMI"].is_monotonic_decreasing
+    assert frases["PMI"].between(-1, 1).all()
+
+def test_frases_por_grupo_y_seleccion():
+    tokens = _tokens()
+    grupos = np.array([0] * 4 + [1] * 6 + [-1, -1])
+    frases = extraer_frases(tokens, codigos_grupo=grupos, n_grupos=2, frecuencia_minima=3)
+    assert "falta de supervision" in set(frases.loc[frases["grupo"] == 0, "Frase"])
+    assert "falta de supervision" not in set(frases.loc[frases["grupo"] == 1, "Frase"])
+    assert "presion asistencial" in set(frases.loc[frases["grupo"] == 1, "Frase"])
+    # Solo las respuestas seleccionadas
+    solo_presion = extraer_frases(tokens, seleccion=np.arange(7, 10), frecuencia_minima=3)
+    assert solo_presion["Frase"].tolist() == ["presion asistencial", "asistencial es alta"]
+    assert extraer_frases(tokens, seleccion=np.array([], dtype=np.int64)).empty
+
+def test_resumen_conserva_los_frecuentes():
+    rng = np.random.default_rng(5)
+    # Una clave muy frecuente entre muchas raras, en lotes: con capacidad 10
+    # sigue entre los candidatos todo lo que supera total / 11 apariciones
+    claves = np.concatenate([np.full(300, 7), rng.integers(100, 10_000, 700)])
+    rng.shuffle(claves)
+    resumen = ResumenNgramas(capacidad=10)
+    for lote in np.array_split(claves, 10):
+        resumen.actualizar(np.zeros(len(lote), dtype=np.int64), lote)
+    candidatos = resumen.candidatos()
+    assert len(candidatos) <= 10
+    frecuentes = {clave for clave, veces in Counter(claves.tolist()).items() if veces > len(claves) / 11}
+    assert frecuentes == {7}
+    assert 7 in candidatos.get_level_values("clave")
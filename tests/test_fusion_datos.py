@@ -0,0 +1,38 @@
+# /tests/test_fusion_datos.py
+
+import os
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from modulos.fusion_datos import fusionar_contenidos
+from modulos.lectura_excel import ErrorLecturaExcel
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_sin_archivos_lanza_error():
+    with pytest.raises(ValueError):
+        fusionar_contenidos([])
+
+def test_archivo_ilegible_lanza_error_sin_registrar_la_fusion(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ErrorLecturaExcel) as error:
+        fusionar_contenidos([("malo.xlsx", b"no es un libro de Excel")], paralelo=False)
+    assert error.value.nombre == "malo.xlsx"
+    assert not (tmp_path / "data" / "indice_fusiones.json").exists()
+
+def test_el_generador_por_lotes_carga_un_archivo_sin_streamlit(tmp_path):
+    pd.DataFrame({
+        "Hospital": ["Insular", "Negrín"],
+        "Comentarios": ["buena docencia", "falta tiempo"]
+    }).to_excel(tmp_path / "encuesta.xlsx", index=False)
+    codigo = (
+        "import sys\n"
+        "from modulos.informes_lote import cargar_dataset_lote\n"
+        "df = cargar_dataset_lote(['encuesta.xlsx'])\n"
+        "assert len(df) == 2, len(df)\n"
+        "assert 'streamlit' not in sys.modules\n"
+    )
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [RAIZ, os.environ.get("PYTHONPATH")])))
+    resultado = subprocess.run([sys.executable, "-c", codigo], cwd=tmp_path, env=entorno, capture_output=True, text=True)
+    assert resultado.returncode == 0, resultado.stderr
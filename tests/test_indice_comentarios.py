@@ -0,0 +1,57 @@
+# /tests/test_indice_comentarios.py
+
+import os
+import numpy as np
+import pandas as pd
+import modulos.indice_comentarios as indice_comentarios
+from modulos.almacen_datos import guardar_dataset, cargar_dataset, ruta_indice_comentarios
+from modulos.indice_comentarios import IndiceComentarios, construir_indice, obtener_indice
+
+COLUMNAS = ["Comentarios generales", "Comentarios sobre las guardias"]
+
+def _encuesta():
+    return pd.DataFrame({
+        "Hospital": ["Insular", "Negrín", "Insular"],
+        "Comentarios generales": ["Falta tiempo para la docencia", None, "La docencia es buena, falta tiempo"],
+        "Comentarios sobre las guardias": ["Guardias sin supervisión", "Falta supervisión en las guardias", "Tiempo de descanso"]
+    })
+
+def test_busqueda_de_palabras_y_frases():
+    df = _encuesta()
+    indice = construir_indice(df, COLUMNAS)
+    # "tiempo" en las tres respuestas; con tildes y mayúsculas normalizadas
+    assert indice.buscar("TIEMPO")[["columna", "fila"]].values.tolist() == [[0, 0], [0, 2], [1, 2]]
+    frase = indice.buscar('"falta tiempo"')
+    assert frase[["columna", "fila", "posicion", "longitud"]].values.tolist() == [[0, 0, 0, 2], [0, 2, 4, 2]]
+    # Todos los segmentos en la misma respuesta, limitado a columnas y filas
+    assert indice.buscar("supervision guardias")[["columna", "fila"]].values.tolist() == [[1, 0], [1, 1]]
+    assert indice.buscar("tiempo", columnas=[COLUMNAS[1]])["fila"].tolist() == [2]
+    assert indice.buscar("tiempo", mascara_filas=[True, False, False])["fila"].tolist() == [0]
+    assert indice.buscar("inexistente").empty
+
+    kwic = indice.contexto(df, frase, palabras=1)
+    assert kwic.loc[1, ["Contexto anterior", "Texto", "Contexto posterior"]].tolist() == ["…buena, ", "falta tiempo", ""]
+
+def test_guardar_y_cargar(tmp_path, monkeypatch):
+    indice = construir_indice(_encuesta(), COLUMNAS)
+    ruta = str(tmp_path / "indices" / "prueba.npz")
+    indice.guardar(ruta)
+    cargado = IndiceComentarios.cargar(ruta, COLUMNAS)
+    assert cargado.columnas == indice.columnas and cargado.vocabulario == indice.vocabulario
+    np.testing.assert_array_equal(cargado.inicios, indice.inicios)
+    np.testing.assert_array_equal(cargado.claves, indice.claves)
+    pd.testing.assert_frame_equal(cargado.buscar('"falta tiempo"'), indice.buscar('"falta tiempo"'))
+
+    assert IndiceComentarios.cargar(ruta, COLUMNAS[:1]) is None
+    assert IndiceComentarios.cargar(str(tmp_path / "no_existe.npz"), COLUMNAS) is None
+    monkeypatch.setattr(indice_comentarios, "VERSION_INDICE", indice_comentarios.VERSION_INDICE + 1)
+    assert IndiceComentarios.cargar(ruta, COLUMNAS) is None
+
+def test_el_indice_del_dataset_se_guarda_en_disco(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    guardar_dataset("prueba_indice", _encuesta())
+    df = cargar_dataset("prueba_indice")
+    indice = obtener_indice(df)
+    assert indice.columnas == COLUMNAS
+    assert os.path.exists(ruta_indice_comentarios("prueba_indice"))
+    assert obtener_indice(cargar_dataset("prueba_indice")) is indice
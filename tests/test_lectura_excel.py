@@ -0,0 +1,49 @@
+# /tests/test_lectura_excel.py
+
+from io import BytesIO
+import pandas as pd
+import pytest
+from modulos.lectura_excel import alinear_columnas, leer_archivo_excel, leer_archivos_por_bloques, LimiteMemoriaExcedido
+
+def test_mismas_columnas_en_otro_orden_se_alinean_por_nombre():
+    df = pd.DataFrame({"Edad": ["30-34"], "Hospital": ["Insular"]})
+    avisos = []
+    alineado = alinear_columnas(df, ["Hospital", "Edad"], avisos, "b.xlsx")
+    assert list(alineado.columns) == ["Hospital", "Edad"]
+    assert alineado.iloc[0].tolist() == ["Insular", "30-34"]
+    assert avisos == []
+
+def test_nombres_distintos_se_asignan_por_posicion_con_aviso():
+    df = pd.DataFrame({"Hospital ": ["Insular"], "Edad (años)": ["30-34"]})
+    avisos = []
+    alineado = alinear_columnas(df, ["Hospital", "Edad"], avisos, "b.xlsx")
+    assert alineado.iloc[0].tolist() == ["Insular", "30-34"]
+    assert len(avisos) == 1 and avisos[0].startswith("b.xlsx: 2 columnas")
+
+def test_distinto_numero_de_columnas_se_alinea_por_nombre():
+    df = pd.DataFrame({"Edad": ["30-34"]})
+    alineado = alinear_columnas(df, ["Hospital", "Edad"])
+    assert list(alineado.columns) == ["Hospital", "Edad"]
+    assert pd.isna(alineado.iloc[0, 0]) and alineado.iloc[0, 1] == "30-34"
+
+def _libro_ejemplo(filas=3000):
+    buffer = BytesIO()
+    pd.DataFrame({
+        "Hospital": [f"Hospital {i % 7}" for i in range(filas)],
+        "Valoración": [i % 10 + 1 for i in range(filas)],
+        "Comentarios": [f"comentario número {i} sobre la rotación" for i in range(filas)]
+    }).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+def test_el_techo_de_memoria_incluye_el_libro_y_la_concatenacion():
+    contenido = _libro_ejemplo()
+    _, df, _, _ = leer_archivo_excel("a.xlsx", contenido, streaming=True, limite_memoria_mb=0)
+    datos = df.memory_usage(deep=True).sum()
+    mb = 1024 * 1024
+    # Los datos leídos caben, pero no junto con el libro y la copia de la concatenación
+    with pytest.raises(LimiteMemoriaExcedido):
+        leer_archivos_por_bloques([("a.xlsx", contenido)], limite_memoria_mb=(1.5 * datos) / mb)
+    with pytest.raises(LimiteMemoriaExcedido):
+        leer_archivos_por_bloques([("a.xlsx", contenido)], limite_memoria_mb=(len(contenido) + 1.5 * datos) / mb)
+    lecturas = leer_archivos_por_bloques([("a.xlsx", contenido)], limite_memoria_mb=(len(contenido) + 2.5 * datos) / mb)
+    assert len(lecturas[0][1]) == 3000
@@ -0,0 +1,35 @@
+# /tests/test_procesamiento_texto.py
+
+import numpy as np
+import pandas as pd
+from modulos.procesamiento_texto import construir_tokens_columna
+
+def _tokens_ejemplo():
+    # La primera respuesta repite "alfa" y no está ordenada por id de vocabulario:
+    # sum_duplicates tendría que reordenar y compactar sus índices
+    serie = pd.Series(["zeta alfa beta alfa", None, "gamma delta"], name="Comentarios")
+    return construir_tokens_columna(serie)
+
+def test_matriz_terminos_no_altera_los_tokens():
+    tokens = _tokens_ejemplo()
+    antes = [tokens.tokens(i) for i in range(len(tokens))]
+    ids = tokens.ids.copy()
+    desplazamientos = tokens.desplazamientos.copy()
+
+    tokens.matriz_terminos()
+
+    assert antes == [["zeta", "alfa", "beta", "alfa"], ["gamma", "delta"]]
+    assert [tokens.tokens(i) for i in range(len(tokens))] == antes
+    np.testing.assert_array_equal(tokens.ids, ids)
+    np.testing.assert_array_equal(tokens.desplazamientos, desplazamientos)
+
+def test_frecuencias_tras_matriz_terminos():
+    tokens = _tokens_ejemplo()
+    tokens.matriz_terminos()
+
+    frecuencias = tokens.frecuencias(excluir_palabras_vacias=False)
+    assert frecuencias.to_dict() == {"alfa": 2, "zeta": 1, "beta": 1, "gamma": 1, "delta": 1}
+    por_grupo = tokens.frecuencias_por_grupo(np.array([0, 1]), 2, excluir_palabras_vacias=False).toarray()
+    indice = {termino: i for i, termino in enumerate(tokens.vocabulario)}
+    assert por_grupo[0, indice["alfa"]] == 2 and por_grupo[0, indice["delta"]] == 0
+    assert por_grupo[1, indice["delta"]] == 1 and por_grupo[1, indice["alfa"]] == 0
@@ -0,0 +1,25 @@
+# /tests/test_prompts_ia.py
+
+import pandas as pd
+from modulos.prompts_ia import planificar_prompts
+
+def test_pregunta_sin_comentarios_da_un_plan_vacio():
+    df = pd.DataFrame({
+        "Hospital": ["Insular", "Negrín"],
+        "Comentarios sin respuesta": [None, "   "]
+    })
+    plan = planificar_prompts(df, "Comentarios sin respuesta", referencia="Hospital")
+    assert len(plan) == 0
+    assert plan.comentarios_totales == 0
+    assert not plan.muestreado
+    assert plan.texto_completo() == ""
+
+def test_los_duplicados_se_envian_una_vez_con_sus_repeticiones():
+    df = pd.DataFrame({
+        "Hospital": ["Insular", "Insular", "Negrín"],
+        "Comentarios": ["Falta tiempo para estudiar", "falta tiempo para estudiar.", "Buena docencia"]
+    })
+    plan = planificar_prompts(df, "Comentarios", referencia="Hospital")
+    assert len(plan) == 1
+    assert plan.comentarios_totales == plan.comentarios_incluidos == 3
+    assert sorted(plan.lineas) == ["- [Insular] Falta tiempo para estudiar (×2)", "- [Negrín] Buena docencia"]
@@ -0,0 +1,45 @@
+# /tests/test_seleccion_multiple.py
+
+import numpy as np
+import pandas as pd
+from modulos.seleccion_multiple import separar_opciones, obtener_indicadores
+
+def _serie():
+    return pd.Series([
+        "Libro del Residente; Entrevistas",
+        "Entrevistas",
+        None,
+        "Entrevistas;Entrevistas;Sesiones;",
+        "Libro del Residente; Entrevistas"
+    ], name="Herramientas de evaluación (selección múltiple)")
+
+def test_separar_opciones():
+    assert separar_opciones(" A ;B;; A;C ") == ["A", "B", "C"]
+    assert separar_opciones("") == []
+
+def test_matriz_de_indicadores():
+    indicadores = obtener_indicadores(_serie())
+    assert indicadores.opciones == ["Libro del Residente", "Entrevistas", "Sesiones"]
+    np.testing.assert_array_equal(indicadores.matriz.toarray(), [
+        [1, 1, 0],
+        [0, 1, 0],
+        [0, 0, 0],
+        [0, 1, 1],
+        [1, 1, 0]
+    ])
+    assert indicadores.respuestas() == 4
+    assert indicadores.frecuencias().to_dict() == {"Entrevistas": 4, "Libro del Residente": 2, "Sesiones": 1}
+    coocurrencia = indicadores.coocurrencia()
+    assert coocurrencia.loc["Entrevistas", "Entrevistas"] == 4
+    assert coocurrencia.loc["Libro del Residente", "Entrevistas"] == 2
+    assert coocurrencia.loc["Libro del Residente", "Sesiones"] == 0
+
+def test_tabla_cruzada_por_grupo():
+    indicadores = obtener_indicadores(_serie())
+    tabla = indicadores.tabla_cruzada(np.array([0, 1, 0, 1, -1]), 2)
+    np.testing.assert_array_equal(tabla, [[1, 1, 0], [0, 2, 1]])
+
+def test_se_reutiliza_por_contenido():
+    serie = _serie()
+    assert obtener_indicadores(serie.copy()) is obtener_indicadores(serie)
+    assert obtener_indicadores(serie.rename("Otra (selección múltiple)")) is not obtener_indicadores(serie)
@@ -0,0 +1,50 @@
+# /tests/test_sentimiento.py
+
+import numpy as np
+import pandas as pd
+from modulos.procesamiento_texto import construir_tokens_columna
+from modulos.sentimiento import (
+    ALFA_NORMALIZACION, FACTOR_INTENSIFICACION,
+    puntuar_comentarios, clasificar, distribucion_sentimiento, sentimiento_por_grupo
+)
+
+def _puntuaciones(textos):
+    return puntuar_comentarios(construir_tokens_columna(pd.Series(textos, name="Comentarios")))
+
+def _normalizada(suma):
+    return suma / np.sqrt(suma ** 2 + ALFA_NORMALIZACION)
+
+def test_polaridad_negacion_e_intensificacion():
+    puntuaciones = _puntuaciones([
+        "La docencia es buena",
+        "La docencia no es buena",
+        "La docencia es muy buena",
+        "No hay quejas",
+        "No es la primera vez, pero la docencia es mala",
+        "Rotación en planta",
+        None
+    ])
+    # Las respuestas vacías no se puntúan
+    assert len(puntuaciones) == 6
+    np.testing.assert_allclose(
+        puntuaciones[:5], _normalizada(np.array([0.75, -0.75, 0.75 * FACTOR_INTENSIFICACION, 0.75, -0.75]))
+    )
+    # "pero" cierra el alcance de la negación: "mala" sigue siendo negativa
+    assert puntuaciones[5] == 0
+    assert clasificar(puntuaciones).tolist() == [0, 2, 0, 0, 2, 1]
+
+def test_la_negacion_no_pasa_a_la_respuesta_siguiente():
+    puntuaciones = _puntuaciones(["No me quejo", "Buena supervisión"])
+    assert puntuaciones[1] > 0
+
+def test_distribucion_y_tabla_por_grupo():
+    puntuaciones = np.array([0.5, -0.5, 0.0, 0.6, 0.04])
+    distribucion = distribucion_sentimiento(puntuaciones)
+    assert distribucion["Comentarios"].tolist() == [2, 2, 1]
+    assert distribucion["Porcentaje (%)"].tolist() == [40.0, 40.0, 20.0]
+
+    tabla = sentimiento_por_grupo(puntuaciones, [0, 0, 1, 1, -1], ["Insular", "Negrín", "Materno"])
+    assert tabla.index.tolist() == ["Insular", "Negrín"]
+    assert tabla["Comentarios"].tolist() == [2, 2]
+    assert tabla.loc["Insular", ["Positivo (%)", "Negativo (%)"]].tolist() == [50.0, 50.0]
+    assert tabla.loc["Negrín", "Puntuación media"] == 0.3
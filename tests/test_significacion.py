@@ -0,0 +1,84 @@
+# /tests/test_significacion.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from modulos.significacion import calcular_matriz_significacion, corregir_benjamini_hochberg
+
+MULTIPLE = "Herramientas de evaluación (selección múltiple)"
+
+@pytest.fixture
+def encuesta():
+    rng = np.random.default_rng(7)
+    filas = 400
+    hospital = rng.choice(["Insular", "Negrín", "Materno"], filas)
+    # La satisfacción depende del hospital; el sexo no influye en nada
+    satisfaccion = np.clip(np.round(rng.normal(3 + (hospital == "Negrín"), 1)), 1, 5)
+    multiple = np.where(
+        hospital == "Insular",
+        rng.choice(["Libro del Residente", "Libro del Residente;Entrevistas", "Entrevistas"], filas, p=[0.6, 0.3, 0.1]),
+        rng.choice(["Libro del Residente", "Libro del Residente;Entrevistas", "Entrevistas"], filas, p=[0.1, 0.3, 0.6])
+    ).astype(object)
+    multiple[:20] = None
+    return pd.DataFrame({
+        "Hospital": hospital,
+        "Sexo": rng.choice(["Hombre", "Mujer"], filas),
+        "Satisfacción general": satisfaccion,
+        "¿Recomendarías la unidad?": rng.choice(["Sí", "No"], filas),
+        MULTIPLE: multiple
+    })
+
+def _fila(resultado, referencia, pregunta):
+    return resultado[(resultado["Referencia"] == referencia) & (resultado["Pregunta"] == pregunta)].iloc[0]
+
+def test_pruebas_coinciden_con_scipy(encuesta):
+    resultado = calcular_matriz_significacion(
+        encuesta, ["Hospital", "Sexo"], ["¿Recomendarías la unidad?"], ["Satisfacción general"]
+    )
+    for referencia in ["Hospital", "Sexo"]:
+        tabla = pd.crosstab(encuesta[referencia], encuesta["¿Recomendarías la unidad?"])
+        chi2, p, grados, _ = stats.chi2_contingency(tabla, correction=False)
+        fila = _fila(resultado, referencia, "¿Recomendarías la unidad?")
+        assert fila["Estadístico"] == pytest.approx(chi2)
+        assert fila["p"] == pytest.approx(p)
+        assert fila["Grados de libertad"] == grados
+
+        grupos = [g.to_numpy() for _, g in encuesta.groupby(referencia)["Satisfacción general"]]
+        h, p = stats.kruskal(*grupos)
+        fila = _fila(resultado, referencia, "Satisfacción general")
+        assert fila["Estadístico"] == pytest.approx(h)
+        assert fila["p"] == pytest.approx(p)
+
+    anova = calcular_matriz_significacion(encuesta, ["Hospital"], [], ["Satisfacción general"], prueba_numerica="ANOVA")
+    f, p = stats.f_oneway(*[g.to_numpy() for _, g in encuesta.groupby("Hospital")["Satisfacción general"]])
+    assert anova.loc[0, "Estadístico"] == pytest.approx(f)
+    assert anova.loc[0, "p"] == pytest.approx(p)
+
+def test_p_ajustados_por_benjamini_hochberg(encuesta):
+    resultado = calcular_matriz_significacion(
+        encuesta, ["Hospital", "Sexo"], ["¿Recomendarías la unidad?", MULTIPLE], ["Satisfacción general"]
+    )
+    validos = resultado["p"].notna()
+    esperados = stats.false_discovery_control(resultado.loc[validos, "p"].to_numpy(), method="bh")
+    np.testing.assert_allclose(resultado.loc[validos, "p ajustado (BH)"].to_numpy(), esperados)
+    assert resultado["p ajustado (BH)"].is_monotonic_increasing
+
+    # Ajuste manual: p * m / rango, con mínimo acumulado desde el mayor
+    p = np.array([0.01, 0.04, np.nan, 0.03, 0.5])
+    ajustados = corregir_benjamini_hochberg(p)
+    np.testing.assert_allclose(ajustados[[0, 1, 3, 4]], [0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.5])
+    assert np.isnan(ajustados[2])
+
+def test_seleccion_multiple_se_contrasta_por_opcion(encuesta):
+    resultado = calcular_matriz_significacion(encuesta, ["Hospital"], [MULTIPLE], [])
+    assert sorted(resultado["Pregunta"]) == [f"{MULTIPLE} [Entrevistas]", f"{MULTIPLE} [Libro del Residente]"]
+
+    respondidas = encuesta[encuesta[MULTIPLE].notna()]
+    elegida = respondidas[MULTIPLE].str.contains("Entrevistas")
+    chi2, p, grados, _ = stats.chi2_contingency(pd.crosstab(respondidas["Hospital"], elegida), correction=False)
+    fila = _fila(resultado, "Hospital", f"{MULTIPLE} [Entrevistas]")
+    assert fila["Estadístico"] == pytest.approx(chi2)
+    assert fila["p"] == pytest.approx(p)
+    assert fila["Grados de libertad"] == grados == 2
+    assert fila["N"] == len(respondidas)
@@ -0,0 +1,50 @@
+# /tests/test_tablas_cruzadas.py
+
+import numpy as np
+import pandas as pd
+from modulos.tablas_cruzadas import obtener_cubo
+
+MULTIPLE = "Herramientas de evaluación (selección múltiple)"
+
+def _encuesta():
+    rng = np.random.default_rng(3)
+    filas = 300
+    df = pd.DataFrame({
+        "Hospital": rng.choice(["Insular", "Negrín", "Materno"], filas).astype(object),
+        "Año de residencia": pd.Categorical(rng.choice(["R1", "R2", "R3", "R4"], filas), categories=["R1", "R2", "R3", "R4", "R5"]),
+        "¿Recomendarías la unidad?": rng.choice(["Sí", "No", "NS/NC"], filas).astype(object),
+        "Satisfacción general": rng.integers(1, 6, filas).astype("float64"),
+        MULTIPLE: rng.choice(["Libro del Residente", "Libro del Residente;Entrevistas", "Entrevistas;Sesiones"], filas).astype(object)
+    })
+    df.loc[::7, "¿Recomendarías la unidad?"] = None
+    df.loc[::11, "Hospital"] = None
+    df.loc[::13, "Satisfacción general"] = np.nan
+    return df
+
+def test_tablas_iguales_a_crosstab():
+    df = _encuesta()
+    cubo = obtener_cubo(df)
+    for referencia in ["Hospital", "Año de residencia"]:
+        for pregunta in ["¿Recomendarías la unidad?", "Satisfacción general"]:
+            esperada = pd.crosstab(df[referencia], df[pregunta])
+            # crosstab conserva las categorías sin datos; el cubo, como groupby(observed=True), no
+            esperada = esperada.loc[esperada.sum(axis=1) > 0, esperada.sum(axis=0) > 0]
+            tabla = cubo.tabla(referencia, pregunta)
+            pd.testing.assert_frame_equal(tabla, esperada, check_dtype=False, check_index_type=False, check_column_type=False, check_categorical=False)
+
+def test_seleccion_multiple_cuenta_cada_opcion():
+    df = _encuesta()
+    tabla = obtener_cubo(df).tabla("Hospital", MULTIPLE)
+    opciones = df[["Hospital", MULTIPLE]].assign(**{MULTIPLE: df[MULTIPLE].str.split(";")}).explode(MULTIPLE)
+    esperada = pd.crosstab(opciones["Hospital"], opciones[MULTIPLE])
+    pd.testing.assert_frame_equal(tabla.sort_index(axis=1), esperada, check_dtype=False, check_names=False)
+    assert tabla.columns.name == MULTIPLE
+
+def test_cubo_por_contenido_del_dataset():
+    df = _encuesta()
+    cubo = obtener_cubo(df)
+    assert obtener_cubo(df.copy()) is cubo
+    cambiado = df.assign(Hospital="Insular")
+    otro = obtener_cubo(cambiado)
+    assert otro is not cubo
+    assert otro.tabla("Hospital", "¿Recomendarías la unidad?").index.tolist() == ["Insular"]
@@ -0,0 +1,73 @@
+# /tests/test_trabajos_exportacion.py
+
+import io
+import threading
+import time
+from types import SimpleNamespace
+from modulos.trabajos_exportacion import (
+    ColaExportaciones, MAXIMO_TRABAJOS_POR_SESION,
+    ESTADO_EN_COLA, ESTADO_EN_CURSO, ESTADO_TERMINADO, ESTADO_ERROR
+)
+
+def _esperar(trabajo, segundos=5):
+    limite = time.monotonic() + segundos
+    while trabajo.activo and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert not trabajo.activo
+
+def test_estados_de_un_trabajo():
+    cola = ColaExportaciones(maximo_simultaneas=1, caducidad=60)
+    empezar, seguir = threading.Event(), threading.Event()
+
+    def exportar(texto, progreso):
+        empezar.set()
+        progreso(1, 2, "primera")
+        seguir.wait(5)
+        progreso(2, 2, "segunda")
+        return io.BytesIO(texto.encode("utf-8"))
+
+    trabajo = cola.encolar("sesion_a", "Informe", "informe.docx", exportar, "documento")
+    # El único hilo está ocupado: el segundo trabajo espera su turno
+    siguiente = cola.encolar("sesion_a", "Otro", "otro.docx", lambda progreso: b"otro")
+    assert empezar.wait(5)
+    assert trabajo.estado == ESTADO_EN_CURSO and siguiente.estado == ESTADO_EN_COLA
+    assert (trabajo.completados, trabajo.total, trabajo.fraccion) == (1, 2, 0.5)
+    cola.descartar(trabajo.identificador)  # activo: no se descarta
+    assert trabajo in cola.trabajos("sesion_a")
+
+    seguir.set()
+    _esperar(trabajo)
+    _esperar(siguiente)
+    assert trabajo.estado == ESTADO_TERMINADO and trabajo.datos == b"documento" and trabajo.fraccion == 1.0
+    assert siguiente.datos == b"otro"
+    assert cola.trabajos("sesion_a") == [trabajo, siguiente] and cola.trabajos("sesion_b") == []
+    assert cola.huella()["activos"] == 0
+    cola.descartar(trabajo.identificador)
+    assert cola.trabajos("sesion_a") == [siguiente]
+
+def test_trabajo_con_error():
+    cola = ColaExportaciones(maximo_simultaneas=1, caducidad=60)
+
+    def fallar(progreso):
+        raise ValueError("sin preguntas")
+
+    trabajo = cola.encolar("sesion_a", "Informe", "informe.docx", fallar)
+    _esperar(trabajo)
+    assert trabajo.estado == ESTADO_ERROR and trabajo.error == "sin preguntas"
+    assert trabajo.datos is None and trabajo.terminado is not None
+
+def test_caducidad_y_limite_por_sesion(monkeypatch):
+    cola = ColaExportaciones(maximo_simultaneas=1, caducidad=60)
+    trabajos = [cola.encolar("sesion_a", f"Informe {i}", "informe.docx", lambda progreso: b"x") for i in range(MAXIMO_TRABAJOS_POR_SESION)]
+    for trabajo in trabajos:
+        _esperar(trabajo)
+    # Al pasar del límite se descarta el terminado más antiguo
+    ultimo = cola.encolar("sesion_a", "Informe nuevo", "informe.docx", lambda progreso: b"x")
+    _esperar(ultimo)
+    restantes = cola.trabajos("sesion_a")
+    assert trabajos[0] not in restantes and len(restantes) == MAXIMO_TRABAJOS_POR_SESION
+
+    # Pasada la caducidad los documentos terminados desaparecen
+    ahora = time.monotonic() + 61
+    monkeypatch.setattr("modulos.trabajos_exportacion.time", SimpleNamespace(monotonic=lambda: ahora))
+    assert cola.trabajos("sesion_a") == []